@@ -1,23 +1,45 @@
 """API routes for the audio-to-video conversion service."""
+import hashlib
 import json
 import logging
 import os
+import re
 import threading
+import time
 import uuid
 from pathlib import Path
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.models import (
     ConvertResponse, ErrorResponse, TranscriptData, TranscriptSegment,
-    ProgressResponse, BatchConvertResponse, BatchStatusResponse, BatchJobItem, BatchJobStatus
+    ProgressResponse, BatchConvertResponse, BatchStatusResponse, BatchJobItem, BatchJobStatus,
+    WebhookDeadLetter, WebhookDeadLettersResponse
 )
+from app.services.background_processor import LAZY_RENDER, RENDER_MODE, TRANSCRIPT_OUTPUTS
 from app.services.file_handler import FileHandler
-from app.services.video_processor import check_ffmpeg
-from app.services.background_processor import process_job
+from app.services.video_processor import (
+    DEFAULT_RENDITIONS, PRIMARY_RENDITION, RENDITIONS, check_ffmpeg, mux_subtitles, parse_renditions
+)
+from app.services.warmup import readiness
+from app.services.dispatcher import dispatch_job, estimate_job, estimate_jobs, get_job_queue, is_distributed
+from app.services.media_probe import probe_audio
+from app.services.scheduler import BATCH_LANE, INTERACTIVE_LANE
+from app.services.tiers import validate_tier
+from app.services.waveform import read_level
+from app.services.webhooks import get_webhook_outbox, validate_callback_url
+from app.utils.idempotency import Reservation, get_idempotency_store
 from app.utils.job_manager import JobManager
-from app.utils.progress_store import progress_store
+from app.utils.metrics import (
+    QUEUE_DEPTH, QUEUE_LANE_DEPTH, UPLOAD_BYTES, UPLOAD_THROUGHPUT, STAGE_DURATION, record_cache_lookup, registry
+)
+from app.utils.profiler import (
+    PROFILE_REPORT_FILENAME, PROFILE_SPEEDSCOPE_FILENAME, PROFILE_STATS_FILENAME, should_profile
+)
+from app.utils.progress_store import progress_store, JobState, JobStage, ProgressModel
+from app.utils.zip_stream import iter_zip
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +53,291 @@ job_manager = JobManager(jobs_base_dir)
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
 WHISPER_MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", "")
 FFMPEG_TIMEOUT = int(os.getenv("FFMPEG_TIMEOUT", "600"))
+# Request header naming the submitting client for fair scheduling; set it at
+# an authenticating proxy, otherwise the peer address is used
+CLIENT_ID_HEADER = os.getenv("A2V_CLIENT_ID_HEADER", "X-Client-Id")
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Artifact types selectable for batch archives -> JobManager path getter
+ARCHIVE_ARTIFACTS = {
+    "video": "get_rendered_video_path",
+    "captioned": "get_captioned_video_path",
+    "subtitles": "get_subtitles_path",
+    "transcript": "get_transcript_segments_path",
+    "audio": "get_source_audio_path",
+}
+DEFAULT_ARCHIVE_ARTIFACTS = "video,subtitles,transcript"
+
+if is_distributed():
+    # Workers run in other processes; report the broker's queue depth
+    registry.add_collector(lambda: QUEUE_DEPTH.set(get_job_queue(job_manager).depth()))
+
+    def _collect_lane_depths() -> None:
+        depths = get_job_queue(job_manager).lane_depths()
+        for lane in (INTERACTIVE_LANE, BATCH_LANE):
+            QUEUE_LANE_DEPTH.labels(lane=lane).set(depths.get(lane, 0))
+
+    registry.add_collector(_collect_lane_depths)
+
+
+def _validate_tier(tier: Optional[str]) -> str:
+    """Validate a requested tier, raising 400 for unknown names."""
+    try:
+        return validate_tier(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_renditions(renditions: Optional[str]) -> List[str]:
+    """Parse requested renditions (default: A2V_RENDITIONS), raising 400 for unknown names."""
+    try:
+        return parse_renditions(DEFAULT_RENDITIONS if renditions is None else renditions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_callback_url(callback_url: Optional[str]) -> Optional[str]:
+    """Check a submitted webhook URL, raising 400 if it is unusable."""
+    try:
+        return validate_callback_url(callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _client_id(request: Request) -> str:
+    """Identity of the submitting client, used to share workers fairly."""
+    client_id = request.headers.get(CLIENT_ID_HEADER, "").strip()[:128]
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+async def _reserve_idempotency_key(
+    request: Request, uploads: List[Optional[UploadFile]], fields: dict
+) -> Optional[Reservation]:
+    """
+    Reserve the request's Idempotency-Key, if it sent one.
+    
+    The key is scoped to the client and bound to a hash of the endpoint,
+    form fields and uploads.
+    
+    Returns:
+        The reservation (its response is set for a repeated request), or
+        None without a key
+    
+    Raises:
+        HTTPException: 400 for an invalid key, 409 if the key belongs to a
+            different or still running request
+    """
+    key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+    request_hash = hashlib.sha256()
+    request_hash.update(request.url.path.encode() + b"\0")
+    request_hash.update(json.dumps(fields, sort_keys=True).encode() + b"\0")
+    for upload in uploads:
+        await FileHandler.hash_upload(upload, request_hash)
+    store = get_idempotency_store(job_manager.base_dir)
+    try:
+        return await run_in_threadpool(store.reserve, _client_id(request), key, request_hash.hexdigest())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+def _get_progress(job_id: str) -> Optional[ProgressModel]:
+    """
+    Return the freshest known progress for a job.
+    
+    In distributed mode workers persist progress into the shared job
+    directory, which is newer than this process's "queued" entry.
+    """
+    progress = progress_store.get(job_id)
+    if progress is None or is_distributed():
+        persisted = job_manager.read_progress(job_id)
+        if persisted is not None:
+            persisted_progress = ProgressModel.from_dict(persisted)
+            if progress is None or persisted_progress.updated_at >= progress.updated_at:
+                return persisted_progress
+    return progress
+
+
+def _persist_terminal_progress(job_id: str, snapshot: dict) -> None:
+    """Keep final states on disk; the progress store evicts them after a TTL."""
+    if snapshot["state"] in (JobState.SUCCEEDED.value, JobState.FAILED.value):
+        job_manager.write_progress(job_id, snapshot)
+
+
+progress_store.add_listener(_persist_terminal_progress)
+
+
+def _batch_job_ids(batch_id: str) -> List[str]:
+    """Job IDs of a batch, from memory or from its persisted manifest."""
+    return progress_store.get_batch_jobs(batch_id) or job_manager.read_batch(batch_id) or []
+
+
+def _progress_response(
+    job_id: str, progress: ProgressModel, estimates: Optional[Callable[[], Dict[str, Dict]]] = None
+) -> ProgressResponse:
+    """
+    Build a status response, adding queue position and ETA while pending.
+
+    Args:
+        estimates: Returns the estimates of all jobs (see estimate_jobs), for
+            responses covering many jobs; by default the job is estimated alone
+    """
+    response = ProgressResponse(**progress.to_dict())
+    if progress.state == JobState.SUCCEEDED:
+        response.eta_seconds = 0.0
+    elif progress.state in (JobState.QUEUED, JobState.RUNNING):
+        estimate = estimate_job(job_id, job_manager) if estimates is None else estimates().get(job_id)
+        if estimate is not None:
+            response.queue_position = estimate["queue_position"]
+            response.eta_seconds = estimate["eta_seconds"]
+    return response
+
+
+def _job_status_response(job_id: str, progress: ProgressModel) -> ProgressResponse:
+    """Status response for a single job, with the state of an on-demand render."""
+    response = _progress_response(job_id, progress)
+    meta = job_manager.get_job_meta(job_id) or {}
+    response.render_state = meta.get("render_state")
+    response.render_error = meta.get("render_error")
+    return response
+
+
+def _discard_job(job_id: str) -> None:
+    """Remove a job that was rejected before it was queued."""
+    progress_store.evict(job_id)
+    job_manager.delete_job(job_id)
+
+
+def _create_job(audio_filename: str, message: str, **fields) -> Tuple[str, Path]:
+    """
+    Create a job with its metadata and progress entry.
+    
+    Like every storage-touching helper here, this blocks on the storage
+    backend, so async routes call it through run_in_threadpool.
+    
+    Returns:
+        (job_id, path the source audio is saved to)
+    """
+    job_id = job_manager.create_job(audio_filename)
+    job_manager.update_job_meta(job_id, **fields)
+    progress_store.create_job(job_id, message=message)
+    return job_id, job_manager.get_source_audio_path(job_id)
+
+
+def _store_upload(job_id: str, kind: str, path: Path, digest: str, size: int, elapsed: float) -> None:
+    """Store a saved upload and record its saving time."""
+    job_manager.store_artifact(job_id, path, digest)
+    _record_upload(job_id, kind, size, elapsed)
+
+
+async def _admit_audio(job_id: str, audio_path: Path) -> None:
+    """
+    Probe a saved upload's headers before it is queued.
+    
+    Stream details are recorded in the job metadata for scheduling and tier
+    routing. Files that are not decodable audio are discarded with their job.
+    
+    Raises:
+        HTTPException: 400 if the file is not accepted audio
+    """
+    try:
+        info = await run_in_threadpool(probe_audio, audio_path)
+    except ValueError as e:
+        await run_in_threadpool(_discard_job, job_id)
+        raise HTTPException(status_code=400, detail=f"Invalid audio file: {e}")
+    if info is None:
+        logger.warning(f"ffprobe unavailable, admitting {audio_path.name} unchecked")
+        return
+    fields = {
+        "audio_format": info["format"],
+        "audio_codec": info["codec"],
+        "audio_sample_rate": info["sample_rate"],
+        "audio_channels": info["channels"],
+    }
+    if info["duration"] is not None:
+        fields["audio_duration"] = info["duration"]
+    await run_in_threadpool(job_manager.update_job_meta, job_id, **fields)
+
+
+async def _artifact_response(
+    job_id: str, path: Path, media_type: str, not_found: str, filename: Optional[str] = None
+) -> Response:
+    """
+    Serve a job artifact.
+    
+    Backends with direct download URLs (S3) get a redirect to the stored
+    object; otherwise the file is served from the local job directory,
+    downloaded from storage first if this node does not have it. filename
+    names the download (default: the file's own name).
+    """
+    filename = filename or path.name
+    url = await run_in_threadpool(job_manager.artifact_url, job_id, path, media_type, filename)
+    if url:
+        return RedirectResponse(url, status_code=307)
+    if not await run_in_threadpool(job_manager.fetch_artifact, job_id, path):
+        raise HTTPException(status_code=404, detail=not_found)
+    return FileResponse(path, media_type=media_type, filename=filename)
+
+
+_ENTITY_TAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Return True if an If-None-Match header value matches etag.
+    
+    The header lists entity tags (or "*" for any). Tags are compared exactly
+    after dropping the weak prefix, as If-None-Match uses weak comparison.
+    """
+    for tag in _ENTITY_TAG.findall(if_none_match):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _mux_captioned(job_id: str, video_path: Path, subtitles_path: Path, captioned_path: Path) -> None:
+    """Package the captioned MP4 from the job's stored video and subtitles."""
+    job_manager.fetch_artifact(job_id, video_path)
+    job_manager.fetch_artifact(job_id, subtitles_path)
+    mux_subtitles(video_path, subtitles_path, captioned_path)
+    job_manager.store_artifact(job_id, captioned_path)
+
+
+def _record_upload(job_id: str, kind: str, size: int, elapsed: float) -> None:
+    """Export upload metrics and store the saving time in job metadata."""
+    UPLOAD_BYTES.labels(kind=kind).inc(size)
+    if elapsed > 0:
+        UPLOAD_THROUGHPUT.observe(size / elapsed)
+    STAGE_DURATION.labels(stage=JobStage.SAVING.value).observe(elapsed)
+    meta = job_manager.get_job_meta(job_id) or {}
+    timings = meta.get("stage_timings", {})
+    timings[JobStage.SAVING.value] = round(timings.get(JobStage.SAVING.value, 0.0) + elapsed, 6)
+    job_manager.update_job_meta(job_id, stage_timings=timings)
 
 
 @router.post("/convert", response_model=ConvertResponse)
 async def convert_audio_to_video(
-    background_tasks: BackgroundTasks,
-    audio: UploadFile = File(..., description="Audio file (.m4a)"),
-    image: UploadFile = File(None, description="Optional background image (.jpg, .png)")
+    request: Request,
+    response: Response,
+    audio: UploadFile = File(..., description="Audio file (.m4a, .mp3, .wav, .flac, .ogg, .opus)"),
+    image: UploadFile = File(None, description="Optional background image (.jpg, .png)"),
+    profile: bool = Form(False, description="Capture a profile for this job"),
+    tier: Optional[str] = Form(None, description="Speed/quality tier: auto, fast, balanced or accurate"),
+    embed_subtitles: bool = Form(False, description="Also package an MP4 with a soft subtitle track"),
+    renditions: Optional[str] = Form(None, description="Comma-separated video renditions: 360p, 720p, 1080p"),
+    outputs: str = Form("video", pattern="^(video|transcript)$", description="video, or transcript to skip rendering"),
+    render: Optional[str] = Form(None, pattern="^(eager|lazy)$", description="lazy renders on the first video request"),
+    callback_url: Optional[str] = Form(None, description="URL that receives signed completion webhooks")
 ):
     """
     Convert audio file to video with transcription.
@@ -45,16 +345,40 @@ async def convert_audio_to_video(
     Processing runs in the background. Use GET /jobs/{job_id}/status to check progress.
     
     Args:
-        audio: Audio file (.m4a format, < 100MB)
+        audio: Audio file (.m4a, .mp3, .wav, .flac, .ogg or .opus, < 100MB)
         image: Optional background image (.jpg or .png)
+        profile: Profile this job (see GET /jobs/{job_id}/profile)
+        tier: Speed/quality tier (default: auto routing)
+        embed_subtitles: Package the captioned MP4 during processing
+        renditions: Extra video sizes rendered in the same pass (default:
+            A2V_RENDITIONS); served with GET /jobs/{job_id}/video?rendition=
+        outputs: "transcript" produces only the transcript and subtitles
+        render: "lazy" defers rendering to the first GET /jobs/{job_id}/video
+            (default: A2V_RENDER_MODE)
+        callback_url: Receives job.succeeded or job.failed instead of
+            polling GET /jobs/{job_id}/status
+        
+    A repeated request with the same Idempotency-Key header returns the
+    original response without creating another job.
         
     Returns:
         ConvertResponse with job_id and URLs
     """
+    reservation = await _reserve_idempotency_key(
+        request, [audio, image],
+        {"profile": profile, "tier": tier, "embed_subtitles": embed_subtitles, "renditions": renditions,
+         "outputs": outputs, "render": render, "callback_url": callback_url}
+    )
+    if reservation and reservation.response is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return ConvertResponse(**reservation.response)
     try:
         # Validate files
         FileHandler.validate_audio_file(audio)
         FileHandler.validate_image_file(image)
+        requested_tier = _validate_tier(tier)
+        requested_renditions = _validate_renditions(renditions)
+        callback_url = _validate_callback_url(callback_url)
         
         # Check FFmpeg availability
         if not check_ffmpeg():
@@ -63,39 +387,60 @@ async def convert_audio_to_video(
                 detail="FFmpeg is not available. Please install FFmpeg."
             )
         
-        # Create job
-        job_id = job_manager.create_job(audio.filename)
+        # Create job and initialize progress
+        job_id, audio_path = await run_in_threadpool(
+            _create_job,
+            audio.filename,
+            "Uploading files...",
+            requested_tier=requested_tier,
+            profile=should_profile(profile),
+            embed_subtitles=embed_subtitles,
+            requested_renditions=requested_renditions,
+            outputs=outputs,
+            render_mode=render or RENDER_MODE,
+            callback_url=callback_url,
+            client_id=_client_id(request)
+        )
         logger.info(f"Created job {job_id}")
         
-        # Initialize progress
-        progress_store.create_job(job_id, message="Uploading files...")
-        
         # Save uploaded files
-        audio_path = job_manager.get_source_audio_path(job_id)
-        await FileHandler.save_audio_file(audio, audio_path)
+        save_start = time.perf_counter()
+        audio_hash = hashlib.sha256()
+        audio_size = await FileHandler.save_audio_file(audio, audio_path, audio_hash)
+        await run_in_threadpool(
+            _store_upload, job_id, "audio", audio_path, audio_hash.hexdigest(), audio_size,
+            time.perf_counter() - save_start
+        )
         logger.info(f"Saved source audio file: {audio_path}")
+        await _admit_audio(job_id, audio_path)
         
         image_path = None
         if image and image.filename:
-            image_path = job_manager.get_background_image_path(job_id)
-            await FileHandler.save_image_file(image, image_path)
+            save_start = time.perf_counter()
+            image_path = await run_in_threadpool(job_manager.get_background_image_path, job_id)
+            image_hash = hashlib.sha256()
+            await FileHandler.save_image_file(image, image_path, image_hash)
+            await run_in_threadpool(
+                _store_upload, job_id, "image", image_path, image_hash.hexdigest(), image_path.stat().st_size,
+                time.perf_counter() - save_start
+            )
             logger.info(f"Saved background image file: {image_path}")
         
         # Start background processing
-        if os.getenv("A2V_TEST_MODE") == "1":
-            process_job(job_id, job_manager, audio_path, image_path)
-        else:
-            background_tasks.add_task(process_job, job_id, job_manager, audio_path, image_path)
+        await run_in_threadpool(dispatch_job, job_id, job_manager, audio_path, image_path)
         
         # Return response immediately
-        return ConvertResponse(
+        result = ConvertResponse(
             job_id=job_id,
-            resource_base_name=job_manager.get_resource_base_name(job_id),
+            resource_base_name=await run_in_threadpool(job_manager.get_resource_base_name, job_id),
             video_url=f"/api/jobs/{job_id}/video",
             transcript_json_url=f"/api/jobs/{job_id}/transcript/json",
             transcript_vtt_url=f"/api/jobs/{job_id}/transcript/vtt",
             processing="local-only"
         )
+        if reservation:
+            reservation.complete(result.model_dump())
+        return result
         
     except HTTPException:
         raise
@@ -105,58 +450,302 @@ async def convert_audio_to_video(
             status_code=500,
             detail=f"Conversion setup failed: {str(e)}"
         )
+    finally:
+        if reservation:
+            reservation.release()
+
+
+# Serializes on-demand render requests, so each job is dispatched once
+_on_demand_lock = threading.Lock()
+
+
+def _render_on_demand(job_id: str, meta: dict) -> JSONResponse:
+    """
+    Start rendering a lazy job's video unless it is already on its way.
+    
+    A queued or running job only gets render_requested set; its render
+    stage checks the flag when it is reached. A finished job is dispatched
+    again as a render-only run: every stage but the render (and mux) is a
+    checkpoint hit, and its progress is reported as render_state, so the
+    job itself stays succeeded even if the render fails. A failed render is
+    attempted again on the next request.
+    
+    Returns:
+        202 with the job's progress and render state
+        
+    Raises:
+        HTTPException: 404 if the job does not exist or failed before rendering
+    """
+    with _on_demand_lock:
+        progress = _get_progress(job_id)
+        if progress is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if progress.state == JobState.FAILED:
+            raise HTTPException(status_code=404, detail="Video not found")
+        meta = job_manager.get_job_meta(job_id) or meta
+        if progress.state in (JobState.QUEUED, JobState.RUNNING):
+            if not meta.get("render_requested"):
+                job_manager.update_job_meta(job_id, render_requested=True)
+        elif meta.get("render_state") not in (JobState.QUEUED.value, JobState.RUNNING.value):
+            logger.info(f"Rendering video for job {job_id} on demand")
+            job_manager.update_job_meta(
+                job_id, render_requested=True, render_state=JobState.QUEUED.value, render_error=None
+            )
+            audio_path = job_manager.get_source_audio_path(job_id)
+            image_path = job_manager.get_background_image_path(job_id)
+            has_image = job_manager.has_artifact(job_id, image_path)
+            dispatch_job(job_id, job_manager, audio_path, image_path if has_image else None)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=_job_status_response(job_id, _get_progress(job_id)).model_dump(mode="json"),
+        headers={"Location": f"/api/jobs/{job_id}/status", "Retry-After": "5"}
+    )
 
 
 @router.get("/jobs/{job_id}/video")
-async def get_video(job_id: str):
-    """Serve the rendered video file."""
+async def get_video(
+    job_id: str,
+    subtitles: str = Query("none", pattern="^(none|embedded)$"),
+    rendition: Optional[str] = Query(None, description="Rendition to serve (default: 720p)")
+):
+    """
+    Serve the rendered video file.
+    
+    rendition selects one of the sizes requested with the job (see
+    job_meta.json "renditions"). subtitles=embedded serves the variant with
+    a soft mov_text subtitle track, remuxing it from the rendered video on
+    first request if it was not packaged during processing; it is only
+    available for the default rendition.
+    
+    Jobs submitted with render=lazy are rendered on the first request: it
+    answers 202 with the job's progress while the render runs.
+    """
+    extra_rendition = rendition is not None and rendition != PRIMARY_RENDITION
+    if extra_rendition and rendition not in RENDITIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown rendition {rendition!r}. Allowed: {', '.join(RENDITIONS)}"
+        )
+    if extra_rendition and subtitles == "embedded":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Embedded subtitles are only available for the {PRIMARY_RENDITION} rendition"
+        )
+    
+    video = await run_in_threadpool(_resolve_video, job_id, rendition if extra_rendition else None, subtitles)
+    if isinstance(video, Response):
+        return video
+    return await _artifact_response(job_id, video, "video/mp4", "Video not found")
+
+
+def _resolve_video(job_id: str, rendition: Optional[str], subtitles: str) -> Union[Path, Response]:
+    """
+    Find the video file GET /jobs/{job_id}/video serves, muxing subtitles if needed.
+    
+    Returns:
+        The video path, or the 202 response of an on-demand render
+        
+    Raises:
+        HTTPException: 404 if the video or rendition does not exist, 500 if
+            the subtitle mux fails
+    """
+    meta = job_manager.get_job_meta(job_id) or {}
+    if meta.get("outputs") == TRANSCRIPT_OUTPUTS:
+        raise HTTPException(status_code=404, detail="Job was submitted with outputs=transcript and has no video")
     video_path = job_manager.get_rendered_video_path(job_id)
+    if meta.get("render_mode") == LAZY_RENDER:
+        if not job_manager.has_artifact(job_id, video_path):
+            return _render_on_demand(job_id, meta)
+        meta = job_manager.get_job_meta(job_id) or {}
+    
+    if rendition is not None:
+        filename = (meta.get("renditions") or {}).get(rendition)
+        if filename is None:
+            raise HTTPException(status_code=404, detail=f"Rendition {rendition} not found")
+        video_path = job_manager.get_job_dir(job_id) / filename
     
-    if not video_path.exists():
+    if not job_manager.has_artifact(job_id, video_path):
         raise HTTPException(status_code=404, detail="Video not found")
     
-    return FileResponse(
-        video_path,
-        media_type="video/mp4",
-        filename=video_path.name
-    )
+    if subtitles == "embedded":
+        captioned_path = job_manager.get_captioned_video_path(job_id)
+        if not job_manager.has_artifact(job_id, captioned_path):
+            subtitles_path = job_manager.get_subtitles_path(job_id)
+            if not job_manager.has_artifact(job_id, subtitles_path):
+                raise HTTPException(status_code=404, detail="Subtitles not found")
+            try:
+                _mux_captioned(job_id, video_path, subtitles_path, captioned_path)
+            except (RuntimeError, FileNotFoundError) as e:
+                logger.error(f"Subtitle mux failed for job {job_id}: {e}")
+                raise HTTPException(status_code=500, detail="Failed to embed subtitles")
+        video_path = captioned_path
+    return video_path
+
+
+@router.post("/jobs/{job_id}/retry", response_model=ProgressResponse)
+async def retry_job(
+    job_id: str,
+    image: UploadFile = File(None, description="Optional replacement background image (.jpg, .png)")
+):
+    """
+    Re-run a job's failed or invalidated stages.
+    
+    Stages whose checkpoint inputs and artifacts are unchanged are skipped,
+    so replacing the background image re-renders without re-transcribing.
+    
+    Args:
+        image: Optional new background image
+        
+    Returns:
+        ProgressResponse for the re-queued job
+    """
+    audio_path, image_path = await run_in_threadpool(_retry_paths, job_id)
+    if image and image.filename:
+        FileHandler.validate_image_file(image)
+        image_hash = hashlib.sha256()
+        await FileHandler.save_image_file(image, image_path, image_hash)
+        await run_in_threadpool(job_manager.store_artifact, job_id, image_path, image_hash.hexdigest())
+        logger.info(f"Replaced background image for job {job_id}")
+    
+    return await run_in_threadpool(_requeue_job, job_id, audio_path, image_path)
+
+
+def _retry_paths(job_id: str) -> Tuple[Path, Path]:
+    """
+    Check that a job can be retried.
+    
+    Returns:
+        (source audio path, background image path)
+        
+    Raises:
+        HTTPException: 404 for unknown jobs, 409 for active jobs or jobs
+            whose source audio is gone
+    """
+    if not job_manager.job_exists(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    progress = _get_progress(job_id)
+    if progress is not None and progress.state in (JobState.QUEUED, JobState.RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is {progress.state.value}")
+    
+    audio_path = job_manager.get_source_audio_path(job_id)
+    if not job_manager.has_artifact(job_id, audio_path):
+        raise HTTPException(status_code=409, detail="Source audio is no longer available")
+    return audio_path, job_manager.get_background_image_path(job_id)
+
+
+def _requeue_job(job_id: str, audio_path: Path, image_path: Path) -> ProgressResponse:
+    """Queue a retried job and return its progress."""
+    progress_store.create_job(job_id, message="Retry queued")
+    has_image = job_manager.has_artifact(job_id, image_path)
+    dispatch_job(job_id, job_manager, audio_path, image_path if has_image else None)
+    return _progress_response(job_id, _get_progress(job_id))
 
 
 @router.get("/jobs/{job_id}/transcript/json")
 async def get_transcript_json(job_id: str):
     """Serve the transcript segments JSON file."""
-    transcript_path = job_manager.get_transcript_segments_path(job_id)
-    
-    if not transcript_path.exists():
-        raise HTTPException(status_code=404, detail="Transcript not found")
-    
-    return FileResponse(
-        transcript_path,
-        media_type="application/json",
-        filename=transcript_path.name
-    )
+    transcript_path = await run_in_threadpool(job_manager.get_transcript_segments_path, job_id)
+    return await _artifact_response(job_id, transcript_path, "application/json", "Transcript not found")
 
 
 @router.get("/jobs/{job_id}/transcript/vtt")
 async def get_transcript_vtt(job_id: str):
     """Serve the subtitles VTT file."""
-    vtt_path = job_manager.get_subtitles_path(job_id)
+    vtt_path = await run_in_threadpool(job_manager.get_subtitles_path, job_id)
+    return await _artifact_response(job_id, vtt_path, "text/vtt", "Subtitles not found")
+
+
+@router.get("/jobs/{job_id}/waveform")
+async def get_waveform(request: Request, job_id: str, level: int = Query(0, ge=0)):
+    """
+    Serve one zoom level of the job's waveform peaks.
+    
+    The body is int8 (min, max) pairs, one per peak. Level 0 is the coarsest
+    overview; X-Waveform-Levels gives the number of levels and
+    X-Waveform-Samples-Per-Peak / X-Waveform-Sample-Rate the time scale.
+    Responses carry an ETag derived from the peaks file's content hash and
+    answer If-None-Match with 304.
+    """
+    waveform_path = await run_in_threadpool(job_manager.get_waveform_path, job_id)
+    # Levels are read with seeks, so remote peaks files are cached locally
+    if not await run_in_threadpool(job_manager.fetch_artifact, job_id, waveform_path):
+        raise HTTPException(status_code=404, detail="Waveform not found")
+    
+    meta = await run_in_threadpool(job_manager.get_job_meta, job_id)
+    digest = ((meta or {}).get("blobs") or {}).get(waveform_path.name)
+    if digest is None:
+        stat = waveform_path.stat()
+        digest = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    etag = f'"{digest[:32]}-{level}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    revalidated = _etag_matches(request.headers.get("if-none-match", ""), etag)
+    # Client cache: a hit is a revalidation answered without reading peaks
+    record_cache_lookup("waveform", revalidated)
+    if revalidated:
+        return Response(status_code=304, headers=cache_headers)
+    
+    try:
+        peaks = await run_in_threadpool(read_level, waveform_path, level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return Response(
+        content=peaks["data"],
+        media_type="application/octet-stream",
+        headers={
+            **cache_headers,
+            "X-Waveform-Levels": str(peaks["levels"]),
+            "X-Waveform-Level": str(level),
+            "X-Waveform-Peaks": str(peaks["peaks"]),
+            "X-Waveform-Samples-Per-Peak": str(peaks["samples_per_peak"]),
+            "X-Waveform-Sample-Rate": str(peaks["sample_rate"]),
+        }
+    )
+
+
+@router.get("/jobs/{job_id}/profile")
+async def get_job_profile(
+    job_id: str,
+    format: str = Query("json", pattern="^(json|pstats|speedscope)$")
+):
+    """
+    Serve a profiled job's report.
     
-    if not vtt_path.exists():
-        raise HTTPException(status_code=404, detail="Subtitles not found")
+    format=json returns the stage timeline, FFmpeg -benchmark stats and top
+    functions; pstats and speedscope return the raw profile files.
+    """
+    filenames = {
+        "json": (PROFILE_REPORT_FILENAME, "application/json"),
+        "pstats": (PROFILE_STATS_FILENAME, "application/octet-stream"),
+        "speedscope": (PROFILE_SPEEDSCOPE_FILENAME, "application/json"),
+    }
+    filename, media_type = filenames[format]
+    profile_path = job_manager.get_job_dir(job_id) / filename
+    base_name = await run_in_threadpool(job_manager.get_resource_base_name, job_id)
     
-    return FileResponse(
-        vtt_path,
-        media_type="text/vtt",
-        filename=vtt_path.name
+    return await _artifact_response(
+        job_id,
+        profile_path,
+        media_type,
+        "Profile not found",
+        filename=f"{base_name}.{filename}"
     )
 
 
 @router.post("/batch/convert", response_model=BatchConvertResponse)
 async def batch_convert_audio_to_video(
-    background_tasks: BackgroundTasks,
-    audios: List[UploadFile] = File(..., description="Audio files (.m4a)"),
-    image: UploadFile = File(None, description="Optional shared background image (.jpg, .png)")
+    request: Request,
+    response: Response,
+    audios: List[UploadFile] = File(..., description="Audio files (.m4a, .mp3, .wav, .flac, .ogg, .opus)"),
+    image: UploadFile = File(None, description="Optional shared background image (.jpg, .png)"),
+    profile: bool = Form(False, description="Capture a profile for every job in the batch"),
+    tier: Optional[str] = Form(None, description="Speed/quality tier: auto, fast, balanced or accurate"),
+    embed_subtitles: bool = Form(False, description="Also package an MP4 with a soft subtitle track"),
+    renditions: Optional[str] = Form(None, description="Comma-separated video renditions: 360p, 720p, 1080p"),
+    outputs: str = Form("video", pattern="^(video|transcript)$", description="video, or transcript to skip rendering"),
+    render: Optional[str] = Form(None, pattern="^(eager|lazy)$", description="lazy renders on the first video request"),
+    callback_url: Optional[str] = Form(None, description="URL that receives signed completion webhooks")
 ):
     """
     Convert multiple audio files to video with transcription.
@@ -165,15 +754,36 @@ async def batch_convert_audio_to_video(
     Use GET /batch/{batch_id}/status to check progress for all jobs.
     
     Args:
-        audios: List of audio files (.m4a format, < 100MB each)
+        audios: List of audio files (.m4a, .mp3, .wav, .flac, .ogg or .opus, < 100MB each)
         image: Optional shared background image (.jpg or .png) for all jobs
+        profile: Profile every job in the batch
+        tier: Speed/quality tier for every job (default: auto routing)
+        embed_subtitles: Package a captioned MP4 for every job
+        renditions: Extra video sizes for every job (default: A2V_RENDITIONS)
+        outputs: "transcript" produces only transcripts and subtitles
+        render: "lazy" defers each job's render to its first video request
+        callback_url: Receives each job's webhook and batch.completed
+        
+    A repeated request with the same Idempotency-Key header returns the
+    original response without creating another batch.
         
     Returns:
         BatchConvertResponse with batch_id and list of jobs
     """
+    reservation = await _reserve_idempotency_key(
+        request, [*audios, image],
+        {"profile": profile, "tier": tier, "embed_subtitles": embed_subtitles, "renditions": renditions,
+         "outputs": outputs, "render": render, "callback_url": callback_url}
+    )
+    if reservation and reservation.response is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return BatchConvertResponse(**reservation.response)
     try:
         if not audios:
             raise HTTPException(status_code=400, detail="At least one audio file is required")
+        requested_tier = _validate_tier(tier)
+        requested_renditions = _validate_renditions(renditions)
+        callback_url = _validate_callback_url(callback_url)
         
         # Check FFmpeg availability
         if not check_ffmpeg():
@@ -184,54 +794,68 @@ async def batch_convert_audio_to_video(
         
         # Generate batch ID
         batch_id = str(uuid.uuid4())
+        client_id = _client_id(request)
         logger.info(f"Created batch {batch_id} with {len(audios)} files")
         
         # Validate and process each audio file
         jobs = []
-        image_path = None
+        image_digest = None
         
-        # Save shared image if provided
+        # Store the shared image once; each job gets a hardlink to the blob
         if image and image.filename:
             FileHandler.validate_image_file(image)
-            # Save to a temporary location, will be copied to each job
-            temp_image_path = Path(f"/tmp/batch_{batch_id}_image.jpg")
-            await FileHandler.save_image_file(image, temp_image_path)
-            image_path = temp_image_path
+            staged_path = job_manager.blob_store.tmp_path()
+            image_hash = hashlib.sha256()
+            await FileHandler.save_image_file(image, staged_path, image_hash)
+            image_digest = job_manager.blob_store.put(staged_path, image_hash.hexdigest())
         
+        pending = []
         for audio_file in audios:
+            job_id = None
             try:
                 # Validate audio file
                 FileHandler.validate_audio_file(audio_file)
                 
-                # Create job
-                job_id = job_manager.create_job(audio_file.filename)
+                # Create job and initialize progress
+                job_id, audio_path = await run_in_threadpool(
+                    _create_job,
+                    audio_file.filename,
+                    "Uploading file...",
+                    requested_tier=requested_tier,
+                    profile=should_profile(profile),
+                    embed_subtitles=embed_subtitles,
+                    requested_renditions=requested_renditions,
+                    outputs=outputs,
+                    render_mode=render or RENDER_MODE,
+                    callback_url=callback_url,
+                    client_id=client_id,
+                    batch_id=batch_id
+                )
                 logger.info(f"Created job {job_id} in batch {batch_id}")
-                
-                # Initialize progress
-                progress_store.create_job(job_id, message="Uploading file...")
                 progress_store.add_to_batch(batch_id, job_id)
                 
                 # Save audio file
-                audio_path = job_manager.get_source_audio_path(job_id)
-                await FileHandler.save_audio_file(audio_file, audio_path)
+                save_start = time.perf_counter()
+                audio_hash = hashlib.sha256()
+                audio_size = await FileHandler.save_audio_file(audio_file, audio_path, audio_hash)
+                await run_in_threadpool(
+                    _store_upload, job_id, "audio", audio_path, audio_hash.hexdigest(), audio_size,
+                    time.perf_counter() - save_start
+                )
                 logger.info(f"Saved source audio file: {audio_path}")
+                await _admit_audio(job_id, audio_path)
                 
-                # Copy shared image to job directory if provided
+                # Link the shared image into the job directory if provided
                 job_image_path = None
-                if image_path and image_path.exists():
-                    job_image_path = job_manager.get_background_image_path(job_id)
-                    import shutil
-                    shutil.copy2(image_path, job_image_path)
-                    logger.info(f"Copied background image to job: {job_image_path}")
+                if image_digest:
+                    job_image_path = await run_in_threadpool(_link_shared_image, job_id, image_digest)
+                    logger.info(f"Linked background image to job: {job_image_path}")
                 
-                # Start background processing
-                if os.getenv("A2V_TEST_MODE") == "1":
-                    process_job(job_id, job_manager, audio_path, job_image_path)
-                else:
-                    background_tasks.add_task(process_job, job_id, job_manager, audio_path, job_image_path)
+                # Queue only once every file in the batch has been admitted
+                pending.append((job_id, audio_path, job_image_path))
                 
                 # Add to response
-                resource_base_name = job_manager.get_resource_base_name(job_id)
+                resource_base_name = await run_in_threadpool(job_manager.get_resource_base_name, job_id)
                 jobs.append(BatchJobItem(
                     job_id=job_id,
                     filename=resource_base_name,
@@ -243,23 +867,25 @@ async def batch_convert_audio_to_video(
                 ))
                 
             except HTTPException:
+                # Drop the admitted jobs and the one rejected mid-upload
+                rejected = [job_id] if job_id is not None else []
+                for discarded in [queued for queued, _, _ in pending] + rejected:
+                    await run_in_threadpool(_discard_job, discarded)
                 raise
             except Exception as e:
                 logger.error(f"Failed to process audio file {audio_file.filename}: {e}", exc_info=True)
                 # Continue with other files, but log the error
                 # Could optionally add failed job to response
         
-        # Clean up temporary image if used
-        if image_path and image_path.exists():
-            try:
-                image_path.unlink()
-            except:
-                pass
+        await run_in_threadpool(_queue_batch, batch_id, [job.job_id for job in jobs], pending)
         
-        return BatchConvertResponse(
+        result = BatchConvertResponse(
             batch_id=batch_id,
             jobs=jobs
         )
+        if reservation:
+            reservation.complete(result.model_dump())
+        return result
         
     except HTTPException:
         raise
@@ -269,48 +895,186 @@ async def batch_convert_audio_to_video(
             status_code=500,
             detail=f"Batch conversion setup failed: {str(e)}"
         )
+    finally:
+        if reservation:
+            reservation.release()
+
+
+def _link_shared_image(job_id: str, digest: str) -> Path:
+    """Link a batch's stored background image into a job; returns its path."""
+    image_path = job_manager.get_background_image_path(job_id)
+    job_manager.link_artifact(job_id, digest, image_path)
+    return image_path
+
+
+def _queue_batch(batch_id: str, job_ids: List[str], pending: List[Tuple[str, Path, Optional[Path]]]) -> None:
+    """Write a batch's manifest, then dispatch its admitted jobs."""
+    # Written first: a job finishing early checks the manifest for batch.completed
+    job_manager.write_batch(batch_id, job_ids)
+    for job_id, audio_path, image_path in pending:
+        dispatch_job(job_id, job_manager, audio_path, image_path)
 
 
 @router.get("/batch/{batch_id}/status", response_model=BatchStatusResponse)
-async def get_batch_status(batch_id: str):
-    """Get processing status for all jobs in a batch."""
-    job_ids = progress_store.get_batch_jobs(batch_id)
+def get_batch_status(
+    batch_id: str,
+    since: int = Query(0, ge=0, description="Cursor from a previous response; only jobs changed after it are returned")
+):
+    """
+    Get processing status for the jobs in a batch.
     
-    if not job_ids:
-        raise HTTPException(status_code=404, detail="Batch not found")
+    Without `since` every job is returned. Passing the `cursor` of the previous
+    response returns only the jobs whose progress changed since then, so
+    polling cost follows the rate of change rather than the batch size.
+    `counts` always covers the whole batch.
+    
+    In distributed mode progress lives in the shared job storage rather than
+    this process, so the full batch is returned regardless of `since`; the
+    same applies once a finished batch has been evicted from memory.
     
+    A plain function, so FastAPI runs it in the threadpool: it reads job
+    documents from the storage backend.
+    """
+    feed = None if is_distributed() else progress_store.get_batch_changes(batch_id, since)
+    if feed is None:
+        # Workers own progress, or the batch has been evicted from memory
+        job_ids = _batch_job_ids(batch_id)
+        if not job_ids:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        cursor, changed, counts = 0, [(job_id, None) for job_id in job_ids], None
+    else:
+        cursor, changed, counts = feed
+    
+    # One queue snapshot for the whole batch, taken once a pending job needs it
+    snapshot: Optional[Dict[str, Dict]] = None
+
+    def estimates() -> Dict[str, Dict]:
+        nonlocal snapshot
+        if snapshot is None:
+            snapshot = estimate_jobs(job_manager)
+        return snapshot
+
     jobs = []
-    for job_id in job_ids:
-        progress = progress_store.get(job_id)
-        if progress:
-            resource_base_name = job_manager.get_resource_base_name(job_id)
-            jobs.append(BatchJobStatus(
-                job_id=job_id,
-                filename=resource_base_name,
-                resource_base_name=resource_base_name,
-                status=ProgressResponse(**progress.to_dict())
-            ))
+    for job_id, progress in changed:
+        progress = progress or _get_progress(job_id)
+        if progress is None:
+            continue
+        resource_base_name = job_manager.get_resource_base_name(job_id)
+        jobs.append(BatchJobStatus(
+            job_id=job_id,
+            filename=resource_base_name,
+            resource_base_name=resource_base_name,
+            status=_progress_response(job_id, progress, estimates)
+        ))
+    if counts is None:
+        counts = {}
+        for job in jobs:
+            counts[job.status.state] = counts.get(job.status.state, 0) + 1
     
     return BatchStatusResponse(
         batch_id=batch_id,
-        jobs=jobs
+        jobs=jobs,
+        counts=counts,
+        cursor=cursor
+    )
+
+
+@router.get("/batch/{batch_id}/archive")
+async def get_batch_archive(
+    batch_id: str,
+    include: str = Query(DEFAULT_ARCHIVE_ARTIFACTS, description="Comma-separated artifact types")
+):
+    """
+    Stream a ZIP of a batch's outputs.
+    
+    The archive is assembled on the fly: MP4 and other media are stored
+    uncompressed, text files are deflated, and nothing is buffered on disk.
+    Each job's files go in a folder named after its resource base name; files
+    that do not exist yet (unfinished jobs) are left out.
+    
+    Args:
+        include: Artifact types among video, captioned, subtitles,
+            transcript and audio
+    """
+    job_ids = await run_in_threadpool(_batch_job_ids, batch_id)
+    if not job_ids:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    kinds = [kind.strip() for kind in include.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in ARCHIVE_ARTIFACTS]
+    if not kinds or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid artifact types: {', '.join(unknown) or include!r}. "
+                   f"Allowed: {', '.join(ARCHIVE_ARTIFACTS)}"
+        )
+    
+    def entries():
+        for job_id in job_ids:
+            folder = job_manager.get_resource_base_name(job_id)
+            for kind in kinds:
+                path = getattr(job_manager, ARCHIVE_ARTIFACTS[kind])(job_id)
+                if job_manager.fetch_artifact(job_id, path):
+                    yield f"{folder}/{path.name}", path
+    
+    return StreamingResponse(
+        iter_zip(entries()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'}
     )
 
 
 @router.get("/jobs/{job_id}/status", response_model=ProgressResponse)
-async def get_job_status(job_id: str):
-    """Get processing status for a job."""
-    progress = progress_store.get(job_id)
+def get_job_status(job_id: str):
+    """
+    Get processing status for a job.
+    
+    Queued and running jobs include queue_position and eta_seconds,
+    predicted from the audio duration and observed real-time factors.
+    Lazy jobs rendering on demand report render_state (and render_error)
+    separately from the job's own state. Runs in the threadpool, as reading
+    persisted progress and metadata blocks on the storage backend.
+    """
+    progress = _get_progress(job_id)
     
     if progress is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return ProgressResponse(**progress.to_dict())
+    return _job_status_response(job_id, progress)
+
+
+@router.get("/webhooks/dead-letters", response_model=WebhookDeadLettersResponse)
+async def get_webhook_dead_letters(limit: int = Query(100, ge=1, le=1000)):
+    """
+    List webhook deliveries that failed every attempt, most recent first.
+    
+    Each entry carries the event payload, the callback URL and the last
+    error; `counts` gives the number of deliveries per state.
+    """
+    outbox = get_webhook_outbox(job_manager.base_dir)
+    records = await run_in_threadpool(outbox.dead_letters, limit)
+    return WebhookDeadLettersResponse(
+        dead_letters=[WebhookDeadLetter(**record) for record in records],
+        counts=await run_in_threadpool(outbox.counts)
+    )
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint.
+    
+    Reports model warm-up and FFmpeg version/codec readiness separately from
+    liveness (/health). Returns 503 until every component is ready.
+    """
+    report = readiness.snapshot()
+    status_code = 200 if report["ready"] else 503
+    return JSONResponse(status_code=status_code, content=report)
 
 
 @router.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness endpoint."""
     ffmpeg_available = check_ffmpeg()
     return {
         "status": "healthy",
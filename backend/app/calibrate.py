@@ -0,0 +1,329 @@
+"""Host calibration (python -m app.calibrate).
+
+Runs short transcription and encode trials over a parameter grid, measures
+the real-time factor of each against a quality floor and stores the fastest
+passing settings for this host in the host profile (see
+app.services.host_profile), which the services load at startup.
+
+- Transcription: every tier's model is tried with each compute type and
+  beam size up to the tier's own. Quality is 1 - word error rate against
+  the float32 transcript at the tier's beam size. The chosen balanced-tier
+  settings are then timed at increasing cpu_threads.
+- Encoding: each x264 preset encodes the same clip. Quality is the SSIM of
+  the output against the source frames.
+
+Trials use synthetic speech-like audio unless --audio gives a real
+recording; a short clip of real speech makes the accuracy floor meaningful.
+
+Usage:
+    python -m app.calibrate                 # calibrate and write the profile
+    python -m app.calibrate --first-boot    # only if this host has no entry yet
+"""
+import argparse
+import logging
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.host_profile import (
+    HOST_PROFILE_PATH, available_cpus, host_info, load_host_profile, save_host_profile
+)
+from app.services.synthetic import write_png, write_wav
+from app.services.tiers import DEFAULT_LANGUAGE, TIER_ORDER, TIERS, TierConfig
+from app.services.video_processor import RENDER_FPS, VIDEO_FILTER, video_codec_args
+
+logger = logging.getLogger(__name__)
+
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+BEAM_SIZES = (1, 2, 5)
+X264_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium")
+DEFAULT_MIN_ACCURACY = 0.95
+DEFAULT_MIN_SSIM = 0.97
+# Fewer threads win unless more are at least this much faster
+THREAD_GAIN_THRESHOLD = 0.05
+
+# (model, compute_type, cpu_threads, beam_size) -> (transcript text, seconds)
+TranscribeTrial = Callable[[str, str, int, int], Tuple[str, float]]
+# x264 preset -> (seconds, SSIM)
+EncodeTrial = Callable[[str], Tuple[float, float]]
+
+_SSIM_PATTERN = re.compile(r"All:([0-9.]+)")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref = re.findall(r"[\w']+", reference.lower())
+    hyp = re.findall(r"[\w']+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def choose_fastest(trials: List[Dict], min_quality: float) -> Optional[Dict]:
+    """Return the trial with the lowest RTF whose quality meets the floor."""
+    passing = [trial for trial in trials if trial["quality"] >= min_quality]
+    return min(passing, key=lambda trial: trial["rtf"]) if passing else None
+
+
+def calibrate_tier(
+    tier: TierConfig,
+    run: TranscribeTrial,
+    audio_seconds: float,
+    threads: int,
+    min_accuracy: float = DEFAULT_MIN_ACCURACY,
+    compute_types: Iterable[str] = COMPUTE_TYPES
+) -> Tuple[Dict, List[Dict]]:
+    """
+    Find the fastest compute type and beam size for a tier.
+
+    Returns:
+        (chosen settings, all trials); the float32 reference is chosen if
+        nothing else meets the accuracy floor
+    """
+    # The reference run also warms up the model files and allocator
+    reference, _ = run(tier.model, "float32", threads, tier.beam_size)
+    beams = sorted({beam for beam in BEAM_SIZES if beam <= tier.beam_size} | {tier.beam_size})
+    trials = []
+    for compute_type in compute_types:
+        for beam_size in beams:
+            text, seconds = run(tier.model, compute_type, threads, beam_size)
+            trials.append({
+                "kind": "transcribe",
+                "tier": tier.name,
+                "model": tier.model,
+                "compute_type": compute_type,
+                "beam_size": beam_size,
+                "cpu_threads": threads,
+                "rtf": round(seconds / audio_seconds, 4),
+                "quality": round(1.0 - word_error_rate(reference, text), 4),
+            })
+    best = choose_fastest(trials, min_accuracy) or next(
+        (t for t in trials if t["compute_type"] == "float32" and t["beam_size"] == tier.beam_size),
+        trials[-1],
+    )
+    chosen = {key: best[key] for key in ("model", "compute_type", "beam_size", "rtf", "quality")}
+    logger.info(f"Tier {tier.name}: {chosen['compute_type']}, beam {chosen['beam_size']} (RTF {chosen['rtf']})")
+    return chosen, trials
+
+
+def calibrate_threads(
+    run: TranscribeTrial,
+    settings: Dict,
+    audio_seconds: float,
+    max_threads: int
+) -> Tuple[Dict, List[Dict]]:
+    """
+    Time one transcription setting at increasing cpu_threads.
+
+    Returns:
+        ({"cpu_threads", "rtf"}, all trials)
+    """
+    counts = sorted({1 << power for power in range(max_threads.bit_length()) if 1 << power <= max_threads}
+                    | {max_threads})
+    trials = []
+    for threads in counts:
+        _, seconds = run(settings["model"], settings["compute_type"], threads, settings["beam_size"])
+        trials.append({"kind": "threads", "cpu_threads": threads, "rtf": round(seconds / audio_seconds, 4)})
+    fastest = min(trial["rtf"] for trial in trials)
+    best = next(t for t in trials if t["rtf"] <= fastest * (1 + THREAD_GAIN_THRESHOLD))
+    logger.info(f"Whisper: {best['cpu_threads']} threads (RTF {best['rtf']})")
+    return {"cpu_threads": best["cpu_threads"], "rtf": best["rtf"]}, trials
+
+
+def calibrate_encoding(
+    run: EncodeTrial,
+    clip_seconds: float,
+    presets: Iterable[str] = X264_PRESETS,
+    min_ssim: float = DEFAULT_MIN_SSIM
+) -> Tuple[Dict, List[Dict]]:
+    """
+    Find the fastest x264 preset whose output meets the SSIM floor.
+
+    Returns:
+        ({"preset", "rtf", "ssim"}, all trials); the slowest preset tried is
+        chosen if none meets the floor
+    """
+    trials = []
+    for preset in presets:
+        seconds, ssim = run(preset)
+        trials.append({"kind": "encode", "preset": preset, "rtf": round(seconds / clip_seconds, 4),
+                       "quality": round(ssim, 4)})
+    best = choose_fastest(trials, min_ssim) or trials[-1]
+    logger.info(f"Encoding: preset {best['preset']} (RTF {best['rtf']}, SSIM {best['quality']})")
+    return {"preset": best["preset"], "rtf": best["rtf"], "ssim": best["quality"]}, trials
+
+
+def whisper_trial(audio_path: Path) -> TranscribeTrial:
+    """Trial runner that transcribes audio_path with faster-whisper."""
+    from faster_whisper import WhisperModel
+
+    models: Dict[Tuple[str, str, int], WhisperModel] = {}
+
+    def run(model_name: str, compute_type: str, threads: int, beam_size: int) -> Tuple[str, float]:
+        key = (model_name, compute_type, threads)
+        if key not in models:
+            # One model at a time keeps memory flat across the grid
+            models.clear()
+            models[key] = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads)
+        start = time.perf_counter()
+        segments, _ = models[key].transcribe(str(audio_path), beam_size=beam_size, language=DEFAULT_LANGUAGE)
+        text = " ".join(segment.text for segment in segments)
+        return text, time.perf_counter() - start
+
+    return run
+
+
+def supported_compute_types() -> List[str]:
+    """Compute types CTranslate2 supports on this CPU."""
+    import ctranslate2
+
+    supported = ctranslate2.get_supported_compute_types("cpu")
+    return [compute_type for compute_type in COMPUTE_TYPES if compute_type in supported]
+
+
+def ffmpeg_trial(image_path: Path, work_dir: Path, clip_seconds: float, threads: int) -> EncodeTrial:
+    """Trial runner that encodes a still-image clip and scores it with SSIM."""
+    frames = str(int(clip_seconds * RENDER_FPS))
+    still = ["-loop", "1", "-framerate", str(RENDER_FPS), "-i", str(image_path)]
+
+    def run(preset: str) -> Tuple[float, float]:
+        output = work_dir / f"calibrate_{preset}.mp4"
+        cmd = ["ffmpeg", "-y", "-v", "error", *still, "-frames:v", frames, *video_codec_args(preset),
+               "-threads", str(threads), "-vf", VIDEO_FILTER, str(output)]
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, capture_output=True)
+        seconds = time.perf_counter() - start
+        score = subprocess.run(
+            ["ffmpeg", "-i", str(output), *still, "-frames:v", frames,
+             "-lavfi", f"[1:v]{VIDEO_FILTER},format=yuv420p[ref];[0:v][ref]ssim", "-f", "null", "-"],
+            check=True, capture_output=True, text=True,
+        )
+        output.unlink(missing_ok=True)
+        matches = _SSIM_PATTERN.findall(score.stderr)
+        return seconds, float(matches[-1]) if matches else 0.0
+
+    return run
+
+
+def run_calibration(args: argparse.Namespace) -> Dict:
+    """
+    Run every trial and build this host's profile entry.
+
+    Raises:
+        RuntimeError: If neither faster-whisper nor FFmpeg is available
+    """
+    cpus = len(available_cpus())
+    profile: Dict = {
+        "host": host_info(),
+        "calibrated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "trials": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="a2v-calibrate-") as tmp:
+        work_dir = Path(tmp)
+        if args.audio:
+            audio_path = Path(args.audio)
+        else:
+            audio_path = write_wav("speech", args.seconds, work_dir / "speech.wav")
+        profile["audio"] = str(args.audio or f"synthetic speech ({args.seconds:g}s)")
+
+        run = None
+        if not args.skip_transcription:
+            try:
+                run = whisper_trial(audio_path)
+                compute_types = supported_compute_types()
+            except ImportError:
+                logger.warning("faster-whisper is not installed; skipping transcription trials")
+        if run is not None:
+            duration = args.seconds if not args.audio else _audio_seconds(audio_path)
+            tiers = {}
+            for name in args.tiers:
+                tiers[name], trials = calibrate_tier(
+                    TIERS[name], run, duration, cpus, args.min_accuracy, compute_types
+                )
+                profile["trials"].extend(trials)
+            profile["tiers"] = tiers
+            reference = tiers.get("balanced") or next(iter(tiers.values()))
+            profile["whisper"], trials = calibrate_threads(run, reference, duration, cpus)
+            profile["trials"].extend(trials)
+
+        if shutil.which("ffmpeg") is None:
+            logger.warning("FFmpeg is not installed; skipping encode trials")
+        elif not args.skip_encoding:
+            image_path = write_png(work_dir / "background.png")
+            encode = ffmpeg_trial(image_path, work_dir, args.clip_seconds, cpus)
+            profile["encoding"], trials = calibrate_encoding(
+                encode, args.clip_seconds, args.presets, args.min_ssim
+            )
+            profile["trials"].extend(trials)
+
+    if "tiers" not in profile and "encoding" not in profile:
+        raise RuntimeError("Nothing to calibrate: faster-whisper and FFmpeg are both unavailable or skipped")
+    return profile
+
+
+def _audio_seconds(path: Path) -> float:
+    from app.services.media_probe import probe_duration
+
+    duration = probe_duration(path)
+    if not duration:
+        raise RuntimeError(f"Could not read the duration of {path}")
+    return duration
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Calibrate transcription and encoding settings for this host")
+    parser.add_argument("--output", default=HOST_PROFILE_PATH, help="Host profile file to update")
+    parser.add_argument("--first-boot", action="store_true",
+                        help="Do nothing if this host already has a profile entry")
+    parser.add_argument("--audio", help="Speech recording to transcribe (default: synthetic speech)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Length of the synthetic audio")
+    parser.add_argument("--clip-seconds", type=float, default=10.0, help="Length of the encode trials")
+    parser.add_argument("--tiers", nargs="+", default=TIER_ORDER, choices=TIER_ORDER)
+    parser.add_argument("--presets", nargs="+", default=list(X264_PRESETS))
+    parser.add_argument("--min-accuracy", type=float, default=DEFAULT_MIN_ACCURACY,
+                        help="Minimum 1 - WER against the float32 transcript")
+    parser.add_argument("--min-ssim", type=float, default=DEFAULT_MIN_SSIM,
+                        help="Minimum SSIM of encoded frames against the source")
+    parser.add_argument("--skip-transcription", action="store_true")
+    parser.add_argument("--skip-encoding", action="store_true")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if args.first_boot and load_host_profile(args.output):
+        logger.info(f"Host already calibrated in {args.output}; skipping")
+        return 0
+    try:
+        profile = run_calibration(args)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        logger.error(f"Calibration failed: {e}")
+        return 1
+    path = save_host_profile(profile, args.output)
+    logger.info(f"Wrote host profile for {profile['host']['key']} to {path}; restart the services to apply it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
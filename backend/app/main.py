@@ -1,10 +1,18 @@
 """Main FastAPI application."""
 import logging
 import os
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
-from app.api.routes import router
+from app.api import routes
+from app.api.routes import router, WHISPER_MODEL, WHISPER_MODEL_PATH
+from app.services.dispatcher import resume_interrupted_jobs
+from app.services.warmup import start_warmup
+from app.services.webhooks import start_webhook_delivery, stop_webhook_delivery
+from app.utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, PROMETHEUS_CONTENT_TYPE, registry
 
 # Configure logging
 logging.basicConfig(
@@ -13,11 +21,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Kick off model warm-up, webhook delivery and interrupted jobs without delaying startup."""
+    start_warmup(WHISPER_MODEL, WHISPER_MODEL_PATH or None)
+    start_webhook_delivery(routes.job_manager)
+    resume_interrupted_jobs(routes.job_manager)
+    yield
+    stop_webhook_delivery()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Audio2Video API",
     description="Local audio-to-video conversion with transcription",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -40,6 +59,46 @@ app.add_middleware(
 app.include_router(router, prefix="/api", tags=["conversion"])
 
 
+def _route_label(request: Request) -> str:
+    """Return the matched route template (e.g. /api/jobs/{job_id}/status)."""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    # Depending on the FastAPI version, routes from included routers report
+    # their template without the router prefix; restore it from the raw path.
+    path_parts = request.url.path.rstrip("/").split("/")
+    template_parts = template.rstrip("/").split("/")
+    prefix_len = len(path_parts) - len(template_parts)
+    if prefix_len > 0:
+        return "/".join(path_parts[:prefix_len + 1]) + template
+    return template
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe latency per route template."""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route_path = _route_label(request)
+        HTTP_REQUESTS.labels(method=request.method, route=route_path, status=str(status_code)).inc()
+        HTTP_REQUEST_DURATION.labels(method=request.method, route=route_path).observe(
+            time.perf_counter() - start
+        )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
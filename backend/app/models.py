@@ -42,6 +42,10 @@ class ProgressResponse(BaseModel):
     message: str
     updated_at: str  # ISO format datetime
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based while waiting for a worker
+    eta_seconds: Optional[float] = None  # Predicted seconds until completion
+    render_state: Optional[str] = None  # On-demand render: queued | running | succeeded | failed
+    render_error: Optional[str] = None
 
 
 class BatchJobItem(BaseModel):
@@ -72,4 +76,25 @@ class BatchJobStatus(BaseModel):
 class BatchStatusResponse(BaseModel):
     """Response model for batch status endpoint."""
     batch_id: str
-    jobs: List[BatchJobStatus]
+    jobs: List[BatchJobStatus]  # Only jobs changed after `since`, when given
+    counts: Dict[str, int] = {}  # Jobs per state across the whole batch
+    cursor: int = 0  # Pass as `since` on the next poll
+
+
+class WebhookDeadLetter(BaseModel):
+    """A webhook delivery that exhausted its attempts."""
+    id: int
+    event_id: str
+    event: str  # job.succeeded | job.failed | batch.completed
+    url: str
+    attempts: int
+    last_error: Optional[str] = None
+    created_at: float  # Epoch seconds
+    updated_at: float  # Epoch seconds of the last attempt
+    payload: Dict
+
+
+class WebhookDeadLettersResponse(BaseModel):
+    """Response model for the webhook dead-letter listing."""
+    dead_letters: List[WebhookDeadLetter]
+    counts: Dict[str, int] = {}  # Deliveries per state across the outbox
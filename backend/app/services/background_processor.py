@@ -1,15 +1,42 @@
-"""Background job processor for audio-to-video conversion."""
+"""Background job processor for audio-to-video conversion.
+
+The pipeline is a small DAG of stages (ingest, probe, transcribe, package,
+render and the optional subtitle mux). Each stage declares the upstream
+artifacts it consumes; its fingerprint over their hashes and its own
+parameters is stored with a completion marker in stages.json. Retried and
+resumed jobs skip every stage whose fingerprint and artifacts are unchanged,
+so e.g. a new background image re-renders without re-transcribing.
+
+Jobs submitted with outputs=transcript never render. Lazy jobs skip the
+render until a client asks for the video; the job is then dispatched again
+with render_requested set, and only the render (and mux) stages run. Such a
+render-only run reports through the job's render_state metadata and leaves
+the job's own (succeeded) state and webhooks alone, so a failed render does
+not fail a job whose transcript is fine.
+"""
 import json
 import logging
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app.models import TranscriptData, TranscriptSegment
+from app.services.cpu_budget import get_cpu_budget
+from app.services.media_probe import probe_duration
+from app.services.tiers import select_tier
 from app.services.transcription import transcribe_audio
-from app.services.video_processor import generate_video
+from app.services.video_processor import PRIMARY_RENDITION, generate_video, mux_subtitles
+from app.services.waveform import build_waveform
+from app.services.webhooks import notify_job_finished
+from app.utils.checkpoints import JobStatus, StageCheckpoints, fingerprint
 from app.utils.job_manager import JobManager
+from app.utils.metrics import JOBS_TOTAL, QUEUE_DEPTH, observe_queue_start, time_stage
+from app.utils.profiler import JobProfiler, PROFILE_FILENAMES
 from app.utils.progress_store import progress_store, JobState, JobStage
+from app.utils.rtf_model import get_rtf_model
 from app.utils.vtt_generator import generate_vtt
 
 logger = logging.getLogger(__name__)
@@ -18,160 +45,421 @@ logger = logging.getLogger(__name__)
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
 WHISPER_MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", "")
 FFMPEG_TIMEOUT = int(os.getenv("FFMPEG_TIMEOUT", "600"))
+# Mux the subtitles into a captioned MP4 for every job, not only on request
+EMBED_SUBTITLES = os.getenv("A2V_EMBED_SUBTITLES", "0") == "1"
+WAVEFORM_ENABLED = os.getenv("A2V_WAVEFORM", "1") == "1"
+
+# Job outputs: the video as well as the transcript, or only the transcript
+VIDEO_OUTPUTS = "video"
+TRANSCRIPT_OUTPUTS = "transcript"
+# Render modes: with the job, or on the first request for the video
+EAGER_RENDER = "eager"
+LAZY_RENDER = "lazy"
+RENDER_MODE = os.getenv("A2V_RENDER_MODE", EAGER_RENDER)
+
+
+@dataclass
+class StageContext:
+    """State shared by the stages of one job run."""
+    job_id: str
+    job_manager: JobManager
+    audio_path: Path
+    image_path: Optional[Path]
+    checkpoints: StageCheckpoints
+    timings: dict
+    profiler: Optional[JobProfiler] = None
+    # Set when this run must stop, e.g. its worker lost the job's lease
+    cancel: Optional[threading.Event] = None
+    # On-demand render of a finished job: progress goes to render_state
+    render_only: bool = False
+    _meta: Optional[dict] = field(default=None, init=False, repr=False)
+
+    @property
+    def meta(self) -> dict:
+        """Job metadata, fetched once per stage (see refresh_meta)."""
+        if self._meta is None:
+            self._meta = self.job_manager.get_job_meta(self.job_id) or {}
+        return self._meta
+
+    def refresh_meta(self) -> None:
+        """Re-read the metadata on next access, e.g. to see a render request."""
+        self._meta = None
+
+    def update_meta(self, **fields) -> None:
+        """Write metadata fields, keeping the cached copy current."""
+        self._meta = self.job_manager.update_job_meta(self.job_id, **fields)
+
+
+class JobCancelled(Exception):
+    """Raised between stages when a job run was cancelled."""
+
+
+# A stage returns its artifacts (name -> path) and small JSON values
+StageOutput = Tuple[Dict[str, Path], Dict]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of the job pipeline."""
+    name: str
+    run: Callable[[StageContext], StageOutput]
+    progress_stage: JobStage
+    percent: int
+    message: str
+    # Upstream "stage.artifact" references that feed the fingerprint
+    inputs: Tuple[str, ...] = ()
+    params: Callable[[StageContext], Dict] = field(default=lambda ctx: {})
+    enabled: Callable[[StageContext], bool] = field(default=lambda ctx: True)
+    timing_key: Optional[str] = None
+    # False for stages that only register existing files (ingest)
+    writes_artifacts: bool = True
+    # Optional outputs: a failure is recorded but does not fail the job
+    required: bool = True
+
+
+def _ingest(ctx: StageContext) -> StageOutput:
+    # Uploads received by another node are downloaded from storage
+    if not ctx.job_manager.fetch_artifact(ctx.job_id, ctx.audio_path):
+        raise FileNotFoundError(f"Audio file not found: {ctx.audio_path}")
+    artifacts = {"audio": ctx.audio_path}
+    if ctx.image_path and ctx.job_manager.fetch_artifact(ctx.job_id, ctx.image_path):
+        artifacts["image"] = ctx.image_path
+    return artifacts, {}
+
+
+def _probe(ctx: StageContext) -> StageOutput:
+    # Usually known from the upload-time admission probe
+    duration = ctx.meta.get("audio_duration")
+    if duration is None:
+        duration = probe_duration(ctx.audio_path)
+        if duration is not None:
+            ctx.update_meta(audio_duration=duration)
+    return {}, {"duration": duration}
+
+
+def _queue_depth(job_manager: JobManager) -> int:
+    """
+    Jobs waiting to run, for tier routing.
+    
+    Distributed workers read the broker; the in-process gauge only counts
+    jobs queued on this process's scheduler.
+    """
+    # Imported here because the dispatcher imports this module
+    from app.services.dispatcher import get_job_queue, is_distributed
+    if is_distributed():
+        return get_job_queue(job_manager).depth()
+    return int(QUEUE_DEPTH.value())
+
+
+def _transcribe(ctx: StageContext) -> StageOutput:
+    meta = ctx.meta
+    tier = select_tier(
+        meta.get("requested_tier"),
+        meta.get("audio_duration"),
+        _queue_depth(ctx.job_manager),
+        ctx.audio_path,
+        WHISPER_MODEL_PATH or None
+    )
+    ctx.update_meta(tier=tier)
+    budget = get_cpu_budget()
+    # Reserve the Whisper share so concurrent renders size themselves around it
+    with budget.lease("transcribe", threads=budget.whisper_settings()[0]):
+        segments = transcribe_audio(
+            ctx.audio_path,
+            model_name=tier["model"],
+            compute_type=tier["compute_type"],
+            beam_size=tier["beam_size"],
+            language=tier["language"],
+            vad_filter=tier["vad_filter"],
+            vad_min_silence_ms=tier["vad_min_silence_ms"]
+        )
+
+    transcript_data = TranscriptData(
+        version="1.0",
+        segments=[TranscriptSegment(**seg) for seg in segments]
+    )
+    transcript_segments_path = ctx.job_manager.get_transcript_segments_path(ctx.job_id)
+    with open(transcript_segments_path, 'w', encoding='utf-8') as f:
+        json.dump(transcript_data.model_dump(), f, indent=2, ensure_ascii=False)
+    logger.info(f"Generated transcript segments: {transcript_segments_path}")
+
+    _update_progress(ctx, percent=50, message=f"Transcription complete: {len(segments)} segments")
+    return {"transcript": transcript_segments_path}, {"segments": len(segments)}
+
+
+def _package(ctx: StageContext) -> StageOutput:
+    transcript_segments_path = ctx.job_manager.get_transcript_segments_path(ctx.job_id)
+    with open(transcript_segments_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f)["segments"]
+
+    subtitles_path = ctx.job_manager.get_subtitles_path(ctx.job_id)
+    generate_vtt(segments, subtitles_path)
+    logger.info(f"Generated subtitles: {subtitles_path}")
+    return {"subtitles": subtitles_path}, {}
+
+
+def _waveform(ctx: StageContext) -> StageOutput:
+    waveform_path = ctx.job_manager.get_waveform_path(ctx.job_id)
+    summary = build_waveform(ctx.audio_path, waveform_path)
+    return {"waveform": waveform_path}, summary
+
+
+def _extra_renditions(ctx: StageContext) -> List[str]:
+    return [name for name in ctx.meta.get("requested_renditions", []) if name != PRIMARY_RENDITION]
+
+
+def _render(ctx: StageContext) -> StageOutput:
+    meta = ctx.meta
+    video_path = ctx.job_manager.get_rendered_video_path(ctx.job_id)
+    renditions = {name: ctx.job_manager.get_rendition_path(ctx.job_id, name) for name in _extra_renditions(ctx)}
+    benchmark = generate_video(
+        ctx.audio_path,
+        ctx.image_path,
+        video_path,
+        timeout=FFMPEG_TIMEOUT,
+        benchmark=ctx.profiler is not None,
+        duration=meta.get("audio_duration"),
+        renditions=renditions
+    )
+    if ctx.profiler:
+        ctx.profiler.ffmpeg_benchmark = benchmark
+    logger.info(f"Generated rendered video: {video_path}")
+    ctx.update_meta(
+        renditions={PRIMARY_RENDITION: video_path.name, **{name: path.name for name, path in renditions.items()}}
+    )
+    artifacts = {"video": video_path}
+    artifacts.update({f"video_{name}": path for name, path in renditions.items()})
+    return artifacts, {}
+
+
+def is_render_only(meta: dict) -> bool:
+    """Return True if the job is queued or running only to render on demand."""
+    return meta.get("render_state") in (JobState.QUEUED.value, JobState.RUNNING.value)
+
+
+def _update_progress(ctx: StageContext, **fields) -> None:
+    """Report stage progress, except from render-only runs of finished jobs."""
+    if not ctx.render_only:
+        progress_store.update(ctx.job_id, **fields)
+
+
+def render_enabled(meta: dict) -> bool:
+    """Return True if the job's pipeline should render the video now."""
+    if meta.get("outputs") == TRANSCRIPT_OUTPUTS:
+        return False
+    return meta.get("render_mode") != LAZY_RENDER or bool(meta.get("render_requested"))
+
+
+def _mux(ctx: StageContext) -> StageOutput:
+    captioned_path = ctx.job_manager.get_captioned_video_path(ctx.job_id)
+    mux_subtitles(
+        ctx.job_manager.get_rendered_video_path(ctx.job_id),
+        ctx.job_manager.get_subtitles_path(ctx.job_id),
+        captioned_path
+    )
+    return {"captioned_video": captioned_path}, {}
+
+
+STAGES: List[Stage] = [
+    Stage(
+        "ingest", _ingest, JobStage.SAVING, 5, "Files saved, checking inputs...",
+        params=lambda ctx: {"has_image": bool(ctx.image_path and ctx.image_path.exists())},
+        writes_artifacts=False,
+    ),
+    Stage("probe", _probe, JobStage.SAVING, 8, "Probing audio...", inputs=("ingest.audio",)),
+    Stage(
+        "transcribe", _transcribe, JobStage.TRANSCRIBING, 10, "Transcribing audio...",
+        inputs=("ingest.audio", "probe.duration"),
+        params=lambda ctx: {"requested_tier": ctx.meta.get("requested_tier"), "model_path": WHISPER_MODEL_PATH},
+        timing_key=JobStage.TRANSCRIBING.value,
+    ),
+    Stage(
+        "package", _package, JobStage.PACKAGING, 55, "Generating transcript files...",
+        inputs=("transcribe.transcript",), timing_key=JobStage.PACKAGING.value,
+    ),
+    Stage(
+        "waveform", _waveform, JobStage.PACKAGING, 58, "Computing waveform peaks...",
+        inputs=("ingest.audio",), enabled=lambda ctx: WAVEFORM_ENABLED, required=False,
+    ),
+    Stage(
+        "render", _render, JobStage.RENDERING, 60, "Rendering video...",
+        inputs=("ingest.audio", "ingest.image", "probe.duration"), timing_key=JobStage.RENDERING.value,
+        enabled=lambda ctx: render_enabled(ctx.meta),
+        # Only set with a ladder, so single-rendition checkpoints stay valid
+        params=lambda ctx: {"renditions": _extra_renditions(ctx)} if _extra_renditions(ctx) else {},
+    ),
+    # Optional packaging: soft subtitle track via stream-copy remux
+    Stage(
+        "mux", _mux, JobStage.PACKAGING, 96, "Embedding subtitle track...",
+        inputs=("render.video", "package.subtitles"),
+        enabled=lambda ctx: (
+            render_enabled(ctx.meta) and (EMBED_SUBTITLES or bool(ctx.meta.get("embed_subtitles")))
+        ),
+        timing_key="muxing",
+    ),
+]
 
 
 def process_job(
     job_id: str,
     job_manager: JobManager,
     audio_path: Path,
-    image_path: Optional[Path] = None
+    image_path: Optional[Path] = None,
+    enqueued_at: Optional[float] = None,
+    cancel: Optional[threading.Event] = None
 ):
     """
-    Process a single job: transcribe, generate video, create outputs.
-    
+    Process a single job: run every pipeline stage that is not checkpointed.
+
     This function runs in a background thread and updates progress throughout.
-    
+    Per-stage durations are exported as metrics and stored in job_meta.json;
+    successful jobs also train the RTF model used for scheduling and ETAs.
+    Jobs whose metadata has "profile" set run under a JobProfiler. Jobs
+    submitted with a callback_url queue their completion webhooks.
+
     Args:
         job_id: Job identifier
         job_manager: JobManager instance
         audio_path: Path to source audio file
         image_path: Optional path to background image
+        enqueued_at: Optional epoch seconds when the job was queued
+        cancel: Optional event that stops the run before its next stage; a
+            cancelled run records no final state, timings or webhooks
     """
-    if os.getenv("A2V_TEST_MODE") == "1":
-        try:
-            progress_store.update(
-                job_id,
-                state=JobState.RUNNING,
-                stage=JobStage.SAVING,
-                percent=5,
-                message="Files saved, starting transcription..."
-            )
-
-            segments = [
-                {"id": 1, "start": 0.0, "end": 1.2, "text": "Test transcript segment."}
-            ]
-
-            transcript_data = TranscriptData(
-                version="1.0",
-                segments=[TranscriptSegment(**seg) for seg in segments]
-            )
-            transcript_segments_path = job_manager.get_transcript_segments_path(job_id)
-            with open(transcript_segments_path, 'w', encoding='utf-8') as f:
-                json.dump(transcript_data.model_dump(), f, indent=2, ensure_ascii=False)
-
-            subtitles_path = job_manager.get_subtitles_path(job_id)
-            generate_vtt(segments, subtitles_path)
-
-            video_path = job_manager.get_rendered_video_path(job_id)
-            video_path.parent.mkdir(parents=True, exist_ok=True)
-            video_path.write_bytes(b"test-video")
-
-            progress_store.update(
-                job_id,
-                state=JobState.SUCCEEDED,
-                stage=JobStage.DONE,
-                percent=100,
-                message="Processing complete"
-            )
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Job {job_id} failed: {error_msg}", exc_info=True)
-            progress_store.update(
-                job_id,
-                state=JobState.FAILED,
-                stage=JobStage.ERROR,
-                percent=0,
-                message=f"Processing failed: {error_msg}",
-                error=error_msg
-            )
+    observe_queue_start(enqueued_at)
+    timings = {}
+    meta = job_manager.get_job_meta(job_id) or {}
+    render_only = is_render_only(meta)
+    try:
+        if meta.get("profile"):
+            with JobProfiler(job_id, job_manager.get_job_dir(job_id)) as profiler:
+                _run_job(job_id, job_manager, audio_path, image_path, timings, profiler, cancel, render_only)
+            _store_profile(job_id, job_manager)
+        else:
+            _run_job(job_id, job_manager, audio_path, image_path, timings, cancel=cancel, render_only=render_only)
+    except JobCancelled as e:
+        # Whoever cancelled the run now owns the job and its final state
+        logger.warning(f"Job {job_id} stopped: {e}")
+    finally:
+        if cancel is None or not cancel.is_set():
+            _finish_job(job_id, job_manager, timings, render_only)
+
+
+def _store_profile(job_id: str, job_manager: JobManager) -> None:
+    """Keep a profiled run's reports in storage so any node can serve them."""
+    job_dir = job_manager.get_job_dir(job_id)
+    for filename in PROFILE_FILENAMES:
+        path = job_dir / filename
+        if path.exists():
+            job_manager.store_artifact(job_id, path)
+
+
+def _finish_job(job_id: str, job_manager: JobManager, timings: dict, render_only: bool = False) -> None:
+    """Record a finished run's timings, train the RTF model and queue webhooks."""
+    # Merge with timings recorded before processing (e.g. upload saving)
+    meta = job_manager.get_job_meta(job_id) or {}
+    merged = {**meta.get("stage_timings", {}), **timings}
+    merged["total"] = round(sum(v for k, v in merged.items() if k != "total"), 6)
+    job_manager.update_job_meta(job_id, stage_timings=merged)
+    progress = progress_store.get(job_id)
+    if progress is not None and progress.state == JobState.SUCCEEDED:
+        get_rtf_model(job_manager.base_dir).observe(meta.get("audio_duration"), timings)
+    if not render_only:
+        # The job's final state was announced when it first finished
+        notify_job_finished(job_id, job_manager)
+
+
+def _run_stage(ctx: StageContext, stage: Stage) -> None:
+    """Run one stage unless its checkpoint is still valid."""
+    if ctx.cancel is not None and ctx.cancel.is_set():
+        raise JobCancelled(f"cancelled before stage {stage.name}")
+    upstream = {}
+    for ref in stage.inputs:
+        upstream_stage, artifact = ref.split(".", 1)
+        upstream[ref] = ctx.checkpoints.artifact_digest(upstream_stage, artifact)
+    stage_fingerprint = fingerprint({"inputs": upstream, "params": stage.params(ctx)})
+
+    if ctx.checkpoints.is_valid(stage.name, stage_fingerprint):
+        logger.info(f"Job {ctx.job_id}: stage {stage.name} is up to date, skipping")
+        _update_progress(
+            ctx,
+            stage=stage.progress_stage,
+            percent=stage.percent,
+            message=f"Reusing {stage.name} checkpoint"
+        )
         return
 
+    _update_progress(ctx, stage=stage.progress_stage, percent=stage.percent, message=stage.message)
+    if stage.writes_artifacts:
+        # Outputs may be hardlinks to shared blobs; unlink so tools that
+        # overwrite in place write a fresh file instead
+        for artifact in (ctx.checkpoints.get(stage.name) or {}).get("artifacts", {}).values():
+            (ctx.checkpoints.job_dir / artifact["path"]).unlink(missing_ok=True)
+
+    timeline = ctx.profiler.timeline if ctx.profiler else None
+    start = time.perf_counter()
     try:
-        # Stage: Saving (0-10%)
-        progress_store.update(
-            job_id,
+        with time_stage(ctx.timings, stage.timing_key or stage.name, timeline):
+            artifacts, values = stage.run(ctx)
+    except Exception as e:
+        ctx.checkpoints.mark_failed(stage.name, str(e))
+        raise
+    duration = time.perf_counter() - start
+    digests = {name: ctx.job_manager.store_artifact(ctx.job_id, path) for name, path in artifacts.items()}
+    ctx.checkpoints.mark_done(stage.name, stage_fingerprint, artifacts, values, duration, digests)
+
+
+def _run_job(
+    job_id: str,
+    job_manager: JobManager,
+    audio_path: Path,
+    image_path: Optional[Path],
+    timings: dict,
+    profiler: Optional[JobProfiler] = None,
+    cancel: Optional[threading.Event] = None,
+    render_only: bool = False
+):
+    """Run the pipeline stages for process_job, accumulating stage timings."""
+    checkpoints = job_manager.checkpoints(job_id)
+    ctx = StageContext(
+        job_id, job_manager, audio_path, image_path, checkpoints, timings, profiler, cancel, render_only
+    )
+
+    try:
+        checkpoints.set_status(JobStatus.RUNNING)
+        if render_only:
+            job_manager.update_job_meta(job_id, render_state=JobState.RUNNING.value)
+        _update_progress(
+            ctx,
             state=JobState.RUNNING,
             stage=JobStage.SAVING,
             percent=5,
-            message="Files saved, starting transcription..."
-        )
-        
-        # Stage: Transcribing (10-50%)
-        progress_store.update(
-            job_id,
-            stage=JobStage.TRANSCRIBING,
-            percent=10,
-            message="Transcribing audio..."
-        )
-        
-        logger.info(f"Starting transcription for job {job_id}")
-        segments = transcribe_audio(
-            audio_path,
-            model_name=WHISPER_MODEL,
-            model_path=WHISPER_MODEL_PATH if WHISPER_MODEL_PATH else None
-        )
-        
-        progress_store.update(
-            job_id,
-            stage=JobStage.TRANSCRIBING,
-            percent=50,
-            message=f"Transcription complete: {len(segments)} segments"
-        )
-        
-        # Stage: Packaging (50-60%) - Generate transcript files
-        progress_store.update(
-            job_id,
-            stage=JobStage.PACKAGING,
-            percent=55,
-            message="Generating transcript files..."
-        )
-        
-        # Generate transcript JSON
-        transcript_data = TranscriptData(
-            version="1.0",
-            segments=[TranscriptSegment(**seg) for seg in segments]
-        )
-        transcript_segments_path = job_manager.get_transcript_segments_path(job_id)
-        with open(transcript_segments_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript_data.model_dump(), f, indent=2, ensure_ascii=False)
-        logger.info(f"Generated transcript segments: {transcript_segments_path}")
-        
-        # Generate VTT file
-        subtitles_path = job_manager.get_subtitles_path(job_id)
-        generate_vtt(segments, subtitles_path)
-        logger.info(f"Generated subtitles: {subtitles_path}")
-        
-        progress_store.update(
-            job_id,
-            percent=60,
-            message="Transcript files generated"
+            message="Files saved, starting processing..."
         )
-        
-        # Stage: Rendering (60-95%)
-        progress_store.update(
-            job_id,
-            stage=JobStage.RENDERING,
-            percent=60,
-            message="Rendering video..."
-        )
-        
-        logger.info(f"Starting video generation for job {job_id}")
-        video_path = job_manager.get_rendered_video_path(job_id)
-        generate_video(
-            audio_path,
-            image_path,
-            video_path,
-            timeout=FFMPEG_TIMEOUT
-        )
-        logger.info(f"Generated rendered video: {video_path}")
-        
-        progress_store.update(
-            job_id,
-            percent=95,
-            message="Video rendering complete"
-        )
-        
+
+        for stage in STAGES:
+            # Other nodes may have updated the metadata (e.g. requested the render)
+            ctx.refresh_meta()
+            if not stage.enabled(ctx):
+                continue
+            try:
+                _run_stage(ctx, stage)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if stage.required:
+                    raise
+                logger.warning(f"Job {job_id}: optional stage {stage.name} failed: {e}")
+
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled("cancelled after the last stage")
+
         # Stage: Done (100%)
+        checkpoints.set_status(JobStatus.SUCCEEDED)
+        if render_only:
+            job_manager.update_job_meta(job_id, render_state=JobState.SUCCEEDED.value, render_error=None)
+            logger.info(f"Job {job_id} rendered on demand")
+            return
         progress_store.update(
             job_id,
             state=JobState.SUCCEEDED,
@@ -179,12 +467,22 @@ def process_job(
             percent=100,
             message="Processing complete"
         )
-        
+
+        JOBS_TOTAL.labels(state=JobState.SUCCEEDED.value).inc()
         logger.info(f"Job {job_id} completed successfully")
-        
+
+    except JobCancelled:
+        raise
     except Exception as e:
         error_msg = str(e)
+        if render_only:
+            # The transcript outputs are still valid; only the render failed
+            logger.error(f"Job {job_id} failed to render on demand: {error_msg}", exc_info=True)
+            checkpoints.set_status(JobStatus.SUCCEEDED)
+            job_manager.update_job_meta(job_id, render_state=JobState.FAILED.value, render_error=error_msg)
+            return
         logger.error(f"Job {job_id} failed: {error_msg}", exc_info=True)
+        checkpoints.set_status(JobStatus.FAILED)
         progress_store.update(
             job_id,
             state=JobState.FAILED,
@@ -193,3 +491,4 @@ def process_job(
             message=f"Processing failed: {error_msg}",
             error=error_msg
         )
+        JOBS_TOTAL.labels(state=JobState.FAILED.value).inc()
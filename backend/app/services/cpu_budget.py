@@ -0,0 +1,183 @@
+"""CPU budget shared by the stages that run concurrently in this process.
+
+Whisper and FFmpeg both size their thread pools to every core by default,
+so two concurrent jobs oversubscribe the machine and lose throughput to
+context switching. Running stages instead take a lease from the process-wide
+CpuBudget, which splits the usable CPUs between the active leases:
+
+- The usable CPUs are this process's affinity mask, limited by the cgroup
+  CPU quota (containers) or A2V_CPUS.
+- Transcription holds a fixed share: CTranslate2 fixes cpu_threads when the
+  model loads, so Whisper gets usable CPUs / transcribe slots threads and
+  num_workers = slots, one per job that can transcribe at once. A calibrated
+  host profile can lower cpu_threads where fewer threads measured faster.
+- FFmpeg renders share whatever the transcriptions leave, recomputed
+  whenever a lease starts or ends; new processes get `-threads` for their
+  current share.
+- With A2V_CPU_PINNING=1 each lease also gets its own CPU set, and the FFmpeg
+  processes attached to it are re-pinned as the sets change.
+"""
+import itertools
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.services.host_profile import HOST_PROFILE, available_cpus
+from app.services.scheduler import MAX_CONCURRENT_JOBS
+from app.utils.metrics import CPU_THREADS
+
+logger = logging.getLogger(__name__)
+
+CPU_PINNING = os.getenv("A2V_CPU_PINNING", "0") == "1"
+# Jobs that may transcribe at once; 0 uses A2V_MAX_CONCURRENT_JOBS
+TRANSCRIBE_SLOTS = int(os.getenv("A2V_TRANSCRIBE_SLOTS", "0"))
+
+
+class CpuLease:
+    """The CPUs budgeted to one running stage."""
+
+    def __init__(self, budget: "CpuBudget", stage: str, requested: Optional[int]):
+        self.stage = stage
+        self.requested = requested
+        self.threads = 1
+        self.cpus: Tuple[int, ...] = ()
+        self._budget = budget
+        self._pids: List[int] = []
+
+    def attach(self, pid: int) -> None:
+        """Register a child process so it follows this lease's CPU set."""
+        with self._budget._lock:
+            self._pids.append(pid)
+            self._budget._pin(self, [pid])
+
+
+class CpuBudget:
+    """Splits the usable CPUs between the stages running at once."""
+
+    def __init__(
+        self,
+        cpus: Optional[List[int]] = None,
+        slots: Optional[int] = None,
+        pinning: bool = CPU_PINNING,
+        whisper_threads: Optional[int] = None
+    ):
+        """
+        Args:
+            cpus: CPU ids to budget (default: available_cpus())
+            slots: Jobs that may transcribe at once (default:
+                A2V_TRANSCRIBE_SLOTS or A2V_MAX_CONCURRENT_JOBS)
+            pinning: Pin attached processes to their lease's CPU set
+            whisper_threads: Upper bound on Whisper cpu_threads (default:
+                the host profile's calibrated value, if any)
+        """
+        self.cpus = list(cpus) if cpus else available_cpus()
+        self.slots = max(1, slots or TRANSCRIBE_SLOTS or MAX_CONCURRENT_JOBS)
+        self.pinning = pinning and hasattr(os, "sched_setaffinity")
+        if whisper_threads is None:
+            whisper_threads = HOST_PROFILE.get("whisper", {}).get("cpu_threads")
+        self.whisper_threads = whisper_threads
+        self._lock = threading.Lock()
+        self._leases: Dict[int, CpuLease] = {}
+        self._ids = itertools.count()
+        self._stages: set = set()
+
+    def whisper_settings(self) -> Tuple[int, int]:
+        """
+        Whisper model threading for this budget.
+
+        Returns:
+            (cpu_threads, num_workers)
+        """
+        threads = max(1, len(self.cpus) // self.slots)
+        if self.whisper_threads:
+            threads = min(threads, self.whisper_threads)
+        return threads, self.slots
+
+    @contextmanager
+    def lease(self, stage: str, threads: Optional[int] = None) -> Iterator[CpuLease]:
+        """
+        Hold a share of the CPUs while a stage runs.
+
+        Args:
+            stage: Stage name, used for metrics
+            threads: Fixed thread count; None shares the CPUs left by fixed leases
+
+        Yields:
+            The lease; its threads and cpus may change while it is held
+        """
+        lease = CpuLease(self, stage, threads)
+        lease_id = next(self._ids)
+        with self._lock:
+            self._leases[lease_id] = lease
+            self._rebalance()
+        logger.debug(f"CPU lease for {stage}: {lease.threads} threads on {list(lease.cpus)}")
+        try:
+            yield lease
+        finally:
+            with self._lock:
+                del self._leases[lease_id]
+                self._rebalance()
+
+    def snapshot(self) -> List[Dict]:
+        """Current leases, oldest first."""
+        with self._lock:
+            return [
+                {"stage": lease.stage, "threads": lease.threads, "cpus": list(lease.cpus)}
+                for lease in self._leases.values()
+            ]
+
+    def _rebalance(self) -> None:
+        total = len(self.cpus)
+        leases = list(self._leases.values())
+        flexible = [lease for lease in leases if not lease.requested]
+        reserved = 0
+        for lease in leases:
+            if lease.requested:
+                lease.threads = max(1, min(lease.requested, total))
+                reserved += lease.threads
+        if flexible:
+            # Oversubscribed budgets still give every stage one thread
+            share, extra = divmod(max(total - reserved, len(flexible)), len(flexible))
+            for index, lease in enumerate(flexible):
+                lease.threads = share + (1 if index < extra else 0)
+
+        offset = 0
+        per_stage: Dict[str, int] = dict.fromkeys(self._stages, 0)
+        for lease in leases:
+            count = min(lease.threads, total)
+            lease.cpus = tuple(self.cpus[(offset + i) % total] for i in range(count))
+            offset += count
+            per_stage[lease.stage] = per_stage.get(lease.stage, 0) + lease.threads
+            self._pin(lease, lease._pids)
+        self._stages.update(per_stage)
+        for stage, threads in per_stage.items():
+            CPU_THREADS.labels(stage=stage).set(threads)
+
+    def _pin(self, lease: CpuLease, pids: List[int]) -> None:
+        if not self.pinning:
+            return
+        for pid in pids:
+            try:
+                os.sched_setaffinity(pid, lease.cpus)
+            except OSError:
+                # The process has exited
+                pass
+
+
+_budget: Optional[CpuBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_cpu_budget() -> CpuBudget:
+    """Return the process-wide CPU budget."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = CpuBudget()
+            logger.info(
+                f"CPU budget: {len(_budget.cpus)} CPUs, {_budget.slots} transcribe slots"
+                f"{', pinning enabled' if _budget.pinning else ''}"
+            )
+        return _budget
@@ -0,0 +1,231 @@
+"""Job dispatch for inline and distributed execution modes.
+
+inline (default): the API process runs process_job on the in-process
+scheduler's worker pool, shortest expected job first.
+distributed: the API only enqueues a job descriptor in the broker; separate
+worker processes (python -m app.worker) claim and run it against the shared
+job storage and persist progress back to it. The broker orders claims with
+the same duration-aware priority key.
+
+Both modes share workers fairly between the interactive lane (single
+uploads) and the batch lane, and between clients and their batches.
+"""
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.background_processor import is_render_only, process_job, render_enabled
+from app.services.scheduler import (
+    BATCH_LANE, CLIENT_MAX_CONCURRENT, INTERACTIVE_LANE, estimate_queue, get_scheduler, priority_key
+)
+from app.utils.checkpoints import CHECKPOINTS_FILENAME, JobStatus
+from app.utils.job_manager import JobManager
+from app.utils.job_queue import JobQueue
+from app.utils.metrics import observe_enqueue
+from app.services.webhooks import notify_job_finished
+from app.utils.progress_store import progress_store, JobStage, JobState, ProgressModel
+from app.utils.rtf_model import MODELLED_STAGES, get_rtf_model
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODE = os.getenv("A2V_EXECUTION_MODE", "inline")
+BROKER_PATH = os.getenv("A2V_BROKER_PATH", "")
+MAX_ATTEMPTS = int(os.getenv("A2V_MAX_ATTEMPTS", "3"))
+
+_job_queue: Optional[JobQueue] = None
+
+
+def is_distributed() -> bool:
+    """Return True if jobs are executed by separate worker processes."""
+    return EXECUTION_MODE == "distributed"
+
+
+def get_job_queue(job_manager: JobManager) -> JobQueue:
+    """Return the broker, stored next to the jobs unless A2V_BROKER_PATH is set."""
+    global _job_queue
+    if _job_queue is None:
+        db_path = BROKER_PATH or str(job_manager.base_dir / "queue.sqlite3")
+        _job_queue = JobQueue(
+            db_path,
+            max_attempts=MAX_ATTEMPTS,
+            client_max_concurrent=CLIENT_MAX_CONCURRENT,
+            on_expired=lambda job_ids: fail_expired_jobs(job_ids, job_manager),
+        )
+    return _job_queue
+
+
+def fail_expired_jobs(job_ids: List[str], job_manager: JobManager) -> None:
+    """
+    Record jobs the broker failed because their last lease expired.
+
+    No worker reports these jobs, so their failed progress, checkpoint
+    status and job.failed webhook are written here. On-demand renders only
+    record the failed render, as a failed render leaves the job succeeded.
+    """
+    error = f"Worker lease expired after {MAX_ATTEMPTS} attempt(s)"
+    for job_id in job_ids:
+        logger.error(f"Job {job_id} failed: {error}")
+        checkpoints = job_manager.checkpoints(job_id)
+        if is_render_only(job_manager.get_job_meta(job_id) or {}):
+            checkpoints.set_status(JobStatus.SUCCEEDED)
+            job_manager.update_job_meta(job_id, render_state=JobState.FAILED.value, render_error=error)
+            continue
+        checkpoints.set_status(JobStatus.FAILED)
+        progress = ProgressModel(
+            state=JobState.FAILED,
+            stage=JobStage.ERROR,
+            message=f"Processing failed: {error}",
+            error=error
+        )
+        job_manager.write_progress(job_id, progress.to_dict())
+        # A stale entry here would hide the persisted failure
+        progress_store.evict(job_id)
+        notify_job_finished(job_id, job_manager)
+
+
+def expected_runtime(job_id: str, job_manager: JobManager) -> float:
+    """Predict a job's processing time from its audio duration and the RTF model."""
+    meta = job_manager.get_job_meta(job_id) or {}
+    if is_render_only(meta):
+        # On-demand render of a finished job: the other stages are checkpointed
+        stages = ("rendering",)
+    elif render_enabled(meta):
+        stages = MODELLED_STAGES
+    else:
+        stages = tuple(stage for stage in MODELLED_STAGES if stage != "rendering")
+    return get_rtf_model(job_manager.base_dir).predict(meta.get("audio_duration"), stages)
+
+
+def job_lane(meta: Dict) -> Tuple[str, str, str]:
+    """
+    Scheduling class of a job from its metadata.
+
+    Returns:
+        (lane, client, flow): batch jobs share the batch lane and form one
+        flow per batch; single uploads use the interactive lane
+    """
+    batch_id = meta.get("batch_id") or ""
+    return (BATCH_LANE if batch_id else INTERACTIVE_LANE), meta.get("client_id") or "", batch_id
+
+
+def dispatch_job(
+    job_id: str,
+    job_manager: JobManager,
+    audio_path: Path,
+    image_path: Optional[Path]
+) -> None:
+    """
+    Hand a saved job to whatever executes jobs in this deployment.
+
+    Args:
+        job_id: Job identifier
+        job_manager: JobManager owning the job directory
+        audio_path: Path to the saved source audio
+        image_path: Optional path to the saved background image
+    """
+    expected = expected_runtime(job_id, job_manager)
+    lane, client, flow = job_lane(job_manager.get_job_meta(job_id) or {})
+    # Marks the job as pending so it is resumed if this process restarts
+    job_manager.checkpoints(job_id).set_status(JobStatus.QUEUED)
+
+    if is_distributed():
+        # Workers resolve paths through their own JobManager, so the
+        # descriptor stays valid when hosts mount the storage elsewhere.
+        get_job_queue(job_manager).enqueue(
+            job_id,
+            {"has_image": image_path is not None, "expected_seconds": expected},
+            priority=priority_key(expected, time.time()),
+            lane=lane,
+            client=client,
+            flow=flow,
+        )
+        logger.info(f"Enqueued job {job_id} for distributed workers ({lane} lane, expected {expected:.0f}s)")
+        return
+
+    enqueued_at = observe_enqueue()
+    # Unit tests run jobs inline; load tests (A2V_ENGINES=fake) use the scheduler
+    if os.getenv("A2V_TEST_MODE") == "1":
+        process_job(job_id, job_manager, audio_path, image_path, enqueued_at)
+    else:
+        get_scheduler().submit(
+            job_id, expected, process_job, job_id, job_manager, audio_path, image_path, enqueued_at,
+            lane=lane, client=client, flow=flow
+        )
+
+
+def resume_interrupted_jobs(job_manager: JobManager) -> List[str]:
+    """
+    Re-dispatch jobs that were queued or running when the process stopped.
+
+    Completed stages are skipped via their checkpoints. In distributed mode
+    the broker re-queues expired leases instead, so this is a no-op.
+
+    Returns:
+        IDs of the resumed jobs
+    """
+    if is_distributed():
+        return []
+
+    resumed = []
+    for checkpoints_path in sorted(job_manager.base_dir.glob(f"*/{CHECKPOINTS_FILENAME}")):
+        job_id = checkpoints_path.parent.name
+        checkpoints = job_manager.checkpoints(job_id)
+        if checkpoints.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+            continue
+        if progress_store.job_exists(job_id):
+            continue  # Already known to this process
+        audio_path = job_manager.get_source_audio_path(job_id)
+        if not audio_path.exists():
+            checkpoints.set_status(JobStatus.FAILED)
+            continue
+        image_path = job_manager.get_background_image_path(job_id)
+        if not is_render_only(job_manager.get_job_meta(job_id) or {}):
+            # On-demand renders keep the finished job's persisted state
+            progress_store.create_job(job_id, message="Resuming after restart")
+        dispatch_job(job_id, job_manager, audio_path, image_path if image_path.exists() else None)
+        resumed.append(job_id)
+
+    if resumed:
+        logger.info(f"Resumed {len(resumed)} interrupted job(s)")
+    return resumed
+
+
+def estimate_job(job_id: str, job_manager: JobManager) -> Optional[Dict]:
+    """
+    Queue position and predicted seconds to completion for a pending job.
+
+    Returns:
+        Dict with "queue_position" (None once running) and "eta_seconds",
+        or None if the job is not waiting or running
+    """
+    if not is_distributed():
+        return get_scheduler().estimate(job_id)
+    return estimate_jobs(job_manager).get(job_id)
+
+
+def estimate_jobs(job_manager: JobManager) -> Dict[str, Dict]:
+    """
+    Queue positions and ETAs of every waiting or running job, as estimate_job.
+
+    Takes one snapshot of the queue, so a status request covering many jobs
+    (a batch) costs one broker scan rather than one per job.
+    """
+    if not is_distributed():
+        return get_scheduler().estimates()
+
+    job_queue = get_job_queue(job_manager)
+    now = time.time()
+    queued, running = job_queue.snapshot()
+    remaining = {
+        record["job_id"]: record["payload"].get("expected_seconds", 0.0) - (now - (record["started_at"] or now))
+        for record in running
+    }
+    # Idle workers are invisible to the broker; busy ones are a lower bound
+    workers = len({record["lease_owner"] for record in running})
+    return estimate_queue(
+        [(record["job_id"], record["payload"].get("expected_seconds", 0.0)) for record in queued],
+        remaining,
+        workers
+    )
@@ -0,0 +1,169 @@
+"""Fake transcription/FFmpeg engines for tests and load testing.
+
+With A2V_TEST_MODE=1 or A2V_ENGINES=fake, the services skip Whisper and
+FFmpeg and return canned outputs. Each skipped operation first runs
+simulate(<operation>), which applies the latency, CPU cost and failure rate
+configured for it. That way, the API and orchestration overhead can be
+measured under realistic concurrency without the real engines.
+
+A2V_FAKE_ENGINES holds the profile, either as a JSON file path or as inline
+JSON. Each key is an operation (probe, transcribe, waveform, render, mux).
+Each value can set:
+    latency     wall time slept, in seconds
+    cpu         CPU seconds burnt with the GIL released (like native engines)
+    gil_cpu     CPU seconds burnt holding the GIL (like pure-Python work)
+    error_rate  probability of raising RuntimeError
+Durations are a number or a distribution, e.g.
+    {"dist": "lognormal", "median": 2.0, "sigma": 0.5}
+    {"dist": "uniform", "low": 0.1, "high": 0.3}
+    {"dist": "normal", "mean": 1.0, "stddev": 0.2}
+    {"dist": "exponential", "mean": 0.5}
+An optional top-level "seed" makes runs reproducible. Without a profile,
+every operation is instant.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("probe", "transcribe", "waveform", "render", "mux")
+
+_BURN_BLOCK = bytes(256 * 1024)
+
+
+def fake_engines_enabled() -> bool:
+    """Return True if engines are faked (unit tests or load testing)."""
+    return os.getenv("A2V_TEST_MODE") == "1" or os.getenv("A2V_ENGINES") == "fake"
+
+
+class Distribution:
+    """A non-negative random duration."""
+
+    _PARAMS = {
+        "fixed": ("value",),
+        "uniform": ("low", "high"),
+        "normal": ("mean", "stddev"),
+        "lognormal": ("median", "sigma"),
+        "exponential": ("mean",),
+    }
+
+    def __init__(self, dist: str = "fixed", **params: float):
+        if dist not in self._PARAMS:
+            raise ValueError(f"Unknown distribution {dist!r}. Allowed: {', '.join(self._PARAMS)}")
+        missing = [name for name in self._PARAMS[dist] if name not in params]
+        if missing:
+            raise ValueError(f"Distribution {dist!r} needs {', '.join(missing)}")
+        self.dist = dist
+        self.params = {name: float(params[name]) for name in self._PARAMS[dist]}
+
+    @classmethod
+    def parse(cls, spec: Union[float, int, Dict]) -> "Distribution":
+        """Build a distribution from a number (fixed) or a {"dist": ...} dict."""
+        if isinstance(spec, (int, float)):
+            return cls("fixed", value=spec)
+        spec = dict(spec)
+        return cls(spec.pop("dist", "fixed"), **spec)
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.dist == "fixed":
+            value = p["value"]
+        elif self.dist == "uniform":
+            value = rng.uniform(p["low"], p["high"])
+        elif self.dist == "normal":
+            value = rng.gauss(p["mean"], p["stddev"])
+        elif self.dist == "lognormal":
+            value = p["median"] * math.exp(rng.gauss(0.0, p["sigma"]))
+        else:
+            value = rng.expovariate(1.0 / p["mean"]) if p["mean"] > 0 else 0.0
+        return max(0.0, value)
+
+
+def _burn(seconds: float, hold_gil: bool) -> None:
+    """Consume `seconds` of this thread's CPU time."""
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        if hold_gil:
+            sum(range(10000))
+        else:
+            # hashlib releases the GIL for large buffers
+            hashlib.sha256(_BURN_BLOCK).digest()
+
+
+class FakeEngine:
+    """Applies the configured cost of each faked operation."""
+
+    def __init__(self, profile: Optional[Dict] = None):
+        profile = dict(profile or {})
+        self._rng = random.Random(profile.pop("seed", None))
+        self._rng_lock = threading.Lock()
+        self._operations: Dict[str, Dict] = {}
+        for operation, spec in profile.items():
+            if operation not in OPERATIONS:
+                raise ValueError(f"Unknown operation {operation!r}. Allowed: {', '.join(OPERATIONS)}")
+            self._operations[operation] = {
+                key: Distribution.parse(spec[key]) for key in ("latency", "cpu", "gil_cpu") if key in spec
+            }
+            self._operations[operation]["error_rate"] = float(spec.get("error_rate", 0.0))
+
+    def run(self, operation: str) -> None:
+        """
+        Simulate one operation.
+
+        Raises:
+            RuntimeError: With the configured error rate
+        """
+        spec = self._operations.get(operation)
+        if not spec:
+            return
+        with self._rng_lock:
+            latency = spec["latency"].sample(self._rng) if "latency" in spec else 0.0
+            cpu = spec["cpu"].sample(self._rng) if "cpu" in spec else 0.0
+            gil_cpu = spec["gil_cpu"].sample(self._rng) if "gil_cpu" in spec else 0.0
+            fail = self._rng.random() < spec["error_rate"]
+        if cpu:
+            _burn(cpu, hold_gil=False)
+        if gil_cpu:
+            _burn(gil_cpu, hold_gil=True)
+        if latency:
+            time.sleep(latency)
+        if fail:
+            raise RuntimeError(f"Simulated {operation} failure")
+
+
+def load_profile(value: str) -> Dict:
+    """Parse A2V_FAKE_ENGINES: inline JSON or a path to a JSON file."""
+    value = value.strip()
+    if not value:
+        return {}
+    if value.startswith("{"):
+        return json.loads(value)
+    with open(value, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_engine: Optional[FakeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_fake_engine() -> FakeEngine:
+    """Return the process-wide fake engine built from A2V_FAKE_ENGINES."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = FakeEngine(load_profile(os.getenv("A2V_FAKE_ENGINES", "")))
+            if _engine._operations:
+                logger.info(f"Fake engines simulating: {', '.join(_engine._operations)}")
+        return _engine
+
+
+def simulate(operation: str) -> None:
+    """Apply the configured cost of a faked operation (no-op without a profile)."""
+    get_fake_engine().run(operation)
@@ -1,4 +1,5 @@
 """File upload and validation service."""
+import hashlib
 import os
 from pathlib import Path
 from typing import Optional, Tuple
@@ -6,7 +7,8 @@ from fastapi import UploadFile, HTTPException
 
 
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB in bytes
-ALLOWED_AUDIO_TYPES = {'.m4a'}
+# Extensions are a first filter; the container is verified by ffprobe on upload
+ALLOWED_AUDIO_TYPES = {'.m4a', '.mp3', '.wav', '.flac', '.ogg', '.opus'}
 ALLOWED_IMAGE_TYPES = {'.jpg', '.jpeg', '.png'}
 
 
@@ -31,7 +33,7 @@ class FileHandler:
         if ext not in ALLOWED_AUDIO_TYPES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid audio file type. Allowed types: {', '.join(ALLOWED_AUDIO_TYPES)}"
+                detail=f"Invalid audio file type. Allowed types: {', '.join(sorted(ALLOWED_AUDIO_TYPES))}"
             )
     
     @staticmethod
@@ -54,13 +56,14 @@ class FileHandler:
                 )
     
     @staticmethod
-    async def save_audio_file(file: UploadFile, output_path: Path) -> int:
+    async def save_audio_file(file: UploadFile, output_path: Path, hasher=None) -> int:
         """
         Save audio file with size validation during stream.
         
         Args:
             file: Uploaded file
             output_path: Path where file should be saved
+            hasher: Optional hashlib object updated with the content
             
         Returns:
             Size of saved file in bytes
@@ -70,6 +73,8 @@ class FileHandler:
         """
         total_size = 0
         
+        # Never write through an existing path: it may be a shared blob link
+        output_path.unlink(missing_ok=True)
         with open(output_path, 'wb') as f:
             while True:
                 chunk = await file.read(8192)  # Read in 8KB chunks
@@ -87,17 +92,20 @@ class FileHandler:
                     )
                 
                 f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
         
         return total_size
     
     @staticmethod
-    async def save_image_file(file: Optional[UploadFile], output_path: Path) -> bool:
+    async def save_image_file(file: Optional[UploadFile], output_path: Path, hasher=None) -> bool:
         """
         Save image file if provided.
         
         Args:
             file: Optional uploaded file
             output_path: Path where file should be saved
+            hasher: Optional hashlib object updated with the content
             
         Returns:
             True if file was saved, False if no file provided
@@ -105,12 +113,36 @@ class FileHandler:
         if not file or not file.filename:
             return False
         
+        output_path.unlink(missing_ok=True)
         with open(output_path, 'wb') as f:
             while True:
                 chunk = await file.read(8192)
                 if not chunk:
                     break
                 f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
         
         return True
 
+    
+    @staticmethod
+    async def hash_upload(file: Optional[UploadFile], hasher) -> None:
+        """
+        Feed an upload's name and content to a hash, leaving it unread.
+        
+        Args:
+            file: Optional uploaded file
+            hasher: hashlib object to update
+        """
+        if not file or not file.filename:
+            hasher.update(b"\0")
+            return
+        content_hash = hashlib.sha256()
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            content_hash.update(chunk)
+        await file.seek(0)
+        hasher.update(file.filename.encode() + b"\0" + content_hash.digest())
@@ -0,0 +1,155 @@
+"""Host facts and the calibrated per-host tuning profile.
+
+`python -m app.calibrate` measures transcription and encoding settings on
+this machine and stores the best ones in the host profile file
+(A2V_HOST_PROFILE, default data/host_profile.json). The file holds one entry
+per host key (CPU model, architecture and usable CPU count), so hosts that
+share storage keep separate results. Services read the entry for the current
+host at import time and use it in place of the built-in defaults; explicit
+environment variables still take precedence.
+"""
+import json
+import logging
+import math
+import os
+import platform
+import socket
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HOST_PROFILE_PATH = os.getenv("A2V_HOST_PROFILE", "data/host_profile.json")
+PROFILE_VERSION = 1
+# Explicit CPU count; 0 detects it from the affinity mask and cgroup quota
+CPU_LIMIT = float(os.getenv("A2V_CPUS", "0"))
+
+
+def cgroup_cpu_limit(root: Path = Path("/sys/fs/cgroup")) -> Optional[float]:
+    """
+    Read the CPU quota of the current cgroup.
+
+    Args:
+        root: cgroup filesystem mount point
+
+    Returns:
+        Quota in CPUs (e.g. 1.5), or None if unlimited or unknown
+    """
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota is -1 when unlimited
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus(limit: float = CPU_LIMIT) -> List[int]:
+    """
+    CPU ids this process may use, trimmed to the quota.
+
+    Args:
+        limit: Explicit CPU count, or 0 to use the cgroup quota
+
+    Returns:
+        Sorted CPU ids (at least one)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    quota = limit if limit > 0 else cgroup_cpu_limit()
+    if quota:
+        # A quota of 1.5 CPUs still runs threads on two cores
+        cpus = cpus[:max(1, math.ceil(quota))]
+    return cpus or [0]
+
+
+def cpu_model() -> str:
+    """Human-readable CPU model name."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+
+def host_info() -> Dict:
+    """Describe this host; "key" identifies hosts that share a profile entry."""
+    model = cpu_model()
+    cpus = len(available_cpus())
+    return {
+        "key": f"{platform.machine()}/{model}/{cpus}cpu",
+        "hostname": socket.gethostname(),
+        "cpu_model": model,
+        "cpus": cpus,
+    }
+
+
+def _read(path: Path) -> Dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable host profile {path}: {e}")
+        return {}
+    if data.get("version") != PROFILE_VERSION:
+        logger.warning(f"Ignoring host profile {path} with unsupported version {data.get('version')}")
+        return {}
+    return data
+
+
+def load_host_profile(path: Optional[str] = HOST_PROFILE_PATH, key: Optional[str] = None) -> Dict:
+    """
+    Return the calibrated profile of a host.
+
+    Args:
+        path: Profile file; empty disables profiles
+        key: Host key (default: this host's)
+
+    Returns:
+        The host's entry, or {} if it has not been calibrated
+    """
+    if not path:
+        return {}
+    return _read(Path(path)).get("hosts", {}).get(key or host_info()["key"], {})
+
+
+def save_host_profile(profile: Dict, path: str = HOST_PROFILE_PATH) -> Path:
+    """
+    Store a host's profile, keeping the entries of other hosts.
+
+    Args:
+        profile: Entry with a "host" dict from host_info()
+        path: Profile file
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    data = _read(target) or {"version": PROFILE_VERSION, "hosts": {}}
+    data.setdefault("hosts", {})[profile["host"]["key"]] = profile
+    # Unique per writer: several hosts may calibrate into one profile file
+    tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return target
+
+
+HOST_PROFILE: Dict = load_host_profile()
+if HOST_PROFILE:
+    logger.info(f"Loaded host profile calibrated at {HOST_PROFILE.get('calibrated_at')}")
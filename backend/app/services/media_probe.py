@@ -0,0 +1,142 @@
+"""Media inspection using ffprobe."""
+import json
+import logging
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.fake_engines import fake_engines_enabled, simulate
+
+logger = logging.getLogger(__name__)
+
+FFPROBE_TIMEOUT = int(os.getenv("FFPROBE_TIMEOUT", "15"))
+# Bytes ffprobe may read to identify streams; headers are at the start
+FFPROBE_PROBESIZE = int(os.getenv("A2V_FFPROBE_PROBESIZE", str(1024 * 1024)))
+
+# ffprobe format names (comma-separated aliases) each accepted extension may hold
+AUDIO_FORMATS_BY_EXTENSION = {
+    ".m4a": {"mov", "mp4", "m4a"},
+    ".mp3": {"mp3"},
+    ".wav": {"wav"},
+    ".flac": {"flac"},
+    ".ogg": {"ogg"},
+    ".opus": {"ogg"},
+}
+ALLOWED_AUDIO_FORMATS = set().union(*AUDIO_FORMATS_BY_EXTENSION.values())
+
+_ffprobe_path: Optional[str] = None
+
+
+def check_ffprobe() -> bool:
+    """Return True if ffprobe is available (cached once found)."""
+    global _ffprobe_path
+    if _ffprobe_path is None:
+        _ffprobe_path = shutil.which("ffprobe")
+    return _ffprobe_path is not None
+
+
+def probe_duration(audio_path: Path) -> Optional[float]:
+    """
+    Read the container duration of a media file without decoding it.
+
+    Args:
+        audio_path: Path to the media file
+
+    Returns:
+        Duration in seconds, or None if it could not be determined
+    """
+    if fake_engines_enabled():
+        simulate("probe")
+        return None
+    if not check_ffprobe():
+        return None
+
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "json",
+        str(audio_path),
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=FFPROBE_TIMEOUT)
+        duration = json.loads(result.stdout or "{}").get("format", {}).get("duration")
+        return float(duration) if duration is not None else None
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning(f"ffprobe failed for {audio_path}: {e}")
+        return None
+
+
+def probe_audio(audio_path: Path) -> Optional[Dict]:
+    """
+    Identify the container and first audio stream from their headers.
+
+    Only the start of the file is read (A2V_FFPROBE_PROBESIZE), so this is
+    cheap enough to run on every upload before it is queued.
+
+    Args:
+        audio_path: Path to the media file
+
+    Returns:
+        Dict with "format", "codec", "sample_rate", "channels" and "duration"
+        (None when unknown), or None if ffprobe is unavailable
+
+    Raises:
+        ValueError: If the file is not a decodable audio file in an
+            accepted container, or the container does not match the file
+            extension (e.g. a renamed video)
+    """
+    if fake_engines_enabled():
+        simulate("probe")
+        if audio_path.stat().st_size == 0:
+            raise ValueError("File contains no audio stream")
+        return {"format": "mov,mp4,m4a,3gp,3g2,mj2", "codec": "aac", "sample_rate": 44100,
+                "channels": 2, "duration": None}
+    if not check_ffprobe():
+        return None
+
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-probesize", str(FFPROBE_PROBESIZE),
+        "-select_streams", "a:0",
+        "-show_entries", "format=format_name,duration:stream=codec_name,sample_rate,channels",
+        "-of", "json",
+        str(audio_path),
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=FFPROBE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise ValueError("Timed out reading the audio headers")
+    except OSError as e:
+        logger.warning(f"ffprobe failed for {audio_path}: {e}")
+        return None
+    if result.returncode != 0:
+        raise ValueError(f"Unreadable media file: {result.stderr.strip() or 'ffprobe failed'}")
+
+    try:
+        data = json.loads(result.stdout or "{}")
+    except ValueError:
+        raise ValueError("Unreadable media file")
+    fmt = data.get("format", {})
+    streams = data.get("streams") or []
+    format_name = fmt.get("format_name", "")
+    names = set(format_name.split(","))
+    if not ALLOWED_AUDIO_FORMATS.intersection(names):
+        raise ValueError(f"Unsupported container: {format_name or 'unknown'}")
+    extension = audio_path.suffix.lower()
+    expected = AUDIO_FORMATS_BY_EXTENSION.get(extension)
+    if expected is not None and not expected.intersection(names):
+        raise ValueError(f"{extension} file holds a {format_name} container")
+    if not streams or not streams[0].get("codec_name"):
+        raise ValueError("File contains no audio stream")
+
+    stream = streams[0]
+    duration = fmt.get("duration")
+    return {
+        "format": format_name,
+        "codec": stream["codec_name"],
+        "sample_rate": int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+        "channels": stream.get("channels"),
+        "duration": float(duration) if duration is not None else None,
+    }
@@ -0,0 +1,411 @@
+"""In-process job scheduler with fair sharing and duration-aware ordering.
+
+Inline mode runs jobs on a fixed pool of worker threads instead of one
+background task per upload. Waiting jobs form a tree of queues:
+lane -> client -> flow. The lane is "interactive" for single uploads and
+"batch" for batch uploads; a flow is one batch, or a client's single
+uploads. At every level the next job comes from the child with the lowest
+virtual pass (stride scheduling), and serving a job advances that child's
+pass by the job's expected runtime divided by its weight. Lanes and clients
+therefore share the workers in proportion to their weights, and one
+200-file batch cannot hold every worker while a single upload waits.
+``A2V_CLIENT_MAX_CONCURRENT`` additionally caps how many jobs of one client
+run at once.
+
+Within a flow, jobs are ordered shortest-expected-job first, where the
+expected runtime comes from the audio duration and the online RTF model.
+Aging credits every queued job with ``A2V_SCHEDULER_AGING`` seconds of
+expected runtime per second waited, so a long recording is overtaken only by
+jobs submitted within expected/aging seconds of it. Because the credit grows
+at the same rate for every waiting job, the ordering key
+``expected / aging + enqueued_at`` never changes after submit and a plain
+heap per flow is enough.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.metrics import QUEUE_LANE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_POLICY = os.getenv("A2V_SCHEDULER_POLICY", "sjf")  # sjf | fifo
+SCHEDULER_AGING = float(os.getenv("A2V_SCHEDULER_AGING", "1.0"))
+MAX_CONCURRENT_JOBS = int(os.getenv("A2V_MAX_CONCURRENT_JOBS", "2"))
+
+INTERACTIVE_LANE = "interactive"
+BATCH_LANE = "batch"
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """
+    Parse "name=weight,..." into a dict.
+
+    Raises:
+        ValueError: If an entry is malformed or a weight is not positive
+    """
+    weights = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, sep, weight = item.partition("=")
+        if not sep or float(weight) <= 0:
+            raise ValueError(f"Invalid weight '{item}'. Expected name=<positive number>")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+LANE_WEIGHTS = parse_weights(os.getenv("A2V_LANE_WEIGHTS", "interactive=8,batch=1"))
+CLIENT_WEIGHTS = parse_weights(os.getenv("A2V_CLIENT_WEIGHTS", ""))
+# Jobs of one client that may run at once; 0 is unlimited
+CLIENT_MAX_CONCURRENT = int(os.getenv("A2V_CLIENT_MAX_CONCURRENT", "0"))
+
+
+def priority_key(expected_seconds: float, enqueued_at: float, policy: str = SCHEDULER_POLICY,
+                 aging: float = SCHEDULER_AGING) -> float:
+    """
+    Ordering key for a waiting job; lower runs first.
+
+    Args:
+        expected_seconds: Predicted processing time
+        enqueued_at: Epoch seconds when the job was queued
+        policy: "sjf" or "fifo"
+        aging: Expected-runtime credit per second waited (sjf only)
+    """
+    if policy == "fifo":
+        return enqueued_at
+    if aging <= 0:
+        # Pure SJF; ties still fall back to submission order
+        return expected_seconds
+    return expected_seconds / aging + enqueued_at
+
+
+def estimate_start(ahead: List[float], running_remaining: List[float], workers: int) -> float:
+    """
+    Seconds until a queued job starts, by replaying list scheduling.
+
+    Args:
+        ahead: Expected runtimes of the jobs that will start first, in order
+        running_remaining: Remaining seconds of the jobs currently running
+        workers: Number of jobs that run concurrently
+    """
+    workers = max(1, workers)
+    free_at = sorted(max(0.0, r) for r in running_remaining)[:workers]
+    free_at += [0.0] * (workers - len(free_at))
+    heapq.heapify(free_at)
+    for expected in ahead:
+        heapq.heappush(free_at, heapq.heappop(free_at) + expected)
+    return free_at[0]
+
+
+def estimate_queue(
+    queued: List[Tuple[str, float]], running: Dict[str, float], workers: int
+) -> Dict[str, Dict]:
+    """
+    Queue positions and ETAs of every job, from a single replay.
+
+    Equivalent to estimate_start for each queued job in turn, in O(n log w)
+    rather than O(n) per job, for status requests covering many jobs.
+
+    Args:
+        queued: (job_id, expected runtime) of the queued jobs in start order
+        running: Remaining seconds of each running job, by job id
+        workers: Number of jobs that run concurrently
+
+    Returns:
+        job_id -> {"queue_position": ..., "eta_seconds": ...}, as estimate()
+    """
+    estimates = {
+        job_id: {"queue_position": None, "eta_seconds": round(max(0.0, remaining), 1)}
+        for job_id, remaining in running.items()
+    }
+    workers = max(1, workers)
+    free_at = sorted(max(0.0, r) for r in running.values())[:workers]
+    free_at += [0.0] * (workers - len(free_at))
+    heapq.heapify(free_at)
+    for position, (job_id, expected) in enumerate(queued):
+        finish = heapq.heappop(free_at) + expected
+        heapq.heappush(free_at, finish)
+        estimates[job_id] = {"queue_position": position + 1, "eta_seconds": round(finish, 1)}
+    return estimates
+
+
+class _Entry:
+    __slots__ = ("job_id", "expected", "enqueued_at", "started_at", "fn", "args", "lane", "client", "path")
+
+    def __init__(self, job_id: str, expected: float, fn: Callable, args: tuple,
+                 lane: str, client: str, flow: str):
+        self.job_id = job_id
+        self.expected = expected
+        self.enqueued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.fn = fn
+        self.args = args
+        self.lane = lane
+        self.client = client
+        self.path = (lane, client, flow)
+
+
+class _FairNode:
+    """One level of the fair-share tree; leaves hold a heap of entries."""
+
+    __slots__ = ("weight", "pass_value", "vtime", "waiting", "children", "heap")
+
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+        self.pass_value = 0.0
+        # Pass of the child served last; idle children rejoin here
+        self.vtime = 0.0
+        self.waiting = 0
+        self.children: Dict[str, "_FairNode"] = {}
+        self.heap: List = []
+
+    def clone(self) -> "_FairNode":
+        node = _FairNode(self.weight)
+        node.pass_value, node.vtime, node.waiting = self.pass_value, self.vtime, self.waiting
+        node.children = {name: child.clone() for name, child in self.children.items()}
+        node.heap = list(self.heap)
+        return node
+
+    def push(self, path: Tuple[str, ...], weights: Tuple[float, ...], item: tuple) -> None:
+        node = self
+        node.waiting += 1
+        for name, weight in zip(path, weights):
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = _FairNode(weight)
+            if not child.waiting:
+                # No credit for time spent idle
+                child.pass_value = max(child.pass_value, node.vtime)
+            child.waiting += 1
+            node = child
+        heapq.heappush(node.heap, item)
+
+    def pop(self, eligible: Callable[[Tuple[str, ...]], bool]) -> Optional["_Entry"]:
+        """Remove and return the next entry, skipping subtrees that are not eligible."""
+        trail = self._select((), eligible)
+        if trail is None:
+            return None
+        _, _, entry = heapq.heappop(trail[-1][1].heap)
+        cost = max(entry.expected, 1.0)
+        parent = self
+        parent.waiting -= 1
+        for name, node in trail:
+            parent.vtime = node.pass_value
+            node.pass_value += cost / node.weight
+            node.waiting -= 1
+            parent = node
+        return entry
+
+    def _select(self, path: Tuple[str, ...], eligible) -> Optional[List[Tuple[str, "_FairNode"]]]:
+        if self.heap:
+            return []
+        candidates = []
+        for name, child in list(self.children.items()):
+            if child.waiting:
+                candidates.append((child.pass_value, name, child))
+            elif child.pass_value <= self.vtime:
+                # Idle and owing nothing: forgetting it loses no state
+                del self.children[name]
+        for _, name, child in sorted(candidates, key=lambda c: (c[0], c[1])):
+            if not eligible(path + (name,)):
+                continue
+            trail = child._select(path + (name,), eligible)
+            if trail is not None:
+                return [(name, child)] + trail
+        return None
+
+
+class JobScheduler:
+    """Fixed-size worker pool that shares workers fairly between lanes, clients and batches."""
+
+    def __init__(
+        self,
+        max_workers: int = MAX_CONCURRENT_JOBS,
+        policy: str = SCHEDULER_POLICY,
+        aging: float = SCHEDULER_AGING,
+        lane_weights: Optional[Dict[str, float]] = None,
+        client_weights: Optional[Dict[str, float]] = None,
+        client_max_concurrent: int = CLIENT_MAX_CONCURRENT
+    ):
+        if policy not in ("sjf", "fifo"):
+            raise ValueError(f"Unknown scheduler policy '{policy}'. Allowed: sjf, fifo")
+        self.max_workers = max(1, max_workers)
+        self.policy = policy
+        self.aging = aging
+        self.lane_weights = LANE_WEIGHTS if lane_weights is None else lane_weights
+        self.client_weights = CLIENT_WEIGHTS if client_weights is None else client_weights
+        self.client_max_concurrent = client_max_concurrent
+        self._tree = _FairNode()
+        self._queued: Dict[str, _Entry] = {}
+        self._running: Dict[str, _Entry] = {}
+        self._client_running: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+        # Simulated dequeue order for estimates, rebuilt after queue changes
+        self._order: Optional[Dict[str, int]] = None
+        self._order_entries: List[_Entry] = []
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._work, name=f"a2v-scheduler-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(
+        self,
+        job_id: str,
+        expected_seconds: float,
+        fn: Callable,
+        *args,
+        lane: str = BATCH_LANE,
+        client: str = "",
+        flow: str = ""
+    ) -> None:
+        """
+        Queue fn(*args) for job_id.
+
+        Args:
+            job_id: Job identifier
+            expected_seconds: Predicted processing time used for ordering
+            fn: Callable to run on a worker thread
+            lane: Scheduling lane (INTERACTIVE_LANE or BATCH_LANE)
+            client: Submitting client identity
+            flow: Fair-share unit within the client, e.g. the batch ID
+        """
+        entry = _Entry(job_id, expected_seconds, fn, args, lane, client, flow)
+        key = priority_key(expected_seconds, entry.enqueued_at, self.policy, self.aging)
+        weights = (self.lane_weights.get(lane, 1.0), self.client_weights.get(client, 1.0), 1.0)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Scheduler is shut down")
+            self._tree.push(entry.path, weights, (key, next(self._sequence), entry))
+            self._queued[job_id] = entry
+            self._queue_changed(lane)
+            self._ensure_workers()
+            self._cond.notify()
+
+    def _eligible(self, path: Tuple[str, ...]) -> bool:
+        # Only the client level is capped
+        if len(path) != 2 or self.client_max_concurrent <= 0:
+            return True
+        return self._client_running.get(path[1], 0) < self.client_max_concurrent
+
+    def _queue_changed(self, lane: str) -> None:
+        self._order = None
+        node = self._tree.children.get(lane)
+        QUEUE_LANE_DEPTH.labels(lane=lane).set(node.waiting if node else 0)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    entry = self._tree.pop(self._eligible) if self._tree.waiting else None
+                    if entry is not None or (self._stopped and not self._tree.waiting):
+                        break
+                    # Queue empty, or every waiting client is at its cap
+                    self._cond.wait()
+                if entry is None:
+                    return
+                self._queued.pop(entry.job_id, None)
+                self._queue_changed(entry.lane)
+                entry.started_at = time.time()
+                self._running[entry.job_id] = entry
+                self._client_running[entry.client] = self._client_running.get(entry.client, 0) + 1
+            try:
+                entry.fn(*entry.args)
+            except Exception as e:
+                logger.error(f"Scheduled job {entry.job_id} raised: {e}", exc_info=True)
+            finally:
+                with self._cond:
+                    self._running.pop(entry.job_id, None)
+                    remaining = self._client_running.pop(entry.client) - 1
+                    if remaining:
+                        self._client_running[entry.client] = remaining
+                    # A capped client may be runnable again
+                    self._cond.notify_all()
+
+    def depth(self, lane: Optional[str] = None) -> int:
+        """Number of jobs waiting for a worker, optionally in one lane."""
+        with self._cond:
+            if lane is None:
+                return self._tree.waiting
+            node = self._tree.children.get(lane)
+            return node.waiting if node else 0
+
+    def _queue_order(self) -> Tuple[Dict[str, int], List[_Entry]]:
+        """Predicted start order of the queued jobs (caps ignored); caller holds the lock."""
+        if self._order is None:
+            tree = self._tree.clone()
+            entries = []
+            while tree.waiting:
+                entries.append(tree.pop(lambda path: True))
+            self._order_entries = entries
+            self._order = {entry.job_id: index for index, entry in enumerate(entries)}
+        return self._order, self._order_entries
+
+    def estimate(self, job_id: str) -> Optional[Dict]:
+        """
+        Queue position and ETA for a job known to the scheduler.
+
+        Returns:
+            {"queue_position": 1-based position or None if running,
+             "eta_seconds": predicted seconds until completion},
+            or None if the job is neither queued nor running
+        """
+        now = time.time()
+        with self._cond:
+            running = self._running.get(job_id)
+            if running is not None:
+                remaining = running.expected - (now - running.started_at)
+                return {"queue_position": None, "eta_seconds": round(max(0.0, remaining), 1)}
+            if job_id not in self._queued:
+                return None
+            positions, ordered = self._queue_order()
+            running_remaining = [e.expected - (now - e.started_at) for e in self._running.values()]
+        position = positions[job_id]
+        ahead = [entry.expected for entry in ordered[:position]]
+        start = estimate_start(ahead, running_remaining, self.max_workers)
+        return {
+            "queue_position": position + 1,
+            "eta_seconds": round(start + ordered[position].expected, 1),
+        }
+
+    def estimates(self) -> Dict[str, Dict]:
+        """Queue position and ETA of every queued and running job, as estimate()."""
+        now = time.time()
+        with self._cond:
+            _, ordered = self._queue_order()
+            queued = [(entry.job_id, entry.expected) for entry in ordered]
+            running = {
+                job_id: entry.expected - (now - entry.started_at) for job_id, entry in self._running.items()
+            }
+        return estimate_queue(queued, running, self.max_workers)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers once the queue drains."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> JobScheduler:
+    """Return the process-wide scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        return _scheduler
@@ -0,0 +1,216 @@
+"""Deterministic synthetic audio and images.
+
+Host calibration (app.calibrate) and the benchmarks run on these inputs.
+They are generated locally from a fixed seed so that two runs on the same
+host always process byte-identical inputs.
+"""
+import struct
+import subprocess
+import shutil
+import wave
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+BLOCK_SECONDS = 10
+AUDIO_KINDS = ("tone", "speech", "silence")
+DEFAULT_SEED = 1234
+
+
+def _tone_block(rng: np.random.Generator, t: np.ndarray) -> np.ndarray:
+    """A slowly gliding harmonic tone."""
+    base = rng.uniform(180.0, 320.0)
+    glide = rng.uniform(-20.0, 20.0)
+    freq = base + glide * t / BLOCK_SECONDS
+    phase = 2 * np.pi * np.cumsum(freq) / SAMPLE_RATE
+    signal = 0.5 * np.sin(phase) + 0.25 * np.sin(2 * phase) + 0.12 * np.sin(3 * phase)
+    return signal * 0.6
+
+
+def _speech_block(rng: np.random.Generator, t: np.ndarray) -> np.ndarray:
+    """Noise shaped like speech: ~4 Hz syllables, formant bands and pauses."""
+    noise = rng.standard_normal(t.size)
+    # Two crude formant bands from a voiced carrier and filtered noise
+    pitch = rng.uniform(100.0, 220.0)
+    carrier = np.sign(np.sin(2 * np.pi * pitch * t))
+    kernel = np.hanning(32)
+    kernel /= kernel.sum()
+    band = np.convolve(noise, kernel, mode="same")
+    voiced = 0.6 * carrier * np.abs(np.sin(2 * np.pi * rng.uniform(500, 900) * t)) + band
+
+    # Syllable envelope with random pauses between phrases
+    syllable_rate = rng.uniform(3.0, 5.0)
+    envelope = np.clip(np.sin(2 * np.pi * syllable_rate * t), 0.0, None) ** 0.5
+    phrase_gate = np.ones_like(t)
+    cursor = 0.0
+    while cursor < BLOCK_SECONDS:
+        phrase = rng.uniform(1.5, 4.0)
+        pause = rng.uniform(0.2, 0.9)
+        start = int((cursor + phrase) * SAMPLE_RATE)
+        end = int((cursor + phrase + pause) * SAMPLE_RATE)
+        phrase_gate[start:end] = 0.0
+        cursor += phrase + pause
+    return 0.35 * voiced * envelope * phrase_gate
+
+
+def _silence_block(rng: np.random.Generator, t: np.ndarray) -> np.ndarray:
+    """Near-silence with a faint noise floor (true digital silence is unrealistic)."""
+    return 0.0005 * rng.standard_normal(t.size)
+
+
+_GENERATORS = {
+    "tone": _tone_block,
+    "speech": _speech_block,
+    "silence": _silence_block,
+}
+
+
+def generate_audio_samples(kind: str, seconds: float, seed: int = DEFAULT_SEED):
+    """
+    Yield int16 sample blocks of synthetic audio.
+
+    Each block gets its own generator derived from (seed, kind, block index),
+    so output is deterministic and long fixtures never sit in memory at once.
+
+    Args:
+        kind: One of AUDIO_KINDS
+        seconds: Total duration in seconds
+        seed: Base random seed
+
+    Yields:
+        numpy int16 arrays of at most BLOCK_SECONDS of audio
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f"Unknown audio kind: {kind}. Expected one of {', '.join(AUDIO_KINDS)}")
+
+    generator = _GENERATORS[kind]
+    total_samples = int(round(seconds * SAMPLE_RATE))
+    block_samples = BLOCK_SECONDS * SAMPLE_RATE
+    kind_index = AUDIO_KINDS.index(kind)
+
+    for block_index, offset in enumerate(range(0, total_samples, block_samples)):
+        count = min(block_samples, total_samples - offset)
+        rng = np.random.default_rng([seed, kind_index, block_index])
+        t = np.arange(block_samples) / SAMPLE_RATE
+        block = generator(rng, t)[:count]
+        yield (np.clip(block, -1.0, 1.0) * 32767).astype("<i2")
+
+
+def write_wav(kind: str, seconds: float, output_path: Path, seed: int = DEFAULT_SEED) -> Path:
+    """
+    Write a synthetic 16 kHz mono 16-bit WAV file.
+
+    Returns:
+        Path to the written file
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(output_path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for block in generate_audio_samples(kind, seconds, seed):
+            wav.writeframes(block.tobytes())
+    return output_path
+
+
+def encode_m4a(wav_path: Path, output_path: Path, bitrate: str = "64k") -> Optional[Path]:
+    """
+    Encode a WAV fixture to AAC/M4A, the service's upload format.
+
+    Returns:
+        Path to the encoded file, or None if FFmpeg is not available
+    """
+    if shutil.which("ffmpeg") is None:
+        return None
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(wav_path),
+        "-c:a", "aac", "-b:a", bitrate,
+        # Keep the container byte-stable across runs
+        "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:a", "+bitexact",
+        str(output_path),
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return output_path
+
+
+def write_png(output_path: Path, width: int = 1280, height: int = 720, seed: int = DEFAULT_SEED) -> Path:
+    """
+    Write a deterministic gradient background image as an RGB PNG.
+
+    Returns:
+        Path to the written file
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.0, 1.0, width)[None, :]
+    y = np.linspace(0.0, 1.0, height)[:, None]
+    tint = rng.uniform(0.2, 0.8, size=3)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (255 * (tint[0] * x + (1 - tint[0]) * y)).astype(np.uint8)
+    pixels[..., 1] = (255 * (tint[1] * (1 - x) + (1 - tint[1]) * y)).astype(np.uint8)
+    pixels[..., 2] = (255 * (tint[2] * x * (1 - y) + 0.2)).clip(0, 255).astype(np.uint8)
+
+    # Each scanline is prefixed with filter type 0 (None)
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)], axis=1)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(png)
+    return output_path
+
+
+def build_fixture_set(
+    output_dir: Path,
+    durations_minutes,
+    kinds=AUDIO_KINDS,
+    seed: int = DEFAULT_SEED,
+    prefer_m4a: bool = True
+) -> dict:
+    """
+    Generate (or reuse) the full fixture matrix.
+
+    Fixtures are cached by name in output_dir; names encode kind, duration
+    and seed so a cached file is always the same content.
+
+    Returns:
+        Dict with "image" path and "audio" mapping of fixture name -> info dict
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    image_path = output_dir / f"background_{seed}.png"
+    if not image_path.exists():
+        write_png(image_path, seed=seed)
+
+    audio = {}
+    for minutes in durations_minutes:
+        for kind in kinds:
+            name = f"{kind}_{minutes}m"
+            wav_path = output_dir / f"{name}_{seed}.wav"
+            if not wav_path.exists():
+                write_wav(kind, minutes * 60, wav_path, seed)
+            path = wav_path
+            if prefer_m4a:
+                m4a_path = wav_path.with_suffix(".m4a")
+                if m4a_path.exists() or encode_m4a(wav_path, m4a_path):
+                    path = m4a_path
+            audio[name] = {
+                "kind": kind,
+                "seconds": minutes * 60,
+                "path": path,
+                "wav_path": wav_path,
+            }
+
+    return {"image": image_path, "audio": audio}
@@ -0,0 +1,192 @@
+"""Speed/quality tiers and adaptive transcription routing.
+
+A tier fixes the Whisper model size, compute type, beam size and VAD
+settings. Jobs may request a tier explicitly; "auto" (the default) routes on
+audio duration and queue pressure. A short language-ID probe lets English
+audio use the faster English-only (".en") model variants; it only runs for
+tiers whose model has one. Warm-up loads the models routing picks by
+default (routed_models), so the probe and the ".en" variant are ready too.
+
+Compute types and beam sizes measured by `python -m app.calibrate` replace
+the built-in defaults below; A2V_TIER_* variables override both.
+"""
+import logging
+import os
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.host_profile import HOST_PROFILE
+from app.services.transcription import detect_language
+
+logger = logging.getLogger(__name__)
+
+AUTO_TIER = "auto"
+DEFAULT_TIER = os.getenv("A2V_DEFAULT_TIER", AUTO_TIER)
+
+# Queue depth at which "auto" trades accuracy for throughput
+QUEUE_PRESSURE_DEPTH = int(os.getenv("A2V_QUEUE_PRESSURE_DEPTH", "4"))
+SHORT_AUDIO_SECONDS = float(os.getenv("A2V_SHORT_AUDIO_SECONDS", "120"))
+LONG_AUDIO_SECONDS = float(os.getenv("A2V_LONG_AUDIO_SECONDS", "3600"))
+
+LANGUAGE_PROBE_ENABLED = os.getenv("A2V_LANGUAGE_PROBE", "1") == "1"
+LANGUAGE_PROBE_SECONDS = float(os.getenv("A2V_LANGUAGE_PROBE_SECONDS", "20"))
+LANGUAGE_PROBE_MIN_PROBABILITY = float(os.getenv("A2V_LANGUAGE_PROBE_MIN_PROBABILITY", "0.8"))
+# Language used when the probe is disabled or unavailable
+DEFAULT_LANGUAGE = os.getenv("A2V_LANGUAGE", "en") or None
+
+# Models that ship an English-only variant
+ENGLISH_ONLY_MODELS = {"tiny", "base", "small", "medium"}
+PROBE_COMPUTE_TYPE = "int8"
+
+
+@dataclass(frozen=True)
+class TierConfig:
+    """Transcription settings for one speed/quality tier."""
+    name: str
+    model: str
+    compute_type: str
+    beam_size: int
+    vad_filter: bool
+    vad_min_silence_ms: Optional[int] = None
+
+
+def _tier(name: str, model: str, compute_type: str, beam_size: int, vad_filter: bool, vad_ms: Optional[int]):
+    prefix = f"A2V_TIER_{name.upper()}_"
+    calibrated = HOST_PROFILE.get("tiers", {}).get(name, {})
+    model = os.getenv(prefix + "MODEL", model)
+    if calibrated.get("model") == model:
+        # Only valid for the model it was measured with
+        compute_type = calibrated.get("compute_type", compute_type)
+        beam_size = calibrated.get("beam_size", beam_size)
+    return TierConfig(
+        name=name,
+        model=model,
+        compute_type=os.getenv(prefix + "COMPUTE_TYPE", compute_type),
+        beam_size=int(os.getenv(prefix + "BEAM_SIZE", str(beam_size))),
+        vad_filter=os.getenv(prefix + "VAD", "1" if vad_filter else "0") == "1",
+        vad_min_silence_ms=vad_ms,
+    )
+
+
+TIERS: Dict[str, TierConfig] = {
+    "fast": _tier("fast", "tiny", "int8", 1, True, 500),
+    "balanced": _tier("balanced", os.getenv("WHISPER_MODEL", "base"), "int8", 5, True, 1000),
+    "accurate": _tier("accurate", "small", "int8_float32", 5, False, None),
+}
+TIER_ORDER = ["fast", "balanced", "accurate"]
+
+
+def validate_tier(tier: Optional[str]) -> str:
+    """
+    Normalize a requested tier name.
+
+    Raises:
+        ValueError: If the tier is unknown
+    """
+    name = (tier or DEFAULT_TIER).strip().lower()
+    if name != AUTO_TIER and name not in TIERS:
+        raise ValueError(f"Unknown tier '{tier}'. Allowed: {', '.join([AUTO_TIER] + TIER_ORDER)}")
+    return name
+
+
+def _downgrade(name: str) -> str:
+    index = TIER_ORDER.index(name)
+    return TIER_ORDER[max(0, index - 1)]
+
+
+def select_tier(
+    requested: Optional[str],
+    duration: Optional[float],
+    queue_depth: int,
+    audio_path: Optional[Path] = None,
+    model_path: Optional[str] = None
+) -> Dict:
+    """
+    Choose the transcription settings for a job.
+
+    Args:
+        requested: Requested tier name, "auto" or None
+        duration: Audio duration in seconds, if known
+        queue_depth: Jobs waiting behind this one
+        audio_path: Audio to probe for language; probing is skipped if None
+        model_path: Local model directory; overrides the tier's model size
+
+    Returns:
+        Dict with the chosen settings plus "requested", "reason" and
+        "language", suitable for storing in job metadata
+    """
+    requested_name = validate_tier(requested)
+    reasons = []
+
+    if requested_name != AUTO_TIER:
+        name = requested_name
+        reasons.append("requested")
+    else:
+        if duration is not None and duration <= SHORT_AUDIO_SECONDS:
+            name = "accurate"
+            reasons.append(f"short audio ({duration:.0f}s)")
+        elif duration is not None and duration >= LONG_AUDIO_SECONDS:
+            name = "fast"
+            reasons.append(f"long audio ({duration:.0f}s)")
+        else:
+            name = "balanced"
+            reasons.append("default")
+        if queue_depth >= QUEUE_PRESSURE_DEPTH and name != "fast":
+            name = _downgrade(name)
+            reasons.append(f"queue pressure ({queue_depth} waiting)")
+
+    tier = TIERS[name]
+    language = DEFAULT_LANGUAGE
+    language_probability = None
+
+    if model_path and Path(model_path).exists():
+        tier = replace(tier, model=model_path)
+        reasons.append("local model")
+    elif LANGUAGE_PROBE_ENABLED and audio_path is not None and tier.model not in ENGLISH_ONLY_MODELS:
+        # Nothing to switch to: Whisper detects the language itself while
+        # transcribing, without decoding the audio twice
+        language = None
+    elif LANGUAGE_PROBE_ENABLED and audio_path is not None:
+        detected = detect_language(audio_path, LANGUAGE_PROBE_SECONDS, TIERS["fast"].model, PROBE_COMPUTE_TYPE)
+        if detected is not None:
+            language_probability = detected[1]
+            if language_probability >= LANGUAGE_PROBE_MIN_PROBABILITY:
+                language = detected[0]
+                if language == "en" and tier.model in ENGLISH_ONLY_MODELS:
+                    tier = replace(tier, model=f"{tier.model}.en")
+                    reasons.append("English-only model")
+            else:
+                # Inconclusive probe: let Whisper detect over the full audio
+                language = None
+
+    decision = asdict(tier)
+    decision.update({
+        "requested": requested_name,
+        "language": language,
+        "language_probability": language_probability,
+        "reason": ", ".join(reasons),
+    })
+    logger.info(f"Selected tier {tier.name} ({tier.model}, beam {tier.beam_size}): {decision['reason']}")
+    return decision
+
+
+def routed_models(model_name: str) -> List[Tuple[str, str]]:
+    """
+    Models the default (balanced) routing loads, for warm-up.
+
+    Args:
+        model_name: Whisper model served by the balanced tier
+
+    Returns:
+        (model, compute type) pairs: the model itself, plus its ".en"
+        variant and the language probe's model when the probe can route
+        English audio to that variant
+    """
+    balanced = TIERS["balanced"]
+    compute_type = balanced.compute_type if balanced.model == model_name else "int8"
+    models = [(model_name, compute_type)]
+    if LANGUAGE_PROBE_ENABLED and model_name in ENGLISH_ONLY_MODELS:
+        models.append((f"{model_name}.en", compute_type))
+        models.append((TIERS["fast"].model, PROBE_COMPUTE_TYPE))
+    return models
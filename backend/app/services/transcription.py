@@ -1,82 +1,218 @@
-"""Transcription service using faster-whisper."""
+"""Transcription service using faster-whisper.
+
+faster_whisper (and ctranslate2) are imported lazily when the model is first
+loaded, so importing this module is cheap and workers start serving quickly.
+"""
 import os
 import logging
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Optional, TYPE_CHECKING, Any
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 
-if TYPE_CHECKING or os.getenv("A2V_TEST_MODE") != "1":
+if TYPE_CHECKING:
     from faster_whisper import WhisperModel
-else:
-    WhisperModel = Any
+
+from app.services.cpu_budget import get_cpu_budget
+from app.services.fake_engines import fake_engines_enabled, simulate
+from app.utils.metrics import MODEL_LOAD_DURATION, TRANSCRIPTION_RTF, record_cache_lookup
 
 logger = logging.getLogger(__name__)
 
-# Global model instance (singleton)
-_model_instance: Optional[WhisperModel] = None
+# Loaded models keyed by (model name or path, compute type), least recently
+# used first. Speed/quality tiers can use several models at once. Warmed
+# models are pinned: they stay loaded and do not count towards the limit,
+# which bounds the models jobs load on demand.
+MAX_LOADED_MODELS = int(os.getenv("A2V_MAX_LOADED_MODELS", "3"))
+_models: "OrderedDict[Tuple[str, str], WhisperModel]" = OrderedDict()
+_pinned: set = set()
+_models_lock = threading.Lock()
 
 
-def get_model(model_name: str = "base", model_path: Optional[str] = None) -> WhisperModel:
+def get_model(
+    model_name: str = "base",
+    model_path: Optional[str] = None,
+    compute_type: str = "int8"
+) -> "WhisperModel":
     """
-    Get or load the Whisper model (singleton pattern).
-    
+    Get or load a Whisper model (cached per model and compute type).
+
+    Threading comes from the CPU budget: cpu_threads is the share of one
+    transcribe slot and num_workers lets every slot transcribe at once.
+
     Args:
         model_name: Name of the model to use (e.g., "base", "small")
         model_path: Optional path to local model directory
-        
+        compute_type: CTranslate2 compute type (e.g., "int8", "float32")
+
     Returns:
         WhisperModel instance
     """
-    global _model_instance
-    
-    if _model_instance is None:
+    use_path = bool(model_path and Path(model_path).exists())
+    key = (model_path if use_path else model_name, compute_type)
+
+    with _models_lock:
+        model = _models.get(key)
+        record_cache_lookup("whisper_model", model is not None)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
         try:
-            if model_path and Path(model_path).exists():
-                logger.info(f"Loading Whisper model from local path: {model_path}")
-                _model_instance = WhisperModel(model_path, device="cpu", compute_type="int8")
+            load_start = time.perf_counter()
+            from faster_whisper import WhisperModel
+
+            if use_path:
+                logger.info(f"Loading Whisper model from local path: {model_path} ({compute_type})")
             else:
-                logger.info(f"Loading Whisper model: {model_name} (will download if needed)")
-                _model_instance = WhisperModel(model_name, device="cpu", compute_type="int8")
-            logger.info("Whisper model loaded successfully")
+                logger.info(f"Loading Whisper model: {model_name} ({compute_type}, will download if needed)")
+            cpu_threads, num_workers = get_cpu_budget().whisper_settings()
+            model = WhisperModel(
+                key[0], device="cpu", compute_type=compute_type,
+                cpu_threads=cpu_threads, num_workers=num_workers
+            )
+            load_elapsed = time.perf_counter() - load_start
+            MODEL_LOAD_DURATION.labels(model=key[0]).observe(load_elapsed)
+            logger.info(
+                f"Whisper model loaded successfully in {load_elapsed:.2f}s "
+                f"({cpu_threads} threads x {num_workers} workers)"
+            )
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
             raise RuntimeError(f"Failed to load Whisper model: {e}")
-    
-    return _model_instance
+
+        _models[key] = model
+        unpinned = [loaded for loaded in _models if loaded not in _pinned]
+        while len(unpinned) > max(1, MAX_LOADED_MODELS):
+            evicted = unpinned.pop(0)
+            del _models[evicted]
+            logger.info(f"Unloaded Whisper model {evicted[0]} ({evicted[1]})")
+        return model
 
 
-def transcribe_audio(audio_path: Path, model_name: str = "base", model_path: Optional[str] = None) -> List[Dict]:
+def is_model_loaded() -> bool:
+    """Return True if a Whisper model has been loaded."""
+    if fake_engines_enabled():
+        return True
+    return bool(_models)
+
+
+def warm_up_model(model_name: str = "base", model_path: Optional[str] = None, compute_type: str = "int8") -> None:
+    """
+    Load the model and run one short inference so the first real job does
+    not pay for lazy initialization. The model stays pinned in the cache.
+
+    Args:
+        model_name: Whisper model name
+        model_path: Optional path to local model
+        compute_type: CTranslate2 compute type the jobs will request
+    """
+    if fake_engines_enabled():
+        return
+
+    import numpy as np
+
+    model = get_model(model_name, model_path, compute_type)
+    use_path = bool(model_path and Path(model_path).exists())
+    with _models_lock:
+        _pinned.add((model_path if use_path else model_name, compute_type))
+    # One second of silence at Whisper's 16 kHz input rate
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1, language="en")
+    list(segments)
+
+
+def detect_language(
+    audio_path: Path,
+    seconds: float = 30.0,
+    model_name: str = "tiny",
+    compute_type: str = "int8"
+) -> Optional[Tuple[str, float]]:
+    """
+    Identify the spoken language from the first seconds of audio.
+
+    Args:
+        audio_path: Path to audio file
+        seconds: Length of the probe window
+        model_name: Model used for the probe (small models are enough)
+        compute_type: CTranslate2 compute type
+
+    Returns:
+        (language code, probability), or None if the probe failed
+    """
+    if fake_engines_enabled():
+        return None
+
+    try:
+        import subprocess
+        import numpy as np
+
+        model = get_model(model_name, compute_type=compute_type)
+        # Decode only the probe window rather than the whole recording
+        result = subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-v", "error", "-t", str(seconds), "-i", str(audio_path),
+                "-f", "s16le", "-ac", "1", "-ar", "16000", "-",
+            ],
+            capture_output=True, timeout=60, check=True
+        )
+        audio = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+        # transcribe() detects the language eagerly; segments are never decoded
+        _, info = model.transcribe(audio, beam_size=1)
+        return info.language, info.language_probability
+    except Exception as e:
+        logger.warning(f"Language probe failed for {audio_path}: {e}")
+        return None
+
+
+def transcribe_audio(
+    audio_path: Path,
+    model_name: str = "base",
+    model_path: Optional[str] = None,
+    compute_type: str = "int8",
+    beam_size: int = 5,
+    language: Optional[str] = "en",
+    vad_filter: bool = False,
+    vad_min_silence_ms: Optional[int] = None
+) -> List[Dict]:
     """
     Transcribe audio file and return segments with timestamps.
-    
+
     Args:
         audio_path: Path to audio file
         model_name: Whisper model name
         model_path: Optional path to local model
-        
+        compute_type: CTranslate2 compute type
+        beam_size: Beam size for decoding
+        language: Language code, or None to let Whisper detect it
+        vad_filter: Skip non-speech with Silero VAD
+        vad_min_silence_ms: Minimum silence duration for the VAD to split on
+
     Returns:
         List of segment dicts with 'id', 'start', 'end', 'text' keys
-        
+
     Raises:
         RuntimeError: If transcription fails
     """
-    if os.getenv("A2V_TEST_MODE") == "1":
+    if fake_engines_enabled():
+        simulate("transcribe")
         return [{"id": 1, "start": 0.0, "end": 1.2, "text": "Test transcript segment."}]
 
     if not audio_path.exists():
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
-    
+
     try:
-        model = get_model(model_name, model_path)
+        model = get_model(model_name, model_path, compute_type)
         logger.info(f"Starting transcription of {audio_path}")
-        
-        segments, info = model.transcribe(
-            str(audio_path),
-            beam_size=5,
-            language="en"  # Can be made configurable
-        )
-        
+        start = time.perf_counter()
+
+        options = {"beam_size": beam_size, "language": language, "vad_filter": vad_filter}
+        if vad_filter and vad_min_silence_ms is not None:
+            options["vad_parameters"] = {"min_silence_duration_ms": vad_min_silence_ms}
+        segments, info = model.transcribe(str(audio_path), **options)
+
         logger.info(f"Detected language: {info.language} (probability: {info.language_probability:.2f})")
-        
+
         result_segments = []
         for i, segment in enumerate(segments, start=1):
             result_segments.append({
@@ -85,10 +221,13 @@ def transcribe_audio(audio_path: Path, model_name: str = "base", model_path: Opt
                 'end': segment.end,
                 'text': segment.text
             })
-        
-        logger.info(f"Transcription complete: {len(result_segments)} segments")
+
+        elapsed = time.perf_counter() - start
+        if info.duration:
+            TRANSCRIPTION_RTF.observe(elapsed / info.duration)
+        logger.info(f"Transcription complete: {len(result_segments)} segments in {elapsed:.2f}s")
         return result_segments
-        
+
     except Exception as e:
         logger.error(f"Transcription failed: {e}")
         raise RuntimeError(f"Transcription failed: {e}")
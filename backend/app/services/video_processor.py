@@ -1,13 +1,95 @@
 """Video processing service using FFmpeg."""
+import math
 import subprocess
 import shutil
 import logging
 import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from app.services.cpu_budget import CpuLease, get_cpu_budget
+from app.services.fake_engines import fake_engines_enabled, simulate
+from app.services.host_profile import HOST_PROFILE
+from app.utils.metrics import FFMPEG_ENCODE_SPEED
+from app.utils.profiler import parse_ffmpeg_benchmark
 
 logger = logging.getLogger(__name__)
 
+_SPEED_PATTERN = re.compile(r"speed=\s*([0-9.]+)x")
+
+
+def parse_encode_speed(stderr: str) -> Optional[float]:
+    """
+    Extract the final encode speed (multiple of real time) from FFmpeg stderr.
+    
+    Returns:
+        Speed as a float, or None if FFmpeg did not report one
+    """
+    matches = _SPEED_PATTERN.findall(stderr or "")
+    if not matches:
+        return None
+    try:
+        return float(matches[-1])
+    except ValueError:
+        return None
+
+
+# Output format shared by the single-process and chunked renders, so their
+# MP4s are interchangeable and chunk streams can be concatenated losslessly
+RENDER_FPS = 25
+GOP_FRAMES = 250  # libx264's default keyint
+
+# Rendition ladder: name -> frame size. Every job gets PRIMARY_RENDITION;
+# the others are rendered on request in the same FFmpeg pass.
+RENDITIONS = {"360p": (640, 360), "720p": (1280, 720), "1080p": (1920, 1080)}
+PRIMARY_RENDITION = "720p"
+# Renditions for jobs that do not request any, e.g. "360p,1080p"
+DEFAULT_RENDITIONS = os.getenv("A2V_RENDITIONS", "")
+
+
+def scale_filter(width: int, height: int) -> str:
+    """Fit the frame into width x height, letterboxed."""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+VIDEO_FILTER = scale_filter(*RENDITIONS[PRIMARY_RENDITION])
+# Explicit setting, else the calibrated host profile, else x264's default
+X264_PRESET = (
+    os.getenv("A2V_X264_PRESET") or HOST_PROFILE.get("encoding", {}).get("preset") or "medium"
+)
+
+
+def video_codec_args(preset: str = X264_PRESET) -> List[str]:
+    """libx264 output arguments shared by every render."""
+    return ["-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p", "-g", str(GOP_FRAMES)]
+
+
+VIDEO_CODEC_ARGS = video_codec_args()
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+AUDIO_ENCODER_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+AUDIO_CODEC_ARGS = [*AUDIO_ENCODER_ARGS, "-af", LOUDNORM_FILTER]
+
+# Recordings at least this long are rendered as parallel chunks
+CHUNKED_RENDER_MIN_SECONDS = float(os.getenv("A2V_CHUNKED_RENDER_MIN_SECONDS", "1200"))
+# Number of chunks; 0 uses one per CPU core
+RENDER_CHUNKS = int(os.getenv("A2V_RENDER_CHUNKS", "0"))
+
+REQUIRED_ENCODERS = ("libx264", "aac")
+REQUIRED_FILTERS = ("loudnorm",)
+
+# Positive lookups are cached; a missing FFmpeg is re-checked so installing
+# it does not require a restart.
+_ffmpeg_path: Optional[str] = None
+_ffmpeg_capabilities: Optional[Dict] = None
+_capabilities_lock = threading.Lock()
+
 
 def check_ffmpeg() -> bool:
     """
@@ -16,9 +98,348 @@ def check_ffmpeg() -> bool:
     Returns:
         True if FFmpeg is available, False otherwise
     """
-    if os.getenv("A2V_TEST_MODE") == "1":
+    global _ffmpeg_path
+    if fake_engines_enabled():
         return True
-    return shutil.which("ffmpeg") is not None
+    if _ffmpeg_path is None:
+        _ffmpeg_path = shutil.which("ffmpeg")
+    return _ffmpeg_path is not None
+
+
+def _list_ffmpeg_names(flag: str) -> set:
+    """Return the names listed by `ffmpeg -encoders` / `ffmpeg -filters`."""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", flag], capture_output=True, text=True, timeout=10
+    )
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # Listing rows are "<flags> <name> <description...>"
+        if len(parts) >= 2 and not parts[0].startswith("="):
+            names.add(parts[1])
+    return names
+
+
+def probe_ffmpeg() -> Dict:
+    """
+    Probe FFmpeg version and the codecs/filters the pipeline needs.
+    
+    The result is cached once FFmpeg has been found.
+    
+    Returns:
+        Dict with "available", "version", "encoders", "filters" and "ready"
+    """
+    global _ffmpeg_capabilities
+    if fake_engines_enabled():
+        return {
+            "available": True,
+            "version": "test",
+            "encoders": {name: True for name in REQUIRED_ENCODERS},
+            "filters": {name: True for name in REQUIRED_FILTERS},
+            "ready": True,
+        }
+    
+    with _capabilities_lock:
+        if _ffmpeg_capabilities is not None:
+            return _ffmpeg_capabilities
+        
+        if not check_ffmpeg():
+            return {"available": False, "version": None, "encoders": {}, "filters": {}, "ready": False}
+        
+        try:
+            version_output = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-version"], capture_output=True, text=True, timeout=10
+            ).stdout
+            first_line = version_output.splitlines()[0] if version_output else ""
+            version = first_line.split()[2] if first_line.startswith("ffmpeg version") else first_line
+            encoders = _list_ffmpeg_names("-encoders")
+            filters = _list_ffmpeg_names("-filters")
+        except (OSError, subprocess.SubprocessError, IndexError) as e:
+            logger.error(f"FFmpeg capability probe failed: {e}")
+            return {"available": True, "version": None, "encoders": {}, "filters": {}, "ready": False}
+        
+        encoder_status = {name: name in encoders for name in REQUIRED_ENCODERS}
+        filter_status = {name: name in filters for name in REQUIRED_FILTERS}
+        _ffmpeg_capabilities = {
+            "available": True,
+            "version": version,
+            "encoders": encoder_status,
+            "filters": filter_status,
+            "ready": all(encoder_status.values()) and all(filter_status.values()),
+        }
+        return _ffmpeg_capabilities
+
+
+def parse_renditions(value: Optional[str]) -> List[str]:
+    """
+    Validate a comma-separated list of rendition names.
+    
+    Returns:
+        Distinct names, smallest first
+        
+    Raises:
+        ValueError: For unknown names
+    """
+    names = {name.strip() for name in (value or "").split(",") if name.strip()}
+    unknown = sorted(names - RENDITIONS.keys())
+    if unknown:
+        raise ValueError(
+            f"Unknown renditions: {', '.join(unknown)}. Allowed: {', '.join(RENDITIONS)}"
+        )
+    return sorted(names, key=lambda name: RENDITIONS[name][1])
+
+
+def _render_chunk_count() -> int:
+    return RENDER_CHUNKS if RENDER_CHUNKS > 0 else (os.cpu_count() or 1)
+
+
+def plan_chunks(duration: float, chunks: int) -> List[Tuple[float, float]]:
+    """
+    Split a timeline into GOP-aligned time ranges.
+    
+    Every range but the last spans a whole number of GOPs, so each part
+    starts exactly where the single-process encode would place a keyframe.
+    
+    Args:
+        duration: Total length in seconds
+        chunks: Desired number of ranges (fewer are returned for short input)
+        
+    Returns:
+        (start, length) pairs in seconds covering [0, duration)
+    """
+    gop_seconds = GOP_FRAMES / RENDER_FPS
+    total_gops = max(1, math.ceil(duration / gop_seconds))
+    gops_per_chunk = math.ceil(total_gops / max(1, min(chunks, total_gops)))
+    chunk_seconds = gops_per_chunk * gop_seconds
+    ranges = []
+    start = 0.0
+    while start < duration:
+        length = min(chunk_seconds, duration - start)
+        ranges.append((start, length))
+        start += chunk_seconds
+    return ranges
+
+
+def _background_input_args(bg_image: Optional[Path], length: Optional[float] = None) -> List[str]:
+    """FFmpeg input arguments for the still background, optionally limited to `length` seconds."""
+    if bg_image:
+        limit = ["-t", f"{length:.3f}"] if length is not None else []
+        return ["-loop", "1", "-framerate", str(RENDER_FPS), *limit, "-i", str(bg_image)]
+    # Solid black; without a length, -shortest trims it to the audio
+    return ["-f", "lavfi", "-i", f"color=c=black:s=1280x720:r={RENDER_FPS}:d={length or 3600:.3f}"]
+
+
+def build_chunk_commands(
+    audio_path: Path,
+    bg_image: Optional[Path],
+    work_dir: Path,
+    ranges: List[Tuple[float, float]],
+    threads: int,
+    benchmark: bool = False
+) -> Tuple[List[List[str]], List[Path], Path]:
+    """
+    Build the FFmpeg commands for a chunked render.
+    
+    Returns:
+        (commands, video part paths, audio track path); the first command
+        encodes the audio track, the rest one video part each
+    """
+    bench = ["-benchmark"] if benchmark else []
+    audio_track = work_dir / "audio.m4a"
+    commands = [["ffmpeg", "-y", *bench, "-i", str(audio_path), "-vn", *AUDIO_CODEC_ARGS, str(audio_track)]]
+    parts = []
+    for index, (_, length) in enumerate(ranges):
+        part = work_dir / f"part_{index:04d}.mp4"
+        parts.append(part)
+        commands.append([
+            "ffmpeg", "-y", *bench,
+            *_background_input_args(bg_image, length),
+            "-an", *VIDEO_CODEC_ARGS,
+            "-threads", str(threads),
+            "-vf", VIDEO_FILTER,
+            "-frames:v", str(max(1, round(length * RENDER_FPS))),
+            str(part)
+        ])
+    return commands, parts, audio_track
+
+
+def _tee_escape(path: Path) -> str:
+    return re.sub(r"([\\|\[\]])", r"\\\1", str(path))
+
+
+def build_ladder_command(
+    audio_path: Path,
+    bg_image: Optional[Path],
+    outputs: Dict[str, Path],
+    threads: int,
+    benchmark: bool = False
+) -> List[str]:
+    """
+    Build one FFmpeg command that renders several renditions.
+    
+    The background is decoded once and split to one scaler and encoder per
+    rendition. The audio is normalized and AAC-encoded once, and the tee
+    muxer writes it into every output next to that output's video stream.
+    
+    Args:
+        outputs: Rendition name -> output path
+        threads: Threads per video encoder
+    """
+    names = list(outputs)
+    graph = [f"[0:v]split={len(names)}" + "".join(f"[v{i}]" for i in range(len(names)))]
+    graph += [f"[v{i}]{scale_filter(*RENDITIONS[name])}[out{i}]" for i, name in enumerate(names)]
+    graph.append(f"[1:a]{LOUDNORM_FILTER}[aout]")
+    cmd = ["ffmpeg", "-y", *(["-benchmark"] if benchmark else [])]
+    cmd.extend(_background_input_args(bg_image))
+    cmd.extend(["-i", str(audio_path), "-filter_complex", ";".join(graph)])
+    for i in range(len(names)):
+        cmd.extend(["-map", f"[out{i}]"])
+    cmd.extend([
+        "-map", "[aout]",
+        *VIDEO_CODEC_ARGS,
+        *AUDIO_ENCODER_ARGS,
+        "-threads", str(threads),
+        # The tee muxer cannot ask encoders for MP4's global headers itself
+        "-flags", "+global_header",
+        "-shortest",
+        "-f", "tee",
+        "|".join(
+            f"[f=mp4:movflags=+faststart:select=\\'v:{i},a\\']{_tee_escape(outputs[name])}"
+            for i, name in enumerate(names)
+        ),
+    ])
+    return cmd
+
+
+def _run_ffmpeg(cmd: List[str], timeout: int, lease: Optional[CpuLease] = None) -> subprocess.CompletedProcess:
+    """
+    Run FFmpeg like subprocess.run, attaching the process to a CPU lease.
+    
+    Raises:
+        subprocess.TimeoutExpired: If FFmpeg runs longer than timeout (it is killed)
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if lease is not None:
+        lease.attach(process.pid)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+def _run_ffmpeg_parallel(
+    commands: List[List[str]],
+    workers: int,
+    timeout: int,
+    lease: Optional[CpuLease] = None
+) -> List[str]:
+    """
+    Run FFmpeg commands concurrently, killing the rest when one fails.
+    
+    Returns:
+        Stderr of each command, in order
+        
+    Raises:
+        RuntimeError: If any command fails or times out
+    """
+    processes: List[subprocess.Popen] = []
+    lock = threading.Lock()
+    cancelled = threading.Event()
+    
+    def run(cmd: List[str]) -> str:
+        with lock:
+            if cancelled.is_set():
+                raise RuntimeError("Cancelled after another part failed")
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            processes.append(process)
+        if lease is not None:
+            lease.attach(process.pid)
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise RuntimeError(f"FFmpeg execution timed out after {timeout} seconds")
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg execution failed: {stderr or 'Unknown FFmpeg error'}")
+        return stderr
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, cmd) for cmd in commands]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        error = next((f.exception() for f in done if f.exception()), None)
+        if error is not None:
+            with lock:
+                cancelled.set()
+                for process in processes:
+                    if process.poll() is None:
+                        process.kill()
+    if error is not None:
+        raise error
+    return [future.result() for future in futures]
+
+
+def _render_chunked(
+    audio_path: Path,
+    bg_image: Optional[Path],
+    output_path: Path,
+    duration: float,
+    timeout: int,
+    benchmark: bool,
+    lease: CpuLease
+) -> Optional[Dict[str, float]]:
+    """
+    Render as GOP-aligned video parts encoded in parallel, plus one audio
+    encode, then join the parts with the concat demuxer and mux the audio
+    in a single stream-copy pass. The parts split the render's CPU lease.
+    """
+    chunks = _render_chunk_count()
+    ranges = plan_chunks(duration, chunks)
+    workers = max(1, min(len(ranges) + 1, lease.threads))
+    threads = max(1, lease.threads // workers)
+    work_dir = output_path.parent / f".{output_path.stem}.parts"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+    started = time.perf_counter()
+    try:
+        commands, parts, audio_track = build_chunk_commands(
+            audio_path, bg_image, work_dir, ranges, threads, benchmark
+        )
+        logger.info(f"Rendering {len(parts)} parts on {workers} workers ({threads} threads each)")
+        stderrs = _run_ffmpeg_parallel(commands, workers, timeout, lease)
+        
+        concat_list = work_dir / "parts.txt"
+        concat_list.write_text("".join(f"file '{part.name}'\n" for part in parts))
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0", "-i", str(concat_list),
+            "-i", str(audio_track),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c", "copy",
+            "-shortest",
+            "-movflags", "+faststart",
+            str(output_path)
+        ]
+        logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
+        result = _run_ffmpeg(cmd, timeout, lease)
+        if result.returncode != 0:
+            error_msg = result.stderr or result.stdout or "Unknown FFmpeg error"
+            raise RuntimeError(f"FFmpeg concat failed: {error_msg}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if not benchmark:
+        return None
+    # CPU time adds up across processes; wall time is the whole render
+    totals: Dict[str, float] = {"rtime": round(time.perf_counter() - started, 3)}
+    for stats in map(parse_ffmpeg_benchmark, stderrs):
+        for key in ("utime", "stime", "maxrss_kb"):
+            if key in stats:
+                totals[key] = totals.get(key, 0.0) + stats[key]
+    return totals
 
 
 def generate_video(
@@ -26,25 +447,45 @@ def generate_video(
     image_path: Optional[Path],
     output_path: Path,
     timeout: int = 600,
-    default_image_path: Optional[Path] = None
-) -> None:
+    default_image_path: Optional[Path] = None,
+    benchmark: bool = False,
+    duration: Optional[float] = None,
+    renditions: Optional[Dict[str, Path]] = None
+) -> Optional[Dict[str, float]]:
     """
     Generate MP4 video from audio and background image using FFmpeg.
     
+    Recordings of at least A2V_CHUNKED_RENDER_MIN_SECONDS are encoded as
+    parallel GOP-aligned chunks (see _render_chunked); the result has the
+    same streams and settings as a single-process render. FFmpeg runs with
+    the thread count of a CPU budget lease held for the whole render.
+    Additional renditions are rendered with the primary one in a single
+    FFmpeg pass (see build_ladder_command) instead.
+    
     Args:
         audio_path: Path to input audio file
         image_path: Optional path to background image
         output_path: Path where output video should be saved
         timeout: Timeout in seconds for FFmpeg execution
         default_image_path: Optional path to default background image
+        benchmark: Run FFmpeg with -benchmark and return its stats
+        duration: Audio duration in seconds, if known; enables chunking
+        renditions: Other rendition names -> output paths, rendered
+            alongside output_path (the PRIMARY_RENDITION)
+        
+    Returns:
+        FFmpeg -benchmark stats (utime, stime, rtime, maxrss_kb) when
+        benchmark is True, otherwise None
         
     Raises:
         RuntimeError: If FFmpeg is not available or execution fails
     """
-    if os.getenv("A2V_TEST_MODE") == "1":
+    if fake_engines_enabled():
+        simulate("render")
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_bytes(b"test-video")
-        return
+        for path in [output_path, *(renditions or {}).values()]:
+            path.write_bytes(b"test-video")
+        return {} if benchmark else None
 
     if not check_ffmpeg():
         raise RuntimeError("FFmpeg is not installed or not found in PATH")
@@ -60,7 +501,61 @@ def generate_video(
         logger.warning("No background image provided, will create solid color background")
         bg_image = None
     
+    with get_cpu_budget().lease("render") as lease:
+        if renditions:
+            outputs = {**renditions, PRIMARY_RENDITION: output_path}
+            return _render_ladder(audio_path, bg_image, outputs, timeout, benchmark, lease)
+        return _render_video(audio_path, bg_image, output_path, timeout, benchmark, duration, lease)
+
+
+def _render_ladder(
+    audio_path: Path,
+    bg_image: Optional[Path],
+    outputs: Dict[str, Path],
+    timeout: int,
+    benchmark: bool,
+    lease: CpuLease
+) -> Optional[Dict[str, float]]:
+    """Render every rendition in one FFmpeg process; the encoders split the lease."""
+    threads = max(1, lease.threads // len(outputs))
+    cmd = build_ladder_command(audio_path, bg_image, outputs, threads, benchmark)
+    logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
+    try:
+        result = _run_ffmpeg(cmd, timeout, lease)
+    except subprocess.TimeoutExpired:
+        logger.error(f"FFmpeg execution timed out after {timeout} seconds")
+        raise RuntimeError(f"FFmpeg execution timed out after {timeout} seconds")
+    if result.returncode != 0:
+        error_msg = result.stderr or result.stdout or "Unknown FFmpeg error"
+        logger.error(f"FFmpeg failed: {error_msg}")
+        raise RuntimeError(f"Video generation failed: {error_msg}")
+    missing = [name for name, path in outputs.items() if not path.exists()]
+    if missing:
+        raise RuntimeError(f"FFmpeg completed but renditions were not created: {', '.join(missing)}")
+    
+    speed = parse_encode_speed(result.stderr)
+    if speed:
+        FFMPEG_ENCODE_SPEED.observe(speed)
+    logger.info(f"Rendered {', '.join(outputs)} in one pass")
+    return parse_ffmpeg_benchmark(result.stderr) if benchmark else None
+
+
+def _render_video(
+    audio_path: Path,
+    bg_image: Optional[Path],
+    output_path: Path,
+    timeout: int,
+    benchmark: bool,
+    duration: Optional[float],
+    lease: CpuLease
+) -> Optional[Dict[str, float]]:
+    """Run the single-process or chunked render within a CPU lease."""
     try:
+        if duration and duration >= CHUNKED_RENDER_MIN_SECONDS and _render_chunk_count() > 1:
+            stats = _render_chunked(audio_path, bg_image, output_path, duration, timeout, benchmark, lease)
+            logger.info(f"Video generated successfully: {output_path}")
+            return stats
+        
         # Build FFmpeg command
         # Basic structure: ffmpeg -loop 1 -i image -i audio -c:v libx264 -c:a aac -pix_fmt yuv420p -shortest -s 1280x720 output.mp4
         
@@ -68,29 +563,17 @@ def generate_video(
             "ffmpeg",
             "-y",  # Overwrite output file
         ]
+        if benchmark:
+            cmd.append("-benchmark")
         
-        if bg_image:
-            # Use provided image
-            cmd.extend([
-                "-loop", "1",
-                "-i", str(bg_image),
-            ])
-        else:
-            # Create solid color background (black) - use long duration, -shortest will handle actual length
-            cmd.extend([
-                "-f", "lavfi",
-                "-i", "color=c=black:s=1280x720:d=3600",
-            ])
-        
+        cmd.extend(_background_input_args(bg_image))
         cmd.extend([
             "-i", str(audio_path),
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-c:a", "aac",
-            "-b:a", "192k",
-            "-pix_fmt", "yuv420p",
-            "-vf", "scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2",
-            "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
+            *VIDEO_CODEC_ARGS,
+            *AUDIO_CODEC_ARGS,
+            # Also sizes libx264's frame and lookahead threads
+            "-threads", str(lease.threads),
+            "-vf", VIDEO_FILTER,
             "-shortest",
             "-movflags", "+faststart",
             str(output_path)
@@ -98,12 +581,7 @@ def generate_video(
         
         logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
+        result = _run_ffmpeg(cmd, timeout, lease)
         
         if result.returncode != 0:
             error_msg = result.stderr or result.stdout or "Unknown FFmpeg error"
@@ -113,7 +591,12 @@ def generate_video(
         if not output_path.exists():
             raise RuntimeError("FFmpeg completed but output file was not created")
         
+        speed = parse_encode_speed(result.stderr)
+        if speed:
+            FFMPEG_ENCODE_SPEED.observe(speed)
+        
         logger.info(f"Video generated successfully: {output_path}")
+        return parse_ffmpeg_benchmark(result.stderr) if benchmark else None
         
     except subprocess.TimeoutExpired:
         logger.error(f"FFmpeg execution timed out after {timeout} seconds")
@@ -121,3 +604,68 @@ def generate_video(
     except Exception as e:
         logger.error(f"Video generation failed: {e}")
         raise RuntimeError(f"Video generation failed: {e}")
+
+
+def mux_subtitles(
+    video_path: Path,
+    subtitles_path: Path,
+    output_path: Path,
+    timeout: int = 120
+) -> None:
+    """
+    Add a WebVTT file to an MP4 as a soft mov_text subtitle track.
+    
+    Audio and video are stream-copied, so this is a remux that takes
+    milliseconds rather than another encode. The output is written to a
+    temporary file and renamed into place.
+    
+    Args:
+        video_path: Rendered MP4
+        subtitles_path: WebVTT subtitles
+        output_path: Path for the captioned MP4
+        timeout: Timeout in seconds for FFmpeg execution
+        
+    Raises:
+        RuntimeError: If FFmpeg is not available or execution fails
+    """
+    tmp_path = output_path.with_name(f".{output_path.stem}.{threading.get_ident()}.tmp.mp4")
+    if fake_engines_enabled():
+        simulate("mux")
+        tmp_path.write_bytes(video_path.read_bytes() + b"+mov_text")
+        os.replace(tmp_path, output_path)
+        return
+
+    if not check_ffmpeg():
+        raise RuntimeError("FFmpeg is not installed or not found in PATH")
+    
+    for path in (video_path, subtitles_path):
+        if not path.exists():
+            raise FileNotFoundError(f"Input file not found: {path}")
+    
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", str(video_path),
+        "-i", str(subtitles_path),
+        "-map", "0:v", "-map", "0:a", "-map", "1:s",
+        "-c:v", "copy",
+        "-c:a", "copy",
+        "-c:s", "mov_text",
+        "-movflags", "+faststart",
+        str(tmp_path)
+    ]
+    logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            error_msg = result.stderr or result.stdout or "Unknown FFmpeg error"
+            logger.error(f"FFmpeg subtitle mux failed: {error_msg}")
+            raise RuntimeError(f"FFmpeg execution failed: {error_msg}")
+        os.replace(tmp_path, output_path)
+        logger.info(f"Muxed subtitles into {output_path}")
+    except subprocess.TimeoutExpired:
+        logger.error(f"FFmpeg subtitle mux timed out after {timeout} seconds")
+        raise RuntimeError(f"FFmpeg subtitle mux timed out after {timeout} seconds")
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
@@ -0,0 +1,110 @@
+"""Background warm-up and readiness tracking.
+
+The API starts serving immediately; model loading and the FFmpeg capability
+probe run in a background thread and are reported by GET /api/ready.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.fake_engines import fake_engines_enabled
+from app.services.tiers import routed_models
+from app.services.transcription import is_model_loaded, warm_up_model
+from app.services.video_processor import probe_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("A2V_WARMUP", "1") == "1"
+
+
+class ReadinessState:
+    """Thread-safe record of warm-up progress for each component."""
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model: Dict = {"state": self.PENDING, "name": None, "load_seconds": None, "error": None}
+        self._ffmpeg: Optional[Dict] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def set_model(self, **fields) -> None:
+        with self._lock:
+            self._model.update(fields)
+
+    def set_ffmpeg(self, capabilities: Dict) -> None:
+        with self._lock:
+            self._ffmpeg = dict(capabilities)
+
+    def snapshot(self) -> Dict:
+        """Return the current readiness report."""
+        with self._lock:
+            model = dict(self._model)
+            ffmpeg = dict(self._ffmpeg) if self._ffmpeg is not None else None
+        if model["state"] == self.PENDING and is_model_loaded():
+            # Warm-up disabled, but a job has loaded the model since
+            model["state"] = self.READY
+        if ffmpeg is None:
+            # Warm-up has not probed yet; the probe is cached after first use
+            ffmpeg = probe_ffmpeg()
+        return {
+            "ready": model["state"] == self.READY and bool(ffmpeg.get("ready")),
+            "model": model,
+            "ffmpeg": ffmpeg,
+        }
+
+
+readiness = ReadinessState()
+
+
+def _run_warmup(model_name: str, model_path: Optional[str]) -> None:
+    try:
+        readiness.set_ffmpeg(probe_ffmpeg())
+    except Exception as e:
+        logger.error(f"FFmpeg probe failed during warm-up: {e}")
+
+    readiness.set_model(state=ReadinessState.LOADING, name=model_path or model_name)
+    start = time.perf_counter()
+    try:
+        if model_path and Path(model_path).exists():
+            warm_up_model(model_name, model_path)
+        else:
+            # Also the ".en" variant and language probe model routing picks
+            for name, compute_type in routed_models(model_name):
+                warm_up_model(name, compute_type=compute_type)
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        readiness.set_model(state=ReadinessState.FAILED, error=str(e))
+        return
+    elapsed = time.perf_counter() - start
+    readiness.set_model(state=ReadinessState.READY, load_seconds=round(elapsed, 3))
+    logger.info(f"Warm-up complete in {elapsed:.2f}s")
+
+
+def start_warmup(model_name: str, model_path: Optional[str] = None) -> Optional[threading.Thread]:
+    """
+    Start the background warm-up thread (once per process).
+
+    With A2V_WARMUP=0 the model is loaded lazily by the first job and
+    readiness reports it as pending until then.
+
+    Returns:
+        The warm-up thread, or None if warm-up is disabled or already started
+    """
+    if fake_engines_enabled():
+        readiness.set_model(state=ReadinessState.READY, name="test")
+        return None
+    if not WARMUP_ENABLED or readiness._thread is not None:
+        return None
+    thread = threading.Thread(
+        target=_run_warmup, args=(model_name, model_path), name="a2v-warmup", daemon=True
+    )
+    readiness._thread = thread
+    thread.start()
+    return thread
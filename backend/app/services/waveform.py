@@ -0,0 +1,186 @@
+"""Multi-resolution waveform peaks.
+
+Audio is decoded once to mono PCM by FFmpeg and reduced in streaming chunks
+to min/max peaks with vectorized NumPy. Coarser zoom levels are built by
+reducing the finest level by WAVEFORM_LEVEL_FACTOR until it fits in
+WAVEFORM_MIN_PEAKS peaks. Peaks are quantized to int8, so an overview of a
+multi-hour recording is a few KB.
+
+File layout (little-endian):
+    header  "A2VW", version u8, level count u8, sample rate u32
+    levels  per level: samples per peak u32, peak count u32, data offset u32
+    data    per level: int8 pairs (min, max), finest level last
+Level 0 is the coarsest overview; higher levels zoom in.
+"""
+import logging
+import os
+import struct
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from app.services.fake_engines import fake_engines_enabled, simulate
+
+logger = logging.getLogger(__name__)
+
+WAVEFORM_SAMPLE_RATE = int(os.getenv("A2V_WAVEFORM_SAMPLE_RATE", "8000"))
+# Finest level: 256 samples per peak at 8 kHz is 32 ms
+WAVEFORM_BASE_SAMPLES = int(os.getenv("A2V_WAVEFORM_BASE_SAMPLES", "256"))
+WAVEFORM_LEVEL_FACTOR = 4
+WAVEFORM_MIN_PEAKS = 1024
+
+_MAGIC = b"A2VW"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBI")
+_LEVEL = struct.Struct("<III")
+_READ_SIZE = 1 << 20
+
+
+def _decode_pcm(audio_path: Path) -> Iterator[bytes]:
+    """Yield mono int16 PCM at WAVEFORM_SAMPLE_RATE from FFmpeg."""
+    if fake_engines_enabled():
+        import numpy as np
+
+        simulate("waveform")
+        t = np.arange(WAVEFORM_SAMPLE_RATE * 2) / WAVEFORM_SAMPLE_RATE
+        yield (np.sin(2 * np.pi * 220 * t) * t / 2 * 32767).astype("<i2").tobytes()
+        return
+
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-i", str(audio_path),
+            "-f", "s16le", "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE), "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        for chunk in iter(lambda: process.stdout.read(_READ_SIZE), b""):
+            yield chunk
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg decode failed: {stderr.decode(errors='replace')}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def _reduce(mins, maxs, factor: int):
+    """Combine every `factor` adjacent peaks into one."""
+    import numpy as np
+
+    remainder = len(mins) % factor
+    if remainder:
+        pad = factor - remainder
+        mins = np.concatenate([mins, np.full(pad, mins[-1], dtype=mins.dtype)])
+        maxs = np.concatenate([maxs, np.full(pad, maxs[-1], dtype=maxs.dtype)])
+    return mins.reshape(-1, factor).min(axis=1), maxs.reshape(-1, factor).max(axis=1)
+
+
+def compute_peaks(pcm_chunks: Iterator[bytes], samples_per_peak: int = WAVEFORM_BASE_SAMPLES):
+    """
+    Reduce int16 PCM chunks to per-bucket min/max, in constant memory per chunk.
+
+    Returns:
+        (mins, maxs) int16 arrays of the finest level
+    """
+    import numpy as np
+
+    mins: List = []
+    maxs: List = []
+    carry = np.empty(0, dtype=np.int16)
+    odd_byte = b""
+    for chunk in pcm_chunks:
+        chunk = odd_byte + chunk
+        odd_byte = chunk[len(chunk) - len(chunk) % 2:]
+        samples = np.frombuffer(chunk[:len(chunk) - len(odd_byte)], dtype="<i2")
+        if carry.size:
+            samples = np.concatenate([carry, samples])
+        whole = samples.size - samples.size % samples_per_peak
+        if whole:
+            buckets = samples[:whole].reshape(-1, samples_per_peak)
+            mins.append(buckets.min(axis=1))
+            maxs.append(buckets.max(axis=1))
+        carry = samples[whole:].copy()
+    if carry.size:
+        mins.append(carry.min(keepdims=True))
+        maxs.append(carry.max(keepdims=True))
+    if not mins:
+        return np.zeros(1, dtype=np.int16), np.zeros(1, dtype=np.int16)
+    return np.concatenate(mins), np.concatenate(maxs)
+
+
+def build_waveform(audio_path: Path, output_path: Path) -> Dict:
+    """
+    Decode audio and write the peak pyramid file.
+
+    Args:
+        audio_path: Source audio
+        output_path: Destination .peaks file (written atomically)
+
+    Returns:
+        Dict with "levels" (samples per peak, coarsest first) and "duration"
+    """
+    import numpy as np
+
+    mins, maxs = compute_peaks(_decode_pcm(audio_path), WAVEFORM_BASE_SAMPLES)
+    levels = [(WAVEFORM_BASE_SAMPLES, mins, maxs)]
+    while len(levels[-1][1]) > WAVEFORM_MIN_PEAKS:
+        spp, level_mins, level_maxs = levels[-1]
+        reduced = _reduce(level_mins, level_maxs, WAVEFORM_LEVEL_FACTOR)
+        levels.append((spp * WAVEFORM_LEVEL_FACTOR, *reduced))
+    levels.reverse()
+
+    offset = _HEADER.size + _LEVEL.size * len(levels)
+    table = []
+    payloads = []
+    for spp, level_mins, level_maxs in levels:
+        # int16 -> int8 keeps the shape; rounding keeps quiet audio visible
+        pairs = np.empty(len(level_mins) * 2, dtype=np.int8)
+        pairs[0::2] = np.floor(level_mins.astype(np.int32) / 256).astype(np.int8)
+        pairs[1::2] = np.ceil(level_maxs.astype(np.int32) / 256).clip(-128, 127).astype(np.int8)
+        table.append(_LEVEL.pack(spp, len(level_mins), offset))
+        payloads.append(pairs.tobytes())
+        offset += len(pairs)
+
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(levels), WAVEFORM_SAMPLE_RATE))
+        f.writelines(table)
+        f.writelines(payloads)
+    os.replace(tmp_path, output_path)
+
+    duration = len(mins) * WAVEFORM_BASE_SAMPLES / WAVEFORM_SAMPLE_RATE
+    logger.info(f"Wrote {len(levels)} waveform levels to {output_path}")
+    return {"levels": [spp for spp, _, _ in levels], "duration": round(duration, 3)}
+
+
+def read_level(path: Path, level: int) -> Dict:
+    """
+    Read one level of a peaks file without loading the others.
+
+    Returns:
+        Dict with "data" (int8 min/max pairs), "samples_per_peak",
+        "sample_rate", "peaks" and "levels"
+
+    Raises:
+        ValueError: If the file is invalid or the level does not exist
+    """
+    with open(path, "rb") as f:
+        magic, version, level_count, sample_rate = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not a waveform peaks file")
+        if not 0 <= level < level_count:
+            raise ValueError(f"Level must be between 0 and {level_count - 1}")
+        f.seek(_HEADER.size + _LEVEL.size * level)
+        samples_per_peak, peaks, offset = _LEVEL.unpack(f.read(_LEVEL.size))
+        f.seek(offset)
+        data = f.read(peaks * 2)
+    return {
+        "data": data,
+        "samples_per_peak": samples_per_peak,
+        "sample_rate": sample_rate,
+        "peaks": peaks,
+        "levels": level_count,
+    }
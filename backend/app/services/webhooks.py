@@ -0,0 +1,315 @@
+"""Completion webhooks for jobs and batches.
+
+Submissions with a callback_url get a signed JSON POST when the job
+succeeds or fails, and batches one more when their last job finishes.
+Events go through the persistent outbox (app.utils.webhook_outbox) before
+they are sent: process_job queues them wherever the job runs, and a
+delivery thread in the API process posts them, retrying with exponential
+backoff until the receiver answers 2xx or the attempts run out.
+
+Events are named after the transition they report: a job is announced
+again only when a later run ends in a different state (a failed job that
+succeeds on retry), and on-demand renders of lazy jobs are not announced.
+
+Every request carries X-A2V-Event, X-A2V-Delivery (the event ID, stable
+across delivery retries and repeated runs), X-A2V-Timestamp and
+X-A2V-Signature. The signature is
+"sha256=" and the hex HMAC-SHA256 of "<timestamp>.<body>" under
+A2V_WEBHOOK_SECRET; callbacks are refused while no secret is configured.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from app.utils.job_manager import JobManager
+from app.utils.progress_store import progress_store, JobState, ProgressModel, TERMINAL_STATES
+from app.utils.webhook_outbox import WebhookOutbox
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_SECRET = os.getenv("A2V_WEBHOOK_SECRET", "")
+WEBHOOK_TIMEOUT = float(os.getenv("A2V_WEBHOOK_TIMEOUT", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("A2V_WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_BACKOFF_BASE = float(os.getenv("A2V_WEBHOOK_BACKOFF_BASE", "5"))
+WEBHOOK_BACKOFF_MAX = float(os.getenv("A2V_WEBHOOK_BACKOFF_MAX", "3600"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("A2V_WEBHOOK_POLL_INTERVAL", "1.0"))
+CALLBACK_URL_MAX_LENGTH = 2048
+
+SIGNATURE_HEADER = "X-A2V-Signature"
+TIMESTAMP_HEADER = "X-A2V-Timestamp"
+EVENT_HEADER = "X-A2V-Event"
+DELIVERY_HEADER = "X-A2V-Delivery"
+
+JOB_SUCCEEDED = "job.succeeded"
+JOB_FAILED = "job.failed"
+BATCH_COMPLETED = "batch.completed"
+
+
+def validate_callback_url(url: Optional[str]) -> Optional[str]:
+    """
+    Check a submitted callback URL.
+
+    Returns:
+        The stripped URL, or None if none was given
+
+    Raises:
+        ValueError: If the URL is not an absolute http(s) URL, or webhooks
+            are not configured
+    """
+    if url is None or not url.strip():
+        return None
+    url = url.strip()
+    if len(url) > CALLBACK_URL_MAX_LENGTH:
+        raise ValueError(f"callback_url must be at most {CALLBACK_URL_MAX_LENGTH} characters")
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an absolute http or https URL")
+    if not WEBHOOK_SECRET:
+        raise ValueError("Webhooks are disabled; set A2V_WEBHOOK_SECRET to accept callback_url")
+    return url
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """Signature header value for a webhook body sent at timestamp."""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+_outboxes: Dict[str, WebhookOutbox] = {}
+_outboxes_lock = threading.Lock()
+
+
+def get_webhook_outbox(base_dir: Path) -> WebhookOutbox:
+    """Return the webhook outbox kept next to the jobs in base_dir."""
+    db_path = str(Path(base_dir) / "webhooks.sqlite3")
+    with _outboxes_lock:
+        if db_path not in _outboxes:
+            _outboxes[db_path] = WebhookOutbox(
+                db_path, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_BACKOFF_BASE, WEBHOOK_BACKOFF_MAX
+            )
+        return _outboxes[db_path]
+
+
+def _job_progress(job_id: str, job_manager: JobManager) -> Optional[ProgressModel]:
+    """Freshest known progress of a job, from this process or its persisted snapshot."""
+    progress = progress_store.get(job_id)
+    if progress is not None and progress.state in TERMINAL_STATES:
+        return progress
+    persisted = job_manager.read_progress(job_id)
+    if persisted is not None:
+        persisted_progress = ProgressModel.from_dict(persisted)
+        if progress is None or persisted_progress.updated_at >= progress.updated_at:
+            return persisted_progress
+    return progress
+
+
+def _job_state(job_id: str, job_manager: JobManager) -> Optional[str]:
+    """Freshest known state of a job, from this process or its persisted progress."""
+    progress = _job_progress(job_id, job_manager)
+    return progress.state.value if progress is not None else None
+
+
+def _event(event: str, event_id: str, **fields) -> Dict:
+    return {
+        "id": event_id,
+        "event": event,
+        "created_at": datetime.utcnow().isoformat(),
+        **fields,
+    }
+
+
+def _queue_batch_event(batch_id: str, url: str, job_manager: JobManager, outbox: WebhookOutbox) -> bool:
+    """Queue batch.completed once every job of the batch has finished."""
+    job_ids = progress_store.get_batch_jobs(batch_id) or job_manager.read_batch(batch_id) or []
+    states = {job_id: _job_state(job_id, job_manager) for job_id in job_ids}
+    terminal = {state.value for state in TERMINAL_STATES}
+    if not states or any(state not in terminal for state in states.values()):
+        return False
+    counts = {}
+    for state in states.values():
+        counts[state] = counts.get(state, 0) + 1
+    # Jobs finishing together may all see the batch complete; the event ID
+    # is derived from the batch, so the outbox keeps only the first
+    payload = _event(
+        BATCH_COMPLETED,
+        event_id=f"{BATCH_COMPLETED}:{batch_id}",
+        batch_id=batch_id,
+        counts=counts,
+        jobs=[{"job_id": job_id, "state": state} for job_id, state in states.items()],
+        status_url=f"/api/batch/{batch_id}/status",
+    )
+    return outbox.add(payload["id"], BATCH_COMPLETED, url, payload)
+
+
+def notify_job_finished(job_id: str, job_manager: JobManager) -> None:
+    """
+    Queue the webhook events for a job that reached a final state.
+
+    Called at the end of process_job, and by the broker's owner for jobs
+    failed on lease expiry. Jobs without a callback_url, not in a
+    final state, or in the state already announced queue nothing; failures
+    are logged, never raised.
+    """
+    try:
+        meta = job_manager.get_job_meta(job_id) or {}
+        url = meta.get("callback_url")
+        progress = _job_progress(job_id, job_manager)
+        if not url or progress is None or progress.state not in TERMINAL_STATES:
+            return
+        announced = meta.get("webhook") or {}
+        if announced.get("state") == progress.state.value:
+            return
+        # Runs reporting the same transition share its event ID, so the
+        # outbox queues it once and receivers can deduplicate on it
+        transition = announced.get("transitions", 0) + 1
+        outbox = get_webhook_outbox(job_manager.base_dir)
+        event = JOB_SUCCEEDED if progress.state == JobState.SUCCEEDED else JOB_FAILED
+        links = {
+            "status_url": f"/api/jobs/{job_id}/status",
+            "transcript_json_url": f"/api/jobs/{job_id}/transcript/json",
+            "transcript_vtt_url": f"/api/jobs/{job_id}/transcript/vtt",
+        }
+        if meta.get("outputs") != "transcript":
+            links["video_url"] = f"/api/jobs/{job_id}/video"
+        payload = _event(
+            event,
+            event_id=f"{event}:{job_id}:{transition}",
+            job_id=job_id,
+            batch_id=meta.get("batch_id"),
+            state=progress.state.value,
+            error=progress.error,
+            resource_base_name=job_manager.get_resource_base_name(job_id),
+            **links,
+        )
+        outbox.add(payload["id"], event, url, payload)
+        job_manager.update_job_meta(job_id, webhook={"state": progress.state.value, "transitions": transition})
+        if meta.get("batch_id"):
+            _queue_batch_event(meta["batch_id"], url, job_manager, outbox)
+        if _delivery is not None:
+            _delivery.wake()
+    except Exception as e:
+        logger.error(f"Failed to queue webhooks for job {job_id}: {e}", exc_info=True)
+
+
+class WebhookDelivery:
+    """Posts due outbox entries until stopped."""
+
+    def __init__(
+        self,
+        outbox: WebhookOutbox,
+        secret: Optional[str] = None,
+        timeout: float = WEBHOOK_TIMEOUT,
+        poll_interval: float = WEBHOOK_POLL_INTERVAL
+    ):
+        self.outbox = outbox
+        self.secret = WEBHOOK_SECRET if secret is None else secret
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _post(self, delivery: Dict) -> None:
+        """Send one delivery, raising on a transport error or a non-2xx answer."""
+        body = json.dumps(delivery["payload"], separators=(",", ":")).encode()
+        timestamp = str(int(time.time()))
+        request = urllib.request.Request(
+            delivery["url"],
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "User-Agent": "Audio2Video-Webhooks/1.0",
+                EVENT_HEADER: delivery["event"],
+                DELIVERY_HEADER: delivery["event_id"],
+                TIMESTAMP_HEADER: timestamp,
+                SIGNATURE_HEADER: sign_payload(self.secret, timestamp, body),
+            },
+        )
+        # HTTPError (non-2xx) is a URLError, so both count as failed attempts
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def deliver_due(self, limit: int = 10) -> int:
+        """
+        Post every delivery that is due now.
+
+        Returns:
+            Number of successful deliveries
+        """
+        delivered = 0
+        while True:
+            claimed = self.outbox.claim(self.timeout * 2, limit)
+            if not claimed:
+                return delivered
+            for delivery in claimed:
+                try:
+                    self._post(delivery)
+                except Exception as e:
+                    state = self.outbox.mark_failed(delivery["id"], str(e))
+                    logger.warning(
+                        f"Webhook {delivery['event']} to {delivery['url']} failed "
+                        f"(attempt {delivery['attempts']}, now {state}): {e}"
+                    )
+                else:
+                    self.outbox.mark_delivered(delivery["id"])
+                    delivered += 1
+
+    def wake(self) -> None:
+        """Deliver newly queued events without waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.deliver_due()
+            except Exception as e:
+                logger.error(f"Webhook delivery loop error: {e}", exc_info=True)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """Start the delivery thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="webhook-delivery", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the delivery thread after its current attempt."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_delivery: Optional[WebhookDelivery] = None
+
+
+def start_webhook_delivery(job_manager: JobManager) -> Optional[WebhookDelivery]:
+    """Start posting this deployment's outbox, unless webhooks are disabled."""
+    global _delivery
+    if not WEBHOOK_SECRET:
+        return None
+    if _delivery is None:
+        _delivery = WebhookDelivery(get_webhook_outbox(job_manager.base_dir))
+        _delivery.start()
+        logger.info("Webhook delivery started")
+    return _delivery
+
+
+def stop_webhook_delivery() -> None:
+    """Stop the delivery thread started by start_webhook_delivery()."""
+    global _delivery
+    if _delivery is not None:
+        _delivery.stop()
+        _delivery = None
@@ -0,0 +1,176 @@
+"""Content-addressed blob store for job artifacts.
+
+Blobs live under ``<JOBS_BASE_DIR>/blobs/sha256/<ab>/<digest>`` and job
+directories hold hardlinks to them, so identical uploads and outputs are
+stored once and "copying" a shared file into a job is a metadata operation.
+The hardlink count is the reference count: a blob whose only remaining name
+is the store's own is unreferenced and can be collected.
+
+Blobs are made read-only. Anything that rewrites an artifact must unlink the
+job path first (or write a temporary file and rename it over the path) so
+the shared inode is never modified in place.
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Linux FICLONE ioctl, used for copy-on-write clones where hardlinks fail
+_FICLONE = 0x40049409
+
+
+def sha256_file(path: Path) -> str:
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink_or_copy(src: Path, dest: Path) -> None:
+    """Clone src to dest copy-on-write if the filesystem supports it, else copy."""
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+            fcntl.ioctl(fdest.fileno(), _FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dest)
+
+
+class BlobStore:
+    """sha256-addressed, hardlink-refcounted file store."""
+
+    def __init__(self, root: Path):
+        """
+        Initialize the store.
+
+        Args:
+            root: Store directory; must be on the same filesystem as the job
+                directories for hardlinks to work
+        """
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        """Path of the blob with the given hex SHA-256."""
+        return self.root / "sha256" / digest[:2] / digest
+
+    def tmp_path(self, suffix: str = "") -> Path:
+        """A fresh path for staging a file before put()."""
+        return self.tmp_dir / f"{uuid.uuid4().hex}{suffix}"
+
+    def exists(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def refcount(self, digest: str) -> int:
+        """Number of job paths linked to a blob (0 if unreferenced or missing)."""
+        try:
+            return self.blob_path(digest).stat().st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def _store(self, path: Path, digest: str) -> Path:
+        """Make path's content available as a blob, without copying if possible."""
+        blob = self.blob_path(digest)
+        if blob.exists():
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, blob)
+        except FileExistsError:
+            return blob  # Stored concurrently by another process
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            tmp = self.tmp_path()
+            _reflink_or_copy(path, tmp)
+            os.replace(tmp, blob)
+        os.chmod(blob, 0o444)
+        return blob
+
+    def adopt(self, path: Path, digest: Optional[str] = None) -> str:
+        """
+        Move a file into the store, leaving path as a link to the blob.
+
+        If identical content is already stored, path is replaced by a link
+        to the existing blob and its own copy is freed.
+
+        Args:
+            path: File inside a job directory
+            digest: Known SHA-256 of the file (hashed if omitted)
+
+        Returns:
+            Hex SHA-256 of the content
+        """
+        digest = digest or sha256_file(path)
+        with self._lock:
+            # A hit is content another job (or an earlier run) already stored
+            record_cache_lookup("blob_store", self.exists(digest))
+            blob = self._store(path, digest)
+            if not os.path.samefile(blob, path):
+                self.link(digest, path)
+        return digest
+
+    def put(self, path: Path, digest: Optional[str] = None) -> str:
+        """
+        Store a staged file (e.g. from tmp_path()) and remove the staged name.
+
+        Returns:
+            Hex SHA-256 of the content
+        """
+        digest = digest or sha256_file(path)
+        with self._lock:
+            self._store(path, digest)
+        path.unlink()
+        return digest
+
+    def link(self, digest: str, dest: Path) -> None:
+        """
+        Atomically place the blob at dest as a hardlink.
+
+        Falls back to a reflink or copy when dest is on another filesystem;
+        such copies are not counted as references.
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        blob = self.blob_path(digest)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.link")
+        try:
+            os.link(blob, tmp)
+        except OSError as e:
+            if e.errno == errno.ENOENT or not blob.exists():
+                raise FileNotFoundError(f"Blob not found: {digest}")
+            _reflink_or_copy(blob, tmp)
+        os.replace(tmp, dest)
+
+    def collect_garbage(self) -> int:
+        """Delete blobs no job links to. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            for blob in self.root.glob("sha256/*/*"):
+                try:
+                    if blob.stat().st_nlink == 1:
+                        blob.unlink()
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blob(s)")
+        return removed
@@ -0,0 +1,196 @@
+"""Stage completion markers and artifact hashes for resumable jobs.
+
+Each job directory holds a ``stages.json`` recording, per pipeline stage,
+the fingerprint of the inputs it ran with and the SHA-256 of every artifact
+it produced. A stage whose fingerprint still matches and whose artifacts are
+unchanged on disk is skipped when the job is retried or resumed.
+
+With a remote storage backend the markers are also kept in storage, and
+artifacts missing from this node are fetched before they are checked, so a
+job retried or resumed on another node reuses its earlier stages.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.utils.blob_store import sha256_file
+from app.utils.storage import StorageBackend
+
+CHECKPOINTS_FILENAME = "stages.json"
+
+
+class JobStatus:
+    """Job-level status persisted with the checkpoints."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+def fingerprint(data: Any) -> str:
+    """Return a stable hash of JSON-serializable stage inputs."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StageCheckpoints:
+    """Reads and writes a job's stages.json."""
+
+    def __init__(
+        self,
+        job_dir: Path,
+        storage: Optional[StorageBackend] = None,
+        key: Optional[str] = None,
+        fetch: Optional[Callable[[Path], bool]] = None
+    ):
+        """
+        Load a job's checkpoints.
+
+        Args:
+            job_dir: Local job directory
+            storage: Remote backend that also keeps the markers, if any
+            key: Storage key of stages.json in that backend
+            fetch: Makes a stored artifact available locally; returns False
+                if it is not stored
+        """
+        self.job_dir = Path(job_dir)
+        self.path = self.job_dir / CHECKPOINTS_FILENAME
+        self.storage = storage
+        self.key = key
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> Dict:
+        data = None
+        if self.storage is not None:
+            # The stored copy is authoritative: another node may have run stages
+            stored = self.storage.read_bytes(self.key)
+            if stored is not None:
+                try:
+                    data = json.loads(stored)
+                except json.JSONDecodeError:
+                    data = None
+        if data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+        data.setdefault("status", None)
+        data.setdefault("stages", {})
+        return data
+
+    def _save(self) -> None:
+        if not self.job_dir.exists():
+            return
+        encoded = json.dumps(self._data, indent=2).encode("utf-8")
+        # Unique per writer: a worker and an API node may save the same job
+        tmp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            tmp_path.write_bytes(encoded)
+            os.replace(tmp_path, self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        if self.storage is not None:
+            self.storage.write_bytes(self.key, encoded, content_type="application/json")
+
+    @property
+    def status(self) -> Optional[str]:
+        return self._data["status"]
+
+    def set_status(self, status: str) -> None:
+        """Record the job-level status (used to find interrupted jobs)."""
+        with self._lock:
+            self._data["status"] = status
+            self._save()
+
+    def get(self, stage: str) -> Optional[Dict]:
+        """Return the marker for a stage, if any."""
+        return self._data["stages"].get(stage)
+
+    def stages(self) -> Dict[str, Dict]:
+        return dict(self._data["stages"])
+
+    def artifact_digest(self, stage: str, name: str) -> Optional[str]:
+        """Hash of a completed stage's artifact or value, for downstream fingerprints."""
+        marker = self.get(stage)
+        if not marker or marker.get("status") != "done":
+            return None
+        if name in marker.get("artifacts", {}):
+            return marker["artifacts"][name]["sha256"]
+        if name in marker.get("values", {}):
+            return fingerprint(marker["values"][name])
+        return None
+
+    def hash_artifact(self, path: Path, previous: Optional[Dict] = None, digest: Optional[str] = None) -> Dict:
+        """
+        Describe an artifact on disk, reusing a known digest or a previous
+        hash if the file's size and mtime are unchanged.
+        """
+        stat = path.stat()
+        if digest is None:
+            unchanged = previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns
+            digest = previous["sha256"] if unchanged else sha256_file(path)
+        return {"path": path.name, "sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_valid(self, stage: str, stage_fingerprint: str) -> bool:
+        """
+        Return True if a stage completed with the same inputs and all of its
+        artifacts are still present and unchanged.
+        """
+        marker = self.get(stage)
+        if not marker or marker.get("status") != "done" or marker.get("fingerprint") != stage_fingerprint:
+            return False
+        for artifact in marker.get("artifacts", {}).values():
+            path = self.job_dir / artifact["path"]
+            if not path.exists() and (self.fetch is None or not self.fetch(path)):
+                return False
+            if self.hash_artifact(path, artifact)["sha256"] != artifact["sha256"]:
+                return False
+        return True
+
+    def mark_done(
+        self,
+        stage: str,
+        stage_fingerprint: str,
+        artifacts: Optional[Dict[str, Path]] = None,
+        values: Optional[Dict[str, Any]] = None,
+        duration: Optional[float] = None,
+        digests: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record a completed stage with its artifact hashes (hashed unless given in digests)."""
+        previous = (self.get(stage) or {}).get("artifacts", {})
+        digests = digests or {}
+        hashed = {
+            name: self.hash_artifact(path, previous.get(name), digests.get(name))
+            for name, path in (artifacts or {}).items()
+        }
+        with self._lock:
+            self._data["stages"][stage] = {
+                "status": "done",
+                "fingerprint": stage_fingerprint,
+                "artifacts": hashed,
+                "values": values or {},
+                "completed_at": time.time(),
+                "duration": duration,
+            }
+            self._save()
+
+    def mark_failed(self, stage: str, error: str) -> None:
+        """Record a failed stage; it and everything after it will re-run."""
+        with self._lock:
+            self._data["stages"][stage] = {"status": "failed", "error": error, "failed_at": time.time()}
+            self._save()
+
+    def invalidate(self, stages: Iterable[str]) -> None:
+        """Drop the markers of the given stages so they re-run."""
+        with self._lock:
+            for stage in stages:
+                self._data["stages"].pop(stage, None)
+            self._save()
@@ -0,0 +1,164 @@
+"""Idempotency keys for job submissions.
+
+Clients that retry a submission (for example after a timeout on a slow
+upload) send the same Idempotency-Key header. The first request reserves the
+key together with a hash of its payload. When it succeeds, its response is
+stored with the key for IDEMPOTENCY_TTL seconds, and repeats with the same
+payload get that response back without creating new jobs. A key reused with
+a different payload, or while its first request is still running, is a
+conflict.
+
+Keys live in a SQLite table next to the jobs, so API nodes sharing the job
+storage also share their keys.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+IDEMPOTENCY_TTL = float(os.getenv("A2V_IDEMPOTENCY_TTL", "86400"))
+# A reservation older than this belongs to a request that died mid-way
+IDEMPOTENCY_LOCK_SECONDS = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    response TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires ON idempotency_keys (expires_at);
+"""
+
+
+@dataclass
+class Reservation:
+    """An idempotency key held by one request."""
+    store: "IdempotencyStore"
+    scope: str
+    key: str
+    # Stored response of the original request when this is a repeat
+    response: Optional[Dict] = None
+    completed: bool = False
+
+    def complete(self, response: Dict) -> None:
+        """Store the response for repeats of this request."""
+        self.store.complete(self.scope, self.key, response)
+        self.completed = True
+
+    def release(self) -> None:
+        """Free the key if the request did not complete, so it can be retried."""
+        if not self.completed and self.response is None:
+            self.store.release(self.scope, self.key)
+
+
+class IdempotencyStore:
+    """Idempotency keys and their responses, stored in a SQLite database file."""
+
+    def __init__(self, db_path: str, ttl: float = IDEMPOTENCY_TTL, lock_seconds: float = IDEMPOTENCY_LOCK_SECONDS):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+            ttl: Seconds a key is remembered after its request completes
+            lock_seconds: Seconds after which an unfinished reservation is abandoned
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, scope: str, key: str, request_hash: str) -> Reservation:
+        """
+        Reserve a key for a request, or find the response of its first use.
+
+        Args:
+            scope: Namespace of the key, e.g. the client ID
+            key: Client-chosen idempotency key
+            request_hash: Hash of the request payload
+
+        Returns:
+            Reservation; its response is set if the request already completed
+
+        Raises:
+            ValueError: If the key was used for a different payload or its
+                first request is still in progress
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+            row = conn.execute(
+                "SELECT request_hash, response, created_at FROM idempotency_keys WHERE scope = ? AND key = ?",
+                (scope, key),
+            ).fetchone()
+            if row is not None and row["request_hash"] != request_hash:
+                raise ValueError("Idempotency-Key was already used for a different request")
+            if row is not None and row["response"] is not None:
+                conn.execute("COMMIT")
+                return Reservation(self, scope, key, response=json.loads(row["response"]))
+            if row is not None and row["created_at"] + self.lock_seconds > now:
+                raise ValueError("A request with this Idempotency-Key is still in progress")
+            conn.execute(
+                """
+                INSERT INTO idempotency_keys (scope, key, request_hash, response, created_at, expires_at)
+                VALUES (?, ?, ?, NULL, ?, ?)
+                ON CONFLICT(scope, key) DO UPDATE SET
+                    created_at = excluded.created_at, expires_at = excluded.expires_at
+                """,
+                (scope, key, request_hash, now, now + max(self.ttl, self.lock_seconds)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Reservation(self, scope, key)
+
+    def complete(self, scope: str, key: str, response: Dict) -> None:
+        """Store a reserved key's response for IDEMPOTENCY_TTL seconds."""
+        self._connect().execute(
+            "UPDATE idempotency_keys SET response = ?, expires_at = ? WHERE scope = ? AND key = ?",
+            (json.dumps(response), time.time() + self.ttl, scope, key),
+        )
+
+    def release(self, scope: str, key: str) -> None:
+        """Drop an unfinished reservation."""
+        self._connect().execute(
+            "DELETE FROM idempotency_keys WHERE scope = ? AND key = ? AND response IS NULL",
+            (scope, key),
+        )
+
+
+_stores: Dict[str, IdempotencyStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_idempotency_store(base_dir: Path) -> IdempotencyStore:
+    """Return the idempotency store kept next to the jobs in base_dir."""
+    db_path = str(Path(base_dir) / "idempotency.sqlite3")
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = IdempotencyStore(db_path)
+        return _stores[db_path]
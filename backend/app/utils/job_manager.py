@@ -1,24 +1,54 @@
-"""Job management utilities for creating and managing job directories."""
+"""Job management utilities for creating and managing job directories.
+
+Job documents and finished artifacts are kept in a storage backend (see
+app.utils.storage); the job directories are the local working copy.
+"""
 import json
+import os
 import re
+import shutil
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional
+
+from app.utils.blob_store import BlobStore
+from app.utils.checkpoints import CHECKPOINTS_FILENAME, StageCheckpoints
+from app.utils.metrics import record_cache_lookup
+from app.utils.storage import LocalStorage, StorageBackend, create_storage_backend
+
+# Metadata fields fixed at job creation, which the path getters depend on
+NAME_FIELDS = ("resource_base_name", "audio_ext")
+NAME_CACHE_SIZE = int(os.getenv("A2V_JOB_NAME_CACHE_SIZE", "4096"))
 
 
 class JobManager:
     """Manages job directories and file paths with meaningful resource names."""
 
-    def __init__(self, base_dir: str = "data/jobs"):
+    def __init__(self, base_dir: str = "data/jobs", storage: Optional[StorageBackend] = None):
         """
         Initialize JobManager.
         
         Args:
             base_dir: Base directory for storing job artifacts
+            storage: Backend for job documents and artifacts (default:
+                A2V_STORAGE_BACKEND, the local backend rooted at base_dir)
         """
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self._meta_filename = "job_meta.json"
+        self._progress_filename = "progress.json"
+        self._batches_dir = self.base_dir / "batches"
+        # Naming fields never change after create_job, so unlike the rest of
+        # the metadata (written by API nodes and workers alike) they are safe
+        # to keep across calls instead of re-fetching job_meta.json
+        self._names: "OrderedDict[str, dict]" = OrderedDict()
+        self._names_lock = threading.Lock()
+        # Job files are hardlinks into this store, so the path getters below
+        # resolve to shared, deduplicated content
+        self.blob_store = BlobStore(self.base_dir / "blobs")
+        self.storage = storage or create_storage_backend(self.base_dir)
 
     def _generate_timestamp(self) -> str:
         now = datetime.now(timezone.utc)
@@ -43,20 +73,285 @@ class JobManager:
             return ".m4a"
         return ext if ext.startswith(".") else f".{ext}"
 
+    def _key(self, path: Path) -> str:
+        """Storage key of a file under base_dir."""
+        return path.relative_to(self.base_dir).as_posix()
+
+    def _blob_key(self, digest: str) -> str:
+        return self._key(self.blob_store.blob_path(digest))
+
+    def _stores_job_dirs(self) -> bool:
+        """True if the backend's objects are the job directories themselves."""
+        return isinstance(self.storage, LocalStorage) and self.storage.root.resolve() == self.base_dir.resolve()
+
+    def checkpoints(self, job_id: str) -> StageCheckpoints:
+        """
+        Return a job's stage checkpoints.
+
+        With any other backend than the job directories themselves, the
+        markers are also kept in storage and missing artifacts are fetched,
+        so another node can retry or resume the job.
+        """
+        job_dir = self.get_job_dir(job_id)
+        if self._stores_job_dirs():
+            return StageCheckpoints(job_dir)
+        return StageCheckpoints(
+            job_dir,
+            storage=self.storage,
+            key=self._key(job_dir / CHECKPOINTS_FILENAME),
+            fetch=lambda path: self.fetch_artifact(job_id, path),
+        )
+
+    @staticmethod
+    def _decode_document(data: Optional[bytes]) -> Optional[dict]:
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def _encode_document(document: dict, indent: Optional[int] = None) -> bytes:
+        return json.dumps(document, indent=indent, ensure_ascii=True).encode("utf-8")
+
+    def _read_document(self, path: Path) -> Optional[dict]:
+        return self._decode_document(self.storage.read_bytes(self._key(path)))
+
+    def _write_document(self, path: Path, document: dict, indent: Optional[int] = None) -> None:
+        data = self._encode_document(document, indent)
+        self.storage.write_bytes(self._key(path), data, content_type="application/json")
+
+    def _update_document(
+        self, path: Path, update: Callable[[dict], None], indent: Optional[int] = None
+    ) -> Optional[dict]:
+        """
+        Apply update to an existing document in place.
+
+        API nodes and workers write the same documents, so this goes through
+        the backend's atomic read-modify-write rather than a process lock.
+
+        Returns:
+            The updated document, or None if it does not exist
+        """
+        updated = None
+
+        def modify(data: Optional[bytes]) -> Optional[bytes]:
+            nonlocal updated
+            # Called again with fresh content if a concurrent write won
+            updated = self._decode_document(data)
+            if updated is None:
+                return None
+            update(updated)
+            return self._encode_document(updated, indent)
+
+        self.storage.update(self._key(path), modify, content_type="application/json")
+        return updated
+
     def _meta_path(self, job_id: str) -> Path:
         return self.get_job_dir(job_id) / self._meta_filename
 
     def _load_job_meta(self, job_id: str) -> Optional[dict]:
-        meta_path = self._meta_path(job_id)
-        if not meta_path.exists():
-            return None
-        with open(meta_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self._read_document(self._meta_path(job_id))
 
     def _write_job_meta(self, job_dir: Path, meta: dict) -> None:
-        meta_path = job_dir / self._meta_filename
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=2, ensure_ascii=True)
+        self._write_document(job_dir / self._meta_filename, meta, indent=2)
+
+    def _remember_names(self, job_id: str, meta: dict) -> dict:
+        names = {field: meta[field] for field in NAME_FIELDS if field in meta}
+        with self._names_lock:
+            self._names[job_id] = names
+            self._names.move_to_end(job_id)
+            while len(self._names) > NAME_CACHE_SIZE:
+                self._names.popitem(last=False)
+        return names
+
+    def _job_names(self, job_id: str) -> Optional[dict]:
+        """Naming fields of a job, read from its metadata once."""
+        with self._names_lock:
+            names = self._names.get(job_id)
+            if names is not None:
+                self._names.move_to_end(job_id)
+        record_cache_lookup("job_names", names is not None)
+        if names is not None:
+            return names
+        meta = self._load_job_meta(job_id)
+        if not meta:
+            return None
+        return self._remember_names(job_id, meta)
+
+    def update_job_meta(self, job_id: str, **fields) -> Optional[dict]:
+        """
+        Merge fields into a job's metadata file.
+
+        Args:
+            job_id: Job identifier
+            **fields: Top-level keys to set
+
+        Returns:
+            Updated metadata, or None if the job has no metadata
+        """
+        return self._update_document(self._meta_path(job_id), lambda meta: meta.update(fields), indent=2)
+
+    def get_job_meta(self, job_id: str) -> Optional[dict]:
+        """Return a job's metadata, or None if it does not exist."""
+        return self._load_job_meta(job_id)
+
+    def write_progress(self, job_id: str, progress: dict) -> None:
+        """
+        Persist a job's progress snapshot to its directory.
+        
+        Used by distributed workers so API nodes sharing the job storage can
+        report status for jobs they are not running themselves.
+        """
+        job_dir = self.get_job_dir(job_id)
+        if not job_dir.exists():
+            return
+        self._write_document(job_dir / self._progress_filename, progress)
+
+    def read_progress(self, job_id: str) -> Optional[dict]:
+        """Return the persisted progress snapshot for a job, if any."""
+        return self._read_document(self.get_job_dir(job_id) / self._progress_filename)
+
+    def write_batch(self, batch_id: str, job_ids: List[str]) -> None:
+        """
+        Persist a batch's job list, so the batch outlives its in-memory progress.
+        
+        Args:
+            batch_id: Batch identifier
+            job_ids: Job identifiers in batch order
+        """
+        self._write_document(self._batches_dir / f"{batch_id}.json", {"batch_id": batch_id, "job_ids": job_ids})
+
+    def read_batch(self, batch_id: str) -> Optional[List[str]]:
+        """Return the persisted job list of a batch, if any."""
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", batch_id):
+            return None
+        return (self._read_document(self._batches_dir / f"{batch_id}.json") or {}).get("job_ids")
+
+    def store_artifact(self, job_id: str, path: Path, digest: Optional[str] = None) -> str:
+        """
+        Deduplicate a job file through the blob store.
+
+        The file is replaced by a hardlink to its content-addressed blob,
+        the blob is published to the storage backend and the digest is
+        recorded under "blobs" in the job metadata.
+
+        Args:
+            job_id: Job identifier
+            path: File inside the job directory
+            digest: Known SHA-256 of the file (hashed if omitted)
+
+        Returns:
+            Hex SHA-256 of the file
+        """
+        if digest is None and path.stat().st_nlink > 1:
+            # Already stored: skip re-hashing a file that is still the blob
+            # (fresh outputs have a single link, so skip the metadata read)
+            known = ((self._load_job_meta(job_id) or {}).get("blobs") or {}).get(path.name)
+            if known:
+                blob = self.blob_store.blob_path(known)
+                if blob.exists() and os.path.samefile(blob, path):
+                    return known
+        digest = self.blob_store.adopt(path, digest)
+        self._publish_blob(digest)
+        self._record_blob(job_id, path.name, digest)
+        return digest
+
+    def _publish_blob(self, digest: str) -> None:
+        key = self._blob_key(digest)
+        # Content-addressed: an existing object already has this content
+        if not self.storage.exists(key):
+            self.storage.put_file(key, self.blob_store.blob_path(digest))
+
+    def _record_blob(self, job_id: str, filename: str, digest: str) -> None:
+        def record(meta: dict) -> None:
+            meta.setdefault("blobs", {})[filename] = digest
+
+        self._update_document(self._meta_path(job_id), record, indent=2)
+
+    def link_artifact(self, job_id: str, digest: str, path: Path) -> None:
+        """
+        Place a stored blob into a job directory as a hardlink.
+
+        Args:
+            job_id: Job identifier
+            digest: Hex SHA-256 of a blob in the store
+            path: Destination inside the job directory
+        """
+        self.blob_store.link(digest, path)
+        self._publish_blob(digest)
+        self._record_blob(job_id, path.name, digest)
+
+    def _artifact_digest(self, job_id: str, path: Path) -> Optional[str]:
+        return ((self._load_job_meta(job_id) or {}).get("blobs") or {}).get(path.name)
+
+    def has_artifact(self, job_id: str, path: Path) -> bool:
+        """Return True if a job file exists locally or in storage."""
+        if path.exists():
+            return True
+        digest = self._artifact_digest(job_id, path)
+        return digest is not None and self.storage.exists(self._blob_key(digest))
+
+    def fetch_artifact(self, job_id: str, path: Path) -> bool:
+        """
+        Make a job file available locally, downloading it if needed.
+
+        Stored artifacts missing from this node's job directory (e.g. written
+        by a worker on another node) are downloaded into the local blob store
+        and linked into place, so later reads are local.
+
+        Args:
+            job_id: Job identifier
+            path: File inside the job directory
+
+        Returns:
+            False if the file exists neither locally nor in storage
+        """
+        if path.exists():
+            record_cache_lookup("job_files", True)
+            return True
+        digest = self._artifact_digest(job_id, path)
+        if digest is None:
+            return False
+        record_cache_lookup("job_files", False)
+        if not self.blob_store.exists(digest):
+            staged = self.blob_store.tmp_path()
+            if not self.storage.get_file(self._blob_key(digest), staged):
+                return False
+            self.blob_store.put(staged, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.blob_store.link(digest, path)
+        return True
+
+    def artifact_url(
+        self, job_id: str, path: Path, content_type: str, filename: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Direct download URL of a stored job file, e.g. a presigned S3 URL.
+
+        filename names the download (default: the file's own name).
+
+        Returns:
+            None if the file is not stored or the backend has no direct URLs
+        """
+        digest = self._artifact_digest(job_id, path)
+        if digest is None:
+            return None
+        return self.storage.download_url(self._blob_key(digest), filename or path.name, content_type)
+
+    def delete_job(self, job_id: str) -> None:
+        """
+        Remove a job's local directory and stored documents.
+
+        Stored blobs may be shared with other jobs and are left in place.
+        """
+        job_dir = self.get_job_dir(job_id)
+        for filename in (self._meta_filename, self._progress_filename, CHECKPOINTS_FILENAME):
+            self.storage.delete(self._key(job_dir / filename))
+        shutil.rmtree(job_dir, ignore_errors=True)
+        with self._names_lock:
+            self._names.pop(job_id, None)
 
     def create_job(self, audio_filename: Optional[str] = None) -> str:
         """
@@ -84,16 +379,17 @@ class JobManager:
             "original_audio_filename": audio_filename or "",
         }
         self._write_job_meta(job_dir, meta)
+        self._remember_names(job_id, meta)
         return job_id
 
     def get_resource_base_name(self, job_id: str) -> str:
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return job_id
         return meta.get("resource_base_name", job_id)
 
     def get_audio_extension(self, job_id: str) -> str:
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return ".m4a"
         return meta.get("audio_ext", ".m4a")
@@ -116,7 +412,7 @@ class JobManager:
         
         Returns: Path to input audio file
         """
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return self.get_job_dir(job_id) / "source_audio.m4a"
         return self.get_job_dir(job_id) / f"{meta['resource_base_name']}{meta['audio_ext']}"
@@ -135,18 +431,51 @@ class JobManager:
         
         Returns: Path to rendered_video.mp4
         """
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return self.get_job_dir(job_id) / "rendered_video.mp4"
         return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.mp4"
 
+    def get_captioned_video_path(self, job_id: str) -> Path:
+        """
+        Get path to the rendered video with an embedded subtitle track.
+        
+        Returns: Path to rendered_video.captioned.mp4
+        """
+        meta = self._job_names(job_id)
+        if not meta:
+            return self.get_job_dir(job_id) / "rendered_video.captioned.mp4"
+        return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.captioned.mp4"
+
+    def get_rendition_path(self, job_id: str, rendition: str) -> Path:
+        """
+        Get path to one rendition of the rendered video, e.g. "360p".
+        
+        Returns: Path to rendered_video.<rendition>.mp4
+        """
+        meta = self._job_names(job_id)
+        if not meta:
+            return self.get_job_dir(job_id) / f"rendered_video.{rendition}.mp4"
+        return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.{rendition}.mp4"
+
+    def get_waveform_path(self, job_id: str) -> Path:
+        """
+        Get path to the waveform peaks file.
+        
+        Returns: Path to waveform.peaks
+        """
+        meta = self._job_names(job_id)
+        if not meta:
+            return self.get_job_dir(job_id) / "waveform.peaks"
+        return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.peaks"
+
     def get_transcript_segments_path(self, job_id: str) -> Path:
         """
         Get path to transcript segments JSON file.
         
         Returns: Path to transcript_segments.json
         """
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return self.get_job_dir(job_id) / "transcript_segments.json"
         return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.json"
@@ -157,14 +486,14 @@ class JobManager:
         
         Returns: Path to subtitles.vtt
         """
-        meta = self._load_job_meta(job_id)
+        meta = self._job_names(job_id)
         if not meta:
             return self.get_job_dir(job_id) / "subtitles.vtt"
         return self.get_job_dir(job_id) / f"{meta['resource_base_name']}.vtt"
 
     def job_exists(self, job_id: str) -> bool:
-        """Check if a job directory exists."""
-        return self.get_job_dir(job_id).exists()
+        """Check if a job exists locally or in storage."""
+        return self.get_job_dir(job_id).exists() or self.storage.exists(self._key(self._meta_path(job_id)))
 
     # Legacy method aliases for backward compatibility (deprecated)
     def get_audio_path(self, job_id: str) -> Path:
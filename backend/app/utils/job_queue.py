@@ -0,0 +1,357 @@
+"""SQLite-backed job queue broker for distributed worker mode.
+
+API nodes enqueue job descriptors; worker processes claim them with a lease
+that they renew by heartbeat. A lease that is not renewed expires and the job
+is re-queued for another worker, or failed once the job is out of attempts
+(reported through on_expired so its owner can record the failure). SQLite keeps this a local stand-in that
+needs no outside services; every process opens its own connection.
+
+Claims are fair-shared: the interactive lane goes first, then the client
+with the fewest running jobs, then the flow (batch) with the fewest running
+jobs, then the priority key. Clients at the concurrency cap are skipped.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QueueState:
+    """Job states in the broker."""
+    QUEUED = "queued"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    priority REAL,
+    started_at REAL,
+    lane TEXT,
+    client TEXT,
+    flow TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state_enqueued ON jobs (state, enqueued_at);
+"""
+
+# Columns added after the first release, applied to existing databases
+_MIGRATIONS = (
+    "ALTER TABLE jobs ADD COLUMN priority REAL",
+    "ALTER TABLE jobs ADD COLUMN started_at REAL",
+    "ALTER TABLE jobs ADD COLUMN lane TEXT",
+    "ALTER TABLE jobs ADD COLUMN client TEXT",
+    "ALTER TABLE jobs ADD COLUMN flow TEXT",
+)
+
+# Fair-share claim order over queued rows "q"; NULL-safe so older rows
+# without a client or flow share one group
+_RUNNING_FOR_CLIENT = (
+    f"(SELECT COUNT(*) FROM jobs AS r WHERE r.state = '{QueueState.LEASED}' AND r.client IS q.client)"
+)
+_RUNNING_FOR_FLOW = (
+    f"(SELECT COUNT(*) FROM jobs AS r WHERE r.state = '{QueueState.LEASED}' AND r.flow IS q.flow)"
+)
+_CLAIM_ORDER = (
+    f"ORDER BY CASE q.lane WHEN 'interactive' THEN 0 ELSE 1 END, {_RUNNING_FOR_CLIENT}, "
+    f"{_RUNNING_FOR_FLOW}, q.priority, q.enqueued_at"
+)
+
+
+class JobQueue:
+    """Lease-based job queue stored in a SQLite database file."""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_attempts: int = 3,
+        client_max_concurrent: int = 0,
+        on_expired: Optional[Callable[[List[str]], None]] = None
+    ):
+        """
+        Initialize the queue, creating the database if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_attempts: Claims allowed per job before it is marked failed
+            client_max_concurrent: Leased jobs allowed per client (0 is unlimited)
+            on_expired: Called with the IDs of jobs failed because the lease
+                of their last attempt expired; no worker reports those jobs
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.client_max_concurrent = client_max_concurrent
+        self.on_expired = on_expired
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            for statement in _MIGRATIONS:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    pass  # Column already exists
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state_priority ON jobs (state, priority)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state_client ON jobs (state, client)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state_flow ON jobs (state, flow)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(
+        self,
+        job_id: str,
+        payload: Optional[Dict] = None,
+        priority: Optional[float] = None,
+        lane: Optional[str] = None,
+        client: Optional[str] = None,
+        flow: Optional[str] = None
+    ) -> None:
+        """
+        Add a job descriptor to the queue (re-queues it if already present).
+
+        Args:
+            job_id: Job identifier
+            payload: JSON-serializable job descriptor
+            priority: Ordering key, lowest claimed first (default: enqueue time)
+            lane: "interactive" jobs are claimed before all others
+            client: Submitting client, for fair sharing and the concurrency cap
+            flow: Fair-share unit within the client, e.g. the batch ID
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO jobs (job_id, payload, state, attempts, enqueued_at, updated_at, priority,
+                lane, client, flow)
+            VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id) DO UPDATE SET
+                payload = excluded.payload, state = excluded.state, lease_owner = NULL,
+                lease_expires = NULL, attempts = 0, enqueued_at = excluded.enqueued_at,
+                updated_at = excluded.updated_at, last_error = NULL,
+                priority = excluded.priority, started_at = NULL,
+                lane = excluded.lane, client = excluded.client, flow = excluded.flow
+            """,
+            (job_id, json.dumps(payload or {}), QueueState.QUEUED, now, now,
+             now if priority is None else priority, lane, client, flow),
+        )
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> Tuple[int, List[str]]:
+        """
+        Re-queue expired leases. Caller holds a write transaction.
+
+        Returns:
+            (number re-queued, IDs of the jobs failed for being out of attempts)
+        """
+        # Jobs out of attempts fail instead of cycling forever
+        failed = [
+            row["job_id"] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (QueueState.LEASED, now, self.max_attempts),
+            ).fetchall()
+        ]
+        conn.execute(
+            """
+            UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?,
+                last_error = COALESCE(last_error, 'Lease expired')
+            WHERE state = ? AND lease_expires < ? AND attempts >= ?
+            """,
+            (QueueState.FAILED, now, QueueState.LEASED, now, self.max_attempts),
+        )
+        cursor = conn.execute(
+            """
+            UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE state = ? AND lease_expires < ?
+            """,
+            (QueueState.QUEUED, now, QueueState.LEASED, now),
+        )
+        return cursor.rowcount, failed
+
+    def _report_expired(self, job_ids: List[str]) -> None:
+        """Hand jobs failed on lease expiry to on_expired, after their transaction committed."""
+        if not job_ids or self.on_expired is None:
+            return
+        try:
+            self.on_expired(job_ids)
+        except Exception as e:
+            logger.error(f"Failed to record expired jobs {job_ids}: {e}", exc_info=True)
+
+    def requeue_expired(self) -> int:
+        """Return expired leases to the queue. Returns the number re-queued."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count, failed = self._requeue_expired(conn, time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._report_expired(failed)
+        return count
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict]:
+        """
+        Atomically lease the next queued job in fair-share order.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: Lease duration; renew it with heartbeat()
+
+        Returns:
+            Dict with job_id, payload, attempts and enqueued_at, or None if
+            the queue is empty
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _, failed = self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT job_id, payload, attempts, enqueued_at FROM jobs AS q "
+                f"WHERE state = ? AND (? <= 0 OR {_RUNNING_FOR_CLIENT} < ?) {_CLAIM_ORDER} LIMIT 1",
+                (QueueState.QUEUED, self.client_max_concurrent, self.client_max_concurrent),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """
+                    UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated_at = ?, started_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (QueueState.LEASED, worker_id, now + lease_seconds, now, now, row["job_id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._report_expired(failed)
+        if row is None:
+            return None
+        return {
+            "job_id": row["job_id"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1,
+            "enqueued_at": row["enqueued_at"],
+        }
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extend a lease held by worker_id.
+
+        Returns:
+            False if the lease was lost (expired and re-queued or claimed by
+            another worker); the caller should stop working on the job
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE job_id = ? AND lease_owner = ? AND state = ?",
+            (now + lease_seconds, now, job_id, worker_id, QueueState.LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a leased job done. Returns False if the lease was lost."""
+        return self._finish(job_id, worker_id, QueueState.DONE, None)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = False) -> bool:
+        """
+        Mark a leased job failed, or re-queue it if retry is set and it has
+        attempts left. Returns False if the lease was lost.
+        """
+        conn = self._connect()
+        if retry:
+            row = conn.execute("SELECT attempts FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row["attempts"] < self.max_attempts:
+                return self._finish(job_id, worker_id, QueueState.QUEUED, error)
+        return self._finish(job_id, worker_id, QueueState.FAILED, error)
+
+    def _finish(self, job_id: str, worker_id: str, state: str, error: Optional[str]) -> bool:
+        cursor = self._connect().execute(
+            """
+            UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL,
+                updated_at = ?, last_error = ?
+            WHERE job_id = ? AND lease_owner = ? AND state = ?
+            """,
+            (state, time.time(), error, job_id, worker_id, QueueState.LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the broker record for a job."""
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["payload"] = json.loads(record["payload"])
+        return record
+
+    def queued(self) -> List[Dict]:
+        """Queued jobs in claim order (caps ignored), as (job_id, payload) records."""
+        rows = self._connect().execute(
+            f"SELECT job_id, payload FROM jobs AS q WHERE state = ? {_CLAIM_ORDER}",
+            (QueueState.QUEUED,),
+        ).fetchall()
+        return [{"job_id": row["job_id"], "payload": json.loads(row["payload"])} for row in rows]
+
+    def leased(self) -> List[Dict]:
+        """Running jobs with their lease owner, start time and payload."""
+        rows = self._connect().execute(
+            "SELECT job_id, payload, lease_owner, started_at FROM jobs WHERE state = ?",
+            (QueueState.LEASED,),
+        ).fetchall()
+        return [
+            {"job_id": row["job_id"], "payload": json.loads(row["payload"]),
+             "lease_owner": row["lease_owner"], "started_at": row["started_at"]}
+            for row in rows
+        ]
+
+    def snapshot(self) -> Tuple[List[Dict], List[Dict]]:
+        """queued() and leased() read in one transaction, so no job is in both or neither."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            return self.queued(), self.leased()
+        finally:
+            conn.execute("COMMIT")
+
+    def depth(self) -> int:
+        """Number of jobs waiting to be claimed."""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = ?", (QueueState.QUEUED,)
+        ).fetchone()
+        return row[0]
+
+    def lane_depths(self) -> Dict[str, int]:
+        """Number of jobs waiting to be claimed, per lane."""
+        rows = self._connect().execute(
+            "SELECT COALESCE(lane, 'batch'), COUNT(*) FROM jobs WHERE state = ? GROUP BY 1",
+            (QueueState.QUEUED,),
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per broker state."""
+        rows = self._connect().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {row[0]: row[1] for row in rows}
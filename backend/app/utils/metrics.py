@@ -0,0 +1,331 @@
+"""In-process metrics with Prometheus text exposition.
+
+Minimal thread-safe counters, gauges and histograms so the service can be
+scraped without an extra dependency. Metrics are module-level singletons
+registered on the global registry and rendered by GET /metrics.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels(self, **labels: str) -> "_Child":
+        return _Child(self, self._key(labels))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _Child:
+    """A metric bound to one set of label values."""
+
+    def __init__(self, metric: _Metric, key: LabelValues):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, -amount)
+
+    def set(self, value: float) -> None:
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._inc((), -amount)
+
+    def set(self, value: float) -> None:
+        self._set((), value)
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _set(self, key: LabelValues, value: float) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_DURATION_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float) -> None:
+        self._observe((), value)
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = data
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return int(data[-1]) if data else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(data)) for key, data in self._values.items())
+        lines = []
+        for key, data in items:
+            for bound, bucket_count in zip(self.buckets, data):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(bucket_count)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(data[-1])}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges just before rendering."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Pipeline
+STAGE_DURATION = registry.register(Histogram(
+    "a2v_stage_duration_seconds", "Time spent in each processing stage", ["stage"]
+))
+JOBS_TOTAL = registry.register(Counter(
+    "a2v_jobs_total", "Jobs finished by terminal state", ["state"]
+))
+TRANSCRIPTION_RTF = registry.register(Histogram(
+    "a2v_transcription_real_time_factor", "Transcription wall time divided by audio duration",
+    buckets=(0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+))
+FFMPEG_ENCODE_SPEED = registry.register(Histogram(
+    "a2v_ffmpeg_encode_speed", "FFmpeg encode speed as a multiple of real time",
+    buckets=(0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+))
+MODEL_LOAD_DURATION = registry.register(Histogram(
+    "a2v_model_load_seconds", "Whisper model load time", ["model"]
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "a2v_cache_requests_total",
+    "Cache lookups by cache (whisper_model, blob_store, job_files, job_names, waveform) and result (hit|miss)",
+    ["cache", "result"]
+))
+CPU_THREADS = registry.register(Gauge(
+    "a2v_cpu_threads_allocated", "CPU threads budgeted to running stages", ["stage"]
+))
+
+# Queue
+QUEUE_DEPTH = registry.register(Gauge(
+    "a2v_queue_depth", "Jobs accepted but not yet started"
+))
+QUEUE_LANE_DEPTH = registry.register(Gauge(
+    "a2v_queue_lane_depth", "Jobs waiting for a worker, per scheduling lane", ["lane"]
+))
+QUEUE_WAIT = registry.register(Histogram(
+    "a2v_queue_wait_seconds", "Time between enqueue and the start of processing"
+))
+
+# Uploads and HTTP
+UPLOAD_BYTES = registry.register(Counter(
+    "a2v_upload_bytes_total", "Bytes received in uploaded files", ["kind"]
+))
+UPLOAD_THROUGHPUT = registry.register(Histogram(
+    "a2v_upload_throughput_bytes_per_second", "Upload save throughput",
+    buckets=(1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "a2v_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+))
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "a2v_http_request_duration_seconds", "HTTP request latency by route", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+))
+
+
+@contextmanager
+def time_stage(timings: Dict[str, float], stage: str, timeline: Optional[List[Dict]] = None):
+    """
+    Time a pipeline stage, observe it and accumulate it into timings.
+
+    Args:
+        timings: Per-job dict of stage name -> seconds, updated in place
+        stage: Stage name used as the histogram label
+        timeline: Optional list that receives {"stage", "start", "duration"}
+            entries (start is a perf_counter value), used by job profiling
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = round(timings.get(stage, 0.0) + elapsed, 6)
+        STAGE_DURATION.labels(stage=stage).observe(elapsed)
+        if timeline is not None:
+            timeline.append({"stage": stage, "start": start, "duration": elapsed})
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_enqueue() -> float:
+    """Record a job entering the queue. Returns the enqueue timestamp."""
+    QUEUE_DEPTH.inc()
+    return time.time()
+
+
+def observe_queue_start(enqueued_at: Optional[float]) -> None:
+    """Record that a job queued at enqueued_at has started processing."""
+    if enqueued_at is None:
+        return
+    QUEUE_DEPTH.dec()
+    QUEUE_WAIT.observe(max(0.0, time.time() - enqueued_at))
@@ -0,0 +1,205 @@
+"""Opt-in per-job profiling.
+
+A job is profiled when it is submitted with profile=true or when it is picked
+by A2V_PROFILE_SAMPLE_RATE. Profiled jobs run under cProfile, record a stage
+timeline and FFmpeg's -benchmark output, and write their reports into the job
+directory. Jobs that are not profiled never construct a profiler.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("A2V_PROFILE_SAMPLE_RATE", "0"))
+
+PROFILE_REPORT_FILENAME = "profile.json"
+PROFILE_STATS_FILENAME = "profile.pstats"
+PROFILE_SPEEDSCOPE_FILENAME = "profile.speedscope.json"
+PROFILE_FILENAMES = (PROFILE_REPORT_FILENAME, PROFILE_STATS_FILENAME, PROFILE_SPEEDSCOPE_FILENAME)
+
+# cProfile hooks are process-wide on newer Pythons, so only one job is
+# profiled at a time; others still get a timeline and FFmpeg benchmark.
+_cprofile_lock = threading.Lock()
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Decide whether a new job should be profiled."""
+    if requested:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def parse_ffmpeg_benchmark(stderr: str) -> Dict[str, float]:
+    """
+    Parse FFmpeg -benchmark lines from stderr.
+
+    FFmpeg prints e.g. "bench: utime=1.234s stime=0.056s rtime=0.789s" and
+    "bench: maxrss=123456KiB".
+
+    Returns:
+        Dict with any of utime, stime, rtime (seconds) and maxrss_kb
+    """
+    stats: Dict[str, float] = {}
+    for line in (stderr or "").splitlines():
+        line = line.strip()
+        if not line.startswith("bench:"):
+            continue
+        for token in line[len("bench:"):].split():
+            key, _, value = token.partition("=")
+            if key == "maxrss":
+                digits = "".join(ch for ch in value if ch.isdigit())
+                if digits:
+                    stats["maxrss_kb"] = float(digits)
+            elif key in ("utime", "stime", "rtime"):
+                try:
+                    stats[key] = float(value.rstrip("s"))
+                except ValueError:
+                    continue
+    return stats
+
+
+class JobProfiler:
+    """Context manager that profiles one job and writes its reports."""
+
+    def __init__(self, job_id: str, job_dir: Path):
+        self.job_id = job_id
+        self.job_dir = job_dir
+        self.timeline: List[Dict] = []
+        self.ffmpeg_benchmark: Optional[Dict[str, float]] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._started_at = 0.0
+        self._wall_start = 0.0
+
+    def __enter__(self) -> "JobProfiler":
+        self._started_at = time.time()
+        self._wall_start = time.perf_counter()
+        if _cprofile_lock.acquire(blocking=False):
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) owns the hooks
+                _cprofile_lock.release()
+                self._profile = None
+        else:
+            logger.info(f"Another job is being profiled; job {self.job_id} records timeline only")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall = time.perf_counter() - self._wall_start
+        if self._profile is not None:
+            self._profile.disable()
+            _cprofile_lock.release()
+        try:
+            self._write_reports(wall)
+        except Exception as e:
+            logger.error(f"Failed to write profile for job {self.job_id}: {e}", exc_info=True)
+        return False
+
+    def _top_functions(self, stats: pstats.Stats, limit: int = 30) -> List[Dict]:
+        rows = []
+        for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                "function": name,
+                "file": filename,
+                "line": line,
+                "calls": nc,
+                "self_seconds": round(tt, 6),
+                "cumulative_seconds": round(ct, 6),
+            })
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:limit]
+
+    def _speedscope(self, stats: Optional[pstats.Stats], wall: float) -> Dict:
+        """Build a speedscope document: stage timeline plus cProfile self time."""
+        frames: List[Dict] = []
+        frame_index: Dict[str, int] = {}
+
+        def frame(name: str, file: Optional[str] = None, line: Optional[int] = None) -> int:
+            key = f"{name}:{file}:{line}"
+            if key not in frame_index:
+                entry = {"name": name}
+                if file:
+                    entry["file"] = file
+                if line:
+                    entry["line"] = line
+                frame_index[key] = len(frames)
+                frames.append(entry)
+            return frame_index[key]
+
+        events = []
+        for entry in sorted(self.timeline, key=lambda e: e["start"]):
+            index = frame(f"stage:{entry['stage']}")
+            events.append({"type": "O", "frame": index, "at": entry["start"]})
+            events.append({"type": "C", "frame": index, "at": entry["start"] + entry["duration"]})
+        profiles = [{
+            "type": "evented",
+            "name": f"{self.job_id} stages",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(wall, 6),
+            "events": events,
+        }]
+
+        if stats is not None:
+            samples, weights = [], []
+            for (filename, line, name), (_, _, tt, _, _) in stats.stats.items():
+                if tt <= 0:
+                    continue
+                samples.append([frame(name, filename, line)])
+                weights.append(round(tt, 6))
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self.job_id} cProfile self time",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": f"audio2video {self.job_id}",
+            "exporter": "audio2video",
+        }
+
+    def _write_reports(self, wall: float) -> None:
+        # Timeline starts are perf_counter values; make them job-relative
+        for entry in self.timeline:
+            entry["start"] = round(entry["start"] - self._wall_start, 6)
+            entry["duration"] = round(entry["duration"], 6)
+
+        stats = None
+        if self._profile is not None:
+            stats_path = self.job_dir / PROFILE_STATS_FILENAME
+            self._profile.dump_stats(str(stats_path))
+            stats = pstats.Stats(self._profile, stream=io.StringIO())
+
+        speedscope_path = self.job_dir / PROFILE_SPEEDSCOPE_FILENAME
+        with open(speedscope_path, "w", encoding="utf-8") as f:
+            json.dump(self._speedscope(stats, wall), f)
+
+        report = {
+            "job_id": self.job_id,
+            "started_at": self._started_at,
+            "wall_seconds": round(wall, 6),
+            "cprofile": stats is not None,
+            "timeline": self.timeline,
+            "ffmpeg_benchmark": self.ffmpeg_benchmark,
+            "top_functions": self._top_functions(stats) if stats is not None else [],
+        }
+        with open(self.job_dir / PROFILE_REPORT_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote profile for job {self.job_id} ({wall:.2f}s wall)")
@@ -1,13 +1,28 @@
 """Progress tracking store for job processing status.
 
-Thread-safe in-memory store for tracking job progress.
-For local development, this is sufficient. For production, consider persistence.
+Thread-safe in-memory store for tracking job progress. Jobs are spread over
+lock stripes so unrelated jobs never contend, and jobs in a terminal state
+are evicted after A2V_PROGRESS_TTL_SECONDS so memory stays flat; callers fall
+back to the snapshot persisted in the job directory. Expired jobs are swept
+on job creation and, at most every A2V_PROGRESS_SWEEP_SECONDS, on reads, so
+a server that stops receiving jobs still releases them.
 """
+import itertools
+import logging
+import os
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Set, Tuple
 from enum import Enum
 
+logger = logging.getLogger(__name__)
+
+PROGRESS_TTL_SECONDS = float(os.getenv("A2V_PROGRESS_TTL_SECONDS", "3600"))
+PROGRESS_LOCK_STRIPES = int(os.getenv("A2V_PROGRESS_LOCK_STRIPES", "16"))
+PROGRESS_SWEEP_SECONDS = float(os.getenv("A2V_PROGRESS_SWEEP_SECONDS", "60"))
+
 
 class JobState(str, Enum):
     """Job processing state."""
@@ -27,9 +42,14 @@ class JobStage(str, Enum):
     ERROR = "error"
 
 
+TERMINAL_STATES = (JobState.SUCCEEDED, JobState.FAILED)
+
+
 class ProgressModel:
     """Progress model for a job."""
     
+    __slots__ = ("state", "stage", "percent", "message", "error", "updated_at", "version")
+    
     def __init__(
         self,
         state: JobState = JobState.QUEUED,
@@ -44,6 +64,8 @@ class ProgressModel:
         self.message = message
         self.error = error
         self.updated_at = datetime.utcnow()
+        # Store-wide change stamp, assigned by ProgressStore on every write
+        self.version = 0
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization."""
@@ -56,6 +78,20 @@ class ProgressModel:
             "error": self.error
         }
     
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProgressModel":
+        """Rebuild a progress model from its to_dict() form."""
+        progress = cls(
+            state=JobState(data["state"]),
+            stage=JobStage(data["stage"]),
+            percent=data.get("percent", 0),
+            message=data.get("message", ""),
+            error=data.get("error")
+        )
+        if data.get("updated_at"):
+            progress.updated_at = datetime.fromisoformat(data["updated_at"])
+        return progress
+    
     def update(
         self,
         state: Optional[JobState] = None,
@@ -78,30 +114,204 @@ class ProgressModel:
         self.updated_at = datetime.utcnow()
 
 
+class _Stripe:
+    """One lock stripe: its jobs and when the finished ones finished."""
+    
+    __slots__ = ("lock", "jobs", "expiry")
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, ProgressModel] = {}
+        # Terminal job_id -> monotonic finish time, earliest first
+        self.expiry: "OrderedDict[str, float]" = OrderedDict()
+
+
+class _BatchFeed:
+    """Membership, per-state counts and change log of one batch."""
+    
+    __slots__ = ("states", "changes", "counts", "live")
+    
+    def __init__(self):
+        self.states: Dict[str, Optional[str]] = {}  # job_id -> last state, in batch order
+        self.changes: "OrderedDict[str, int]" = OrderedDict()  # job_id -> version, oldest first
+        self.counts: Dict[str, int] = {}
+        self.live: Set[str] = set()  # Members still held in the store
+    
+    def record(self, job_id: str, state: str, version: int) -> None:
+        previous = self.states.get(job_id)
+        if previous != state:
+            if previous is not None:
+                self.counts[previous] -= 1
+            self.counts[state] = self.counts.get(state, 0) + 1
+            self.states[job_id] = state
+        self.changes[job_id] = version
+        self.changes.move_to_end(job_id)
+        self.live.add(job_id)
+
+
 class ProgressStore:
     """Thread-safe progress store."""
     
-    def __init__(self):
-        self._store: Dict[str, ProgressModel] = {}
-        self._batch_mapping: Dict[str, List[str]] = {}  # batch_id -> [job_ids]
-        self._lock = threading.Lock()
+    def __init__(
+        self,
+        ttl_seconds: float = PROGRESS_TTL_SECONDS,
+        stripes: int = PROGRESS_LOCK_STRIPES,
+        sweep_seconds: float = PROGRESS_SWEEP_SECONDS
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.sweep_seconds = sweep_seconds
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._batches: Dict[str, _BatchFeed] = {}
+        self._job_batches: Dict[str, List[str]] = {}  # job_id -> [batch_ids]
+        # Batches with no job left in the store, dropped at the next sweep so
+        # a batch that is still being built survives its first evictions
+        self._idle_batches: Set[str] = set()
+        self._batch_lock = threading.Lock()
+        # Store-wide change stamps; next() on a count is atomic
+        self._versions = itertools.count(1)
+        self._listeners: List[Callable[[str, Dict], None]] = []
+    
+    def add_listener(self, listener: Callable[[str, Dict], None]) -> None:
+        """
+        Register a callback invoked with (job_id, progress dict) after every
+        create or update. Callbacks run outside the store lock.
+        """
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, Dict], None]) -> None:
+        """Unregister a callback added with add_listener()."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _notify(self, job_id: str, snapshot: Dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(job_id, snapshot)
+            except Exception as e:
+                logger.error(f"Progress listener failed for job {job_id}: {e}")
+    
+    def _stripe(self, job_id: str) -> _Stripe:
+        return self._stripes[hash(job_id) % len(self._stripes)]
+    
+    def _stamp(self, job_id: str, progress: ProgressModel, stripe: _Stripe) -> None:
+        """Version a write and schedule eviction. Caller holds the job's stripe lock."""
+        if progress.state in TERMINAL_STATES:
+            stripe.expiry[job_id] = time.monotonic()
+            stripe.expiry.move_to_end(job_id)
+        else:
+            stripe.expiry.pop(job_id, None)
+        # A job only joins batches under its stripe lock, so this check is safe
+        if job_id not in self._job_batches:
+            progress.version = next(self._versions)
+            return
+        with self._batch_lock:
+            # Drawn under the batch lock so every change log stays in version order
+            progress.version = next(self._versions)
+            for batch_id in self._job_batches.get(job_id, ()):
+                self._batches[batch_id].record(job_id, progress.state.value, progress.version)
+                self._idle_batches.discard(batch_id)
+    
+    def _forget(self, job_ids: List[str]) -> None:
+        """Detach evicted jobs from their batches. Caller holds their stripe lock."""
+        with self._batch_lock:
+            for job_id in job_ids:
+                for batch_id in self._job_batches.get(job_id, ()):
+                    feed = self._batches[batch_id]
+                    feed.live.discard(job_id)
+                    if not feed.live:
+                        self._idle_batches.add(batch_id)
+    
+    def _drop_idle_batches(self) -> None:
+        with self._batch_lock:
+            for batch_id in self._idle_batches:
+                feed = self._batches.pop(batch_id)
+                for member in feed.states:
+                    batches = self._job_batches.get(member)
+                    if batches and batch_id in batches:
+                        batches.remove(batch_id)
+                        if not batches:
+                            del self._job_batches[member]
+            self._idle_batches.clear()
+    
+    def evict_expired(self) -> int:
+        """
+        Evict jobs that finished more than ttl_seconds ago.
+        
+        Cost is proportional to the number of evicted jobs. Batches whose
+        jobs were all evicted by the previous sweep are dropped as well.
+        
+        Returns:
+            Number of jobs evicted
+        """
+        if self._idle_batches:
+            self._drop_idle_batches()
+        cutoff = time.monotonic() - self.ttl_seconds
+        evicted = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                expired = []
+                while stripe.expiry:
+                    job_id, finished_at = next(iter(stripe.expiry.items()))
+                    if finished_at > cutoff:
+                        break
+                    stripe.expiry.popitem(last=False)
+                    stripe.jobs.pop(job_id, None)
+                    expired.append(job_id)
+                if expired:
+                    self._forget(expired)
+                    evicted += len(expired)
+        if evicted:
+            logger.debug(f"Evicted {evicted} finished jobs from the progress store")
+        return evicted
+    
+    def _sweep(self) -> None:
+        """Run evict_expired() if sweep_seconds passed since the last read-triggered sweep."""
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_seconds
+                self.evict_expired()
+        finally:
+            self._sweep_lock.release()
+    
+    def evict(self, job_id: str) -> bool:
+        """Remove a job from the store regardless of state. Returns True if it was present."""
+        stripe = self._stripe(job_id)
+        with stripe.lock:
+            stripe.expiry.pop(job_id, None)
+            if stripe.jobs.pop(job_id, None) is None:
+                return False
+            self._forget([job_id])
+            return True
     
     def create_job(self, job_id: str, message: str = "Job queued") -> ProgressModel:
         """Create a new job progress entry."""
-        with self._lock:
+        self.evict_expired()
+        stripe = self._stripe(job_id)
+        with stripe.lock:
             progress = ProgressModel(
                 state=JobState.QUEUED,
                 stage=JobStage.SAVING,
                 percent=0,
                 message=message
             )
-            self._store[job_id] = progress
-            return progress
+            stripe.jobs[job_id] = progress
+            self._stamp(job_id, progress, stripe)
+            snapshot = progress.to_dict()
+        if self._listeners:
+            self._notify(job_id, snapshot)
+        return progress
     
     def get(self, job_id: str) -> Optional[ProgressModel]:
         """Get progress for a job."""
-        with self._lock:
-            return self._store.get(job_id)
+        self._sweep()
+        stripe = self._stripe(job_id)
+        with stripe.lock:
+            return stripe.jobs.get(job_id)
     
     def update(
         self,
@@ -113,30 +323,84 @@ class ProgressStore:
         error: Optional[str] = None
     ) -> bool:
         """Update progress for a job. Returns True if job exists."""
-        with self._lock:
-            progress = self._store.get(job_id)
+        stripe = self._stripe(job_id)
+        with stripe.lock:
+            progress = stripe.jobs.get(job_id)
             if progress is None:
                 return False
             progress.update(state, stage, percent, message, error)
-            return True
+            self._stamp(job_id, progress, stripe)
+            snapshot = progress.to_dict()
+        if self._listeners:
+            self._notify(job_id, snapshot)
+        return True
     
     def add_to_batch(self, batch_id: str, job_id: str):
         """Add a job to a batch."""
-        with self._lock:
-            if batch_id not in self._batch_mapping:
-                self._batch_mapping[batch_id] = []
-            if job_id not in self._batch_mapping[batch_id]:
-                self._batch_mapping[batch_id].append(job_id)
+        stripe = self._stripe(job_id)
+        with stripe.lock, self._batch_lock:
+            feed = self._batches.get(batch_id)
+            if feed is None:
+                feed = self._batches[batch_id] = _BatchFeed()
+            if job_id in feed.states:
+                return
+            feed.states[job_id] = None
+            self._job_batches.setdefault(job_id, []).append(batch_id)
+            progress = stripe.jobs.get(job_id)
+            if progress is not None:
+                # Joining a batch is a change, and keeps the feed in version order
+                progress.version = next(self._versions)
+                feed.record(job_id, progress.state.value, progress.version)
+                self._idle_batches.discard(batch_id)
     
     def get_batch_jobs(self, batch_id: str) -> List[str]:
         """Get all job IDs in a batch."""
-        with self._lock:
-            return self._batch_mapping.get(batch_id, []).copy()
+        with self._batch_lock:
+            feed = self._batches.get(batch_id)
+            return list(feed.states) if feed else []
+    
+    def get_batch_changes(
+        self,
+        batch_id: str,
+        since: int = 0
+    ) -> Optional[Tuple[int, List[Tuple[str, Optional[ProgressModel]]], Dict[str, int]]]:
+        """
+        Get the jobs in a batch whose progress changed after a version.
+        
+        Cost scales with the number of changed jobs, not the batch size.
+        
+        Args:
+            batch_id: Batch identifier
+            since: Cursor from a previous call; 0 returns every job
+            
+        Returns:
+            (cursor, [(job_id, progress)] oldest change first, {state: count}),
+            or None if the batch is unknown or has been evicted. Progress is
+            None for jobs already evicted.
+        """
+        self._sweep()
+        with self._batch_lock:
+            feed = self._batches.get(batch_id)
+            if feed is None:
+                return None
+            changed = []
+            for job_id in reversed(feed.changes):
+                if feed.changes[job_id] <= since:
+                    break
+                changed.append(job_id)
+            changed.reverse()
+            cursor = feed.changes[next(reversed(feed.changes))] if feed.changes else 0
+            counts = {state: count for state, count in feed.counts.items() if count}
+        return cursor, [(job_id, self.get(job_id)) for job_id in changed], counts
     
     def job_exists(self, job_id: str) -> bool:
         """Check if a job exists in the store."""
-        with self._lock:
-            return job_id in self._store
+        stripe = self._stripe(job_id)
+        with stripe.lock:
+            return job_id in stripe.jobs
+    
+    def __len__(self) -> int:
+        return sum(len(stripe.jobs) for stripe in self._stripes)
 
 
 # Global progress store instance
@@ -0,0 +1,110 @@
+"""Online model of per-stage real-time factors.
+
+Each completed job contributes its stage timings and audio duration. Stage
+cost is modelled as ``overhead + rtf * audio_seconds`` with exponentially
+weighted averages, so predictions follow the host as it warms up or as
+settings change. The model is persisted next to the job directories.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+MODELLED_STAGES = ("transcribing", "packaging", "rendering")
+
+# Conservative priors (seconds per audio second) used before any job finished
+DEFAULT_RTF = {"transcribing": 0.3, "packaging": 0.001, "rendering": 0.05}
+DEFAULT_OVERHEAD = {"transcribing": 2.0, "packaging": 0.05, "rendering": 1.0}
+EWMA_ALPHA = float(os.getenv("A2V_RTF_EWMA_ALPHA", "0.2"))
+# Used when a job's audio duration is unknown
+DEFAULT_DURATION_SECONDS = float(os.getenv("A2V_DEFAULT_DURATION_SECONDS", "300"))
+
+
+class RtfModel:
+    """Thread-safe EWMA estimates of stage real-time factors."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rtf: Dict[str, float] = dict(DEFAULT_RTF)
+        self._overhead: Dict[str, float] = dict(DEFAULT_OVERHEAD)
+        self._samples: Dict[str, int] = {stage: 0 for stage in MODELLED_STAGES}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._rtf.update(data.get("rtf", {}))
+            self._overhead.update(data.get("overhead", {}))
+            self._samples.update(data.get("samples", {}))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable RTF model {self.path}: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        data = {"rtf": self._rtf, "overhead": self._overhead, "samples": self._samples}
+        # Unique per writer: every worker process shares this file
+        tmp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def observe(self, duration: Optional[float], timings: Dict[str, float]) -> None:
+        """
+        Learn from a completed job.
+
+        Args:
+            duration: Audio duration in seconds
+            timings: Stage name -> seconds, as stored in job metadata
+        """
+        if not duration or duration <= 0:
+            return
+        with self._lock:
+            for stage in MODELLED_STAGES:
+                elapsed = timings.get(stage)
+                if elapsed is None:
+                    continue
+                # Attribute the prior overhead first; the rest scales with audio
+                rtf = max(0.0, elapsed - self._overhead[stage]) / duration
+                if self._samples.get(stage, 0) == 0:
+                    self._rtf[stage] = rtf
+                else:
+                    self._rtf[stage] += EWMA_ALPHA * (rtf - self._rtf[stage])
+                self._samples[stage] = self._samples.get(stage, 0) + 1
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Failed to persist RTF model: {e}")
+
+    def predict(self, duration: Optional[float], stages: Iterable[str] = MODELLED_STAGES) -> float:
+        """Predict wall seconds for the given stages of a job."""
+        seconds = duration if duration and duration > 0 else DEFAULT_DURATION_SECONDS
+        with self._lock:
+            return sum(self._overhead[s] + self._rtf[s] * seconds for s in stages if s in self._rtf)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"rtf": dict(self._rtf), "overhead": dict(self._overhead), "samples": dict(self._samples)}
+
+
+_models: Dict[str, RtfModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_rtf_model(base_dir: Path) -> RtfModel:
+    """Return the shared model persisted under a jobs base directory."""
+    key = str(base_dir)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = RtfModel(Path(base_dir) / "rtf_model.json")
+        return _models[key]
@@ -0,0 +1,519 @@
+"""Storage backends for job documents and artifacts.
+
+JobManager keeps two kinds of objects in the configured backend:
+
+- Job documents (``<job_id>/job_meta.json``, ``<job_id>/progress.json``,
+  ``batches/<batch_id>.json``), read and written through the backend.
+- Artifacts, stored once per content under their blob key
+  (``blobs/sha256/<ab>/<digest>``, the blob store's layout).
+
+The job directory under JOBS_BASE_DIR is the working copy: stages read and
+write local files, finished artifacts are published to the backend, and
+files a node does not have are downloaded on first use (a read-through
+cache). With the default local backend rooted at JOBS_BASE_DIR the backend
+and the working copy are the same files, so publishing and fetching are
+no-ops.
+
+The S3 backend uploads in parts so large files are streamed with bounded
+memory, and serves downloads as presigned URLs, so API nodes need no shared
+POSIX storage.
+"""
+import io
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("A2V_STORAGE_BACKEND", "local")
+# Root of the local backend (default: JOBS_BASE_DIR itself)
+STORAGE_PATH = os.getenv("A2V_STORAGE_PATH", "")
+S3_BUCKET = os.getenv("A2V_S3_BUCKET", "")
+S3_PREFIX = os.getenv("A2V_S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("A2V_S3_ENDPOINT_URL", "")
+S3_REGION = os.getenv("A2V_S3_REGION", "")
+# Multipart part size; S3 requires at least 5 MiB for all but the last part
+S3_PART_SIZE = int(os.getenv("A2V_S3_PART_SIZE", str(8 * 1024 * 1024)))
+S3_URL_EXPIRES = int(os.getenv("A2V_S3_URL_EXPIRES", "3600"))
+# Conditional writes retried before update() gives up on a contended object
+S3_UPDATE_ATTEMPTS = int(os.getenv("A2V_S3_UPDATE_ATTEMPTS", "8"))
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class StorageBackend:
+    """Object storage addressed by "/"-separated keys."""
+
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        """Store a local file under key, replacing any existing object."""
+        raise NotImplementedError
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        """
+        Download an object to a local file, written atomically.
+
+        Returns:
+            False if the object does not exist
+        """
+        raise NotImplementedError
+
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        """Return an object's content, or None if it does not exist."""
+        raise NotImplementedError
+
+    def write_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """Store data under key, replacing any existing object atomically."""
+        raise NotImplementedError
+
+    def update(
+        self, key: str, modify: Callable[[Optional[bytes]], Optional[bytes]], content_type: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        Read-modify-write an object without losing concurrent updates.
+
+        Args:
+            key: Object key
+            modify: Maps the current content (None if missing) to the new
+                content, or to None to leave the object alone; it may be
+                called more than once
+            content_type: Content type of the written object
+
+        Returns:
+            The written content, or None if nothing was written
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Delete an object; missing objects are ignored."""
+        raise NotImplementedError
+
+    def download_url(self, key: str, filename: str, content_type: str) -> Optional[str]:
+        """
+        URL clients can download an object from directly.
+
+        Returns:
+            None if the object must be served by the API
+        """
+        return None
+
+
+def _atomic_copy(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+# Serializes updates where advisory file locks are unavailable
+_local_update_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path, across threads and processes."""
+    try:
+        import fcntl
+    except ImportError:
+        with _local_update_lock:
+            yield
+        return
+    # flock locks belong to the open file, so threads opening it exclude each other too
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LocalStorage(StorageBackend):
+    """Backend on a local or mounted filesystem."""
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: Directory holding the objects; when it is JOBS_BASE_DIR the
+                job directories are the stored objects themselves
+        """
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        dest = self._path(key)
+        if dest.exists() and os.path.samefile(dest, path):
+            return
+        _atomic_copy(path, dest)
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        src = self._path(key)
+        if not src.exists():
+            return False
+        if not (dest.exists() and os.path.samefile(src, dest)):
+            _atomic_copy(src, dest)
+        return True
+
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        dest = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: threads and processes may write the same key
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            tmp.write_bytes(data)
+            # Atomic replace so concurrent readers never see a partial file
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _lock_path(self, key: str) -> Path:
+        dest = self._path(key)
+        return dest.with_name(f".{dest.name}.lock")
+
+    def update(
+        self, key: str, modify: Callable[[Optional[bytes]], Optional[bytes]], content_type: Optional[str] = None
+    ) -> Optional[bytes]:
+        # Don't create a lock file (or its directory) for an object that
+        # doesn't exist and won't be created
+        if not self.exists(key) and modify(None) is None:
+            return None
+        self._path(key).parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self._lock_path(key)):
+            data = modify(self.read_bytes(key))
+            if data is not None:
+                self.write_bytes(key, data, content_type)
+            return data
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+        self._lock_path(key).unlink(missing_ok=True)
+
+
+def _is_missing(error: Exception) -> bool:
+    """True for an S3 client error meaning the object does not exist."""
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def _is_conflict(error: Exception) -> bool:
+    """True for an S3 client error meaning a conditional write lost a race."""
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code in ("412", "PreconditionFailed", "409", "ConditionalRequestConflict")
+
+
+class S3Storage(StorageBackend):
+    """Backend on an S3-compatible object store (AWS S3, MinIO, ...)."""
+
+    def __init__(
+        self,
+        bucket: str,
+        client=None,
+        prefix: str = S3_PREFIX,
+        part_size: int = S3_PART_SIZE,
+        url_expires: int = S3_URL_EXPIRES,
+        update_attempts: int = S3_UPDATE_ATTEMPTS
+    ):
+        """
+        Args:
+            bucket: Bucket name
+            client: boto3-compatible S3 client (default: a boto3 client for
+                A2V_S3_ENDPOINT_URL and A2V_S3_REGION)
+            prefix: Prepended to every key
+            part_size: Multipart upload part size in bytes
+            url_expires: Lifetime of presigned download URLs in seconds
+            update_attempts: Conditional writes tried per update()
+
+        Raises:
+            RuntimeError: If no client is given and boto3 is not installed
+        """
+        if not bucket:
+            raise ValueError("The S3 storage backend needs a bucket (A2V_S3_BUCKET)")
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("The S3 storage backend requires boto3 (pip install boto3)")
+            client = boto3.client(
+                "s3", endpoint_url=S3_ENDPOINT_URL or None, region_name=S3_REGION or None
+            )
+        self.bucket = bucket
+        self.client = client
+        self.prefix = prefix
+        self.part_size = part_size
+        self.url_expires = url_expires
+        self.update_attempts = update_attempts
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def upload_stream(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> int:
+        """
+        Upload a stream of chunks as one object.
+
+        Objects up to one part are sent with a single PUT; larger ones with
+        a multipart upload, holding at most one part in memory.
+
+        Returns:
+            Bytes uploaded
+        """
+        extra = {"ContentType": content_type} if content_type else {}
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        total = 0
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                total += len(chunk)
+                # Keep the last part back: it must not be empty
+                while len(buffer) > self.part_size:
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=self._key(key), **extra
+                        )["UploadId"]
+                    parts.append(self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer[:self.part_size])))
+                    del buffer[:self.part_size]
+            if upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=bytes(buffer), **extra)
+                return total
+            parts.append(self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            if upload_id is not None:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+            raise
+        return total
+
+    def _upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Dict:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self._key(key), UploadId=upload_id, PartNumber=number, Body=data
+        )
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        with open(path, "rb") as f:
+            self.upload_stream(key, iter(lambda: f.read(_COPY_CHUNK_SIZE), b""), content_type)
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except Exception as e:
+            if _is_missing(e):
+                return False
+            raise
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in iter(lambda: body.read(_COPY_CHUNK_SIZE), b""):
+                    f.write(chunk)
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return True
+
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except Exception as e:
+            if _is_missing(e):
+                return None
+            raise
+
+    def write_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+
+    def update(
+        self, key: str, modify: Callable[[Optional[bytes]], Optional[bytes]], content_type: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        Optimistic read-modify-write: the write is conditional on the ETag
+        read (If-Match), or on the object still being absent (If-None-Match),
+        and is retried on a conflicting write.
+
+        Raises:
+            RuntimeError: If every attempt lost to a concurrent write
+        """
+        extra = {"ContentType": content_type} if content_type else {}
+        for attempt in range(self.update_attempts):
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+                current = response["Body"].read()
+                condition = {"IfMatch": response["ETag"]}
+            except Exception as e:
+                if not _is_missing(e):
+                    raise
+                current, condition = None, {"IfNoneMatch": "*"}
+            data = modify(current)
+            if data is None:
+                return None
+            try:
+                self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **condition, **extra)
+                return data
+            except Exception as e:
+                if not _is_conflict(e):
+                    raise
+            # Jittered backoff so contending writers don't retry in lockstep
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        raise RuntimeError(f"Gave up updating {key} after {self.update_attempts} conflicting writes")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_missing(e):
+                return False
+            raise
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def download_url(self, key: str, filename: str, content_type: str) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+                "ResponseContentType": content_type,
+            },
+            ExpiresIn=self.url_expires
+        )
+
+
+class MemoryS3Error(Exception):
+    """Client error raised by MemoryS3Client, shaped like botocore's ClientError."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class MemoryS3Client:
+    """
+    In-memory stand-in for the subset of the boto3 S3 client S3Storage uses.
+
+    Lets the S3 backend run in tests and single-process development without
+    an object store.
+    """
+
+    def __init__(self):
+        self.objects: Dict[Tuple[str, str], Dict] = {}
+        self.uploads: Dict[str, Dict] = {}
+        self.completed_multipart = 0
+        self._lock = threading.Lock()
+
+    def _get(self, Bucket: str, Key: str) -> Dict:
+        try:
+            return self.objects[(Bucket, Key)]
+        except KeyError:
+            raise MemoryS3Error("NoSuchKey", f"{Key} does not exist")
+
+    def put_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Body: bytes,
+        ContentType: Optional[str] = None,
+        IfMatch: Optional[str] = None,
+        IfNoneMatch: Optional[str] = None
+    ) -> Dict:
+        etag = f'"{uuid.uuid4().hex}"'
+        with self._lock:
+            current = self.objects.get((Bucket, Key))
+            if IfMatch is not None and (current is None or current["ETag"] != IfMatch):
+                raise MemoryS3Error("PreconditionFailed", f"{Key} does not match {IfMatch}")
+            if IfNoneMatch == "*" and current is not None:
+                raise MemoryS3Error("PreconditionFailed", f"{Key} already exists")
+            self.objects[(Bucket, Key)] = {"Body": bytes(Body), "ContentType": ContentType, "ETag": etag}
+        return {"ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict:
+        obj = self._get(Bucket, Key)
+        return {"Body": io.BytesIO(obj["Body"]), "ContentLength": len(obj["Body"]), "ETag": obj["ETag"]}
+
+    def head_object(self, Bucket: str, Key: str) -> Dict:
+        obj = self._get(Bucket, Key)
+        return {"ContentLength": len(obj["Body"]), "ContentType": obj["ContentType"]}
+
+    def delete_object(self, Bucket: str, Key: str) -> Dict:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, ContentType: Optional[str] = None) -> Dict:
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {"Bucket": Bucket, "Key": Key, "ContentType": ContentType, "Parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> Dict:
+        etag = f'"{uuid.uuid4().hex}"'
+        with self._lock:
+            self.uploads[UploadId]["Parts"][PartNumber] = (etag, bytes(Body))
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict) -> Dict:
+        with self._lock:
+            upload = self.uploads.pop(UploadId)
+            stored = upload["Parts"]
+            body = b""
+            for part in MultipartUpload["Parts"]:
+                etag, data = stored[part["PartNumber"]]
+                if etag != part["ETag"]:
+                    raise MemoryS3Error("InvalidPart", f"Part {part['PartNumber']} ETag mismatch")
+                body += data
+            etag = f'"{uuid.uuid4().hex}"'
+            self.objects[(Bucket, Key)] = {"Body": body, "ContentType": upload["ContentType"], "ETag": etag}
+            self.completed_multipart += 1
+        return {"ETag": etag}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> Dict:
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict, ExpiresIn: int = 3600) -> str:
+        return f"https://{Params['Bucket']}.s3.memory/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+def create_storage_backend(base_dir: Path) -> StorageBackend:
+    """
+    Create the backend selected by A2V_STORAGE_BACKEND.
+
+    Args:
+        base_dir: Jobs directory, the default root of the local backend
+
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(Path(STORAGE_PATH) if STORAGE_PATH else base_dir)
+    if STORAGE_BACKEND == "s3":
+        logger.info(f"Storing job files in s3://{S3_BUCKET}/{S3_PREFIX}")
+        return S3Storage(S3_BUCKET)
+    raise ValueError(f"Unknown storage backend {STORAGE_BACKEND!r}; use local or s3")
@@ -0,0 +1,219 @@
+"""Persistent outbox for webhook deliveries.
+
+Job and batch events are written to a SQLite table next to the jobs before
+anything is sent, so deliveries survive restarts and API nodes sharing the
+job storage share one outbox. Deliverers claim due rows with a lease, like
+workers claim jobs from the broker; a lease that expires (the deliverer
+died mid-request) makes the row due again. Failed attempts are retried with
+exponential backoff, and a delivery that fails max_attempts times is moved
+to the dead letters.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class DeliveryState:
+    """Delivery states in the outbox."""
+    PENDING = "pending"
+    DELIVERING = "delivering"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL UNIQUE,
+    event TEXT NOT NULL,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_expires REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS webhook_deliveries_due ON webhook_deliveries (state, next_attempt_at);
+"""
+
+
+class WebhookOutbox:
+    """Webhook deliveries and their retry state, stored in a SQLite database file."""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_attempts: int = 8,
+        backoff_base: float = 5.0,
+        backoff_max: float = 3600.0
+    ):
+        """
+        Initialize the outbox, creating the database if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_attempts: Attempts before a delivery becomes a dead letter
+            backoff_base: Seconds before the first retry; doubled per attempt
+            backoff_max: Upper bound for the retry delay
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait after the given number of failed attempts."""
+        return min(self.backoff_max, self.backoff_base * 2 ** max(0, attempts - 1))
+
+    def add(self, event_id: str, event: str, url: str, payload: Dict) -> bool:
+        """
+        Queue an event for delivery.
+
+        Args:
+            event_id: Unique event identifier; an event is queued at most once
+            event: Event type, e.g. "job.succeeded"
+            url: Callback URL to POST the payload to
+            payload: JSON-serializable event body
+
+        Returns:
+            True if queued, False if the event was already in the outbox
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            """
+            INSERT OR IGNORE INTO webhook_deliveries
+                (event_id, event, url, payload, state, next_attempt_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (event_id, event, url, json.dumps(payload), DeliveryState.PENDING, now, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, lease_seconds: float, limit: int = 10) -> List[Dict]:
+        """
+        Lease the deliveries that are due, oldest first.
+
+        Args:
+            lease_seconds: Seconds before an unfinished attempt is retried
+            limit: Maximum number of deliveries to claim
+
+        Returns:
+            Claimed deliveries with their attempt counted
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """
+                SELECT * FROM webhook_deliveries
+                WHERE (state = ? AND next_attempt_at <= ?) OR (state = ? AND lease_expires < ?)
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+                """,
+                (DeliveryState.PENDING, now, DeliveryState.DELIVERING, now, limit),
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    """
+                    UPDATE webhook_deliveries
+                    SET state = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (DeliveryState.DELIVERING, now + lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        claimed = []
+        for row in rows:
+            record = self._record(row)
+            record["attempts"] += 1
+            claimed.append(record)
+        return claimed
+
+    def mark_delivered(self, delivery_id: int) -> None:
+        """Record a successful delivery."""
+        self._connect().execute(
+            "UPDATE webhook_deliveries SET state = ?, lease_expires = NULL, last_error = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (DeliveryState.DELIVERED, time.time(), delivery_id),
+        )
+
+    def mark_failed(self, delivery_id: int, error: str) -> str:
+        """
+        Record a failed attempt and schedule the retry.
+
+        Returns:
+            The delivery's new state: pending, or dead once max_attempts is reached
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT attempts FROM webhook_deliveries WHERE id = ?", (delivery_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return DeliveryState.DEAD
+            attempts = row["attempts"]
+            state = DeliveryState.DEAD if attempts >= self.max_attempts else DeliveryState.PENDING
+            conn.execute(
+                """
+                UPDATE webhook_deliveries
+                SET state = ?, next_attempt_at = ?, lease_expires = NULL, last_error = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (state, now + self.backoff(attempts), error, now, delivery_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+    def get(self, delivery_id: int) -> Optional[Dict]:
+        """Return one delivery, or None if it does not exist."""
+        row = self._connect().execute("SELECT * FROM webhook_deliveries WHERE id = ?", (delivery_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        """Deliveries that exhausted their attempts, most recent first."""
+        rows = self._connect().execute(
+            "SELECT * FROM webhook_deliveries WHERE state = ? ORDER BY updated_at DESC, id DESC LIMIT ?",
+            (DeliveryState.DEAD, limit),
+        ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of deliveries per state."""
+        rows = self._connect().execute(
+            "SELECT state, COUNT(*) FROM webhook_deliveries GROUP BY state"
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["payload"] = json.loads(record["payload"])
+        return record
@@ -0,0 +1,71 @@
+"""Streaming ZIP writer.
+
+Builds a ZIP archive on the fly from files on disk and yields it in chunks,
+so a response can start immediately and memory stays constant regardless of
+archive size. zipfile writes data descriptors when the output is not
+seekable, so no temporary archive is needed.
+"""
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+# Already-compressed media gains nothing from deflate
+STORED_SUFFIXES = {".mp4", ".m4a", ".mp3", ".ogg", ".opus", ".flac", ".jpg", ".jpeg", ".png"}
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects bytes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def compression_for(path: Path) -> int:
+    """ZIP_STORED for compressed media, ZIP_DEFLATED for everything else."""
+    return zipfile.ZIP_STORED if path.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+
+
+def iter_zip(entries: Iterable[Tuple[str, Path]], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive of the given files.
+
+    Args:
+        entries: (name inside the archive, path on disk) pairs; evaluated
+            lazily, so files can be resolved while streaming
+        chunk_size: Read size for file contents
+
+    Yields:
+        Consecutive chunks of the archive
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compression_for(path)
+            with open(path, "rb") as src, archive.open(info, "w") as dest:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
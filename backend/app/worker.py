@@ -0,0 +1,179 @@
+"""Distributed worker process.
+
+Claims jobs from the broker, renews the lease by heartbeat while running
+process_job against the shared job storage, and persists progress into each
+job directory so API nodes can report it.
+
+Usage:
+    A2V_EXECUTION_MODE=distributed JOBS_BASE_DIR=/shared/jobs python -m app.worker
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from app.services.background_processor import is_render_only, process_job, WHISPER_MODEL, WHISPER_MODEL_PATH
+from app.services.cpu_budget import TRANSCRIBE_SLOTS, get_cpu_budget
+from app.services.dispatcher import get_job_queue
+from app.services.warmup import start_warmup
+from app.utils.job_manager import JobManager
+from app.utils.job_queue import JobQueue
+from app.utils.metrics import QUEUE_WAIT
+from app.utils.progress_store import progress_store, JobState
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = float(os.getenv("A2V_LEASE_SECONDS", "60"))
+POLL_INTERVAL = float(os.getenv("A2V_WORKER_POLL_INTERVAL", "1.0"))
+
+
+class Worker:
+    """Claims and runs jobs until stopped."""
+
+    def __init__(
+        self,
+        job_manager: JobManager,
+        job_queue: JobQueue,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL
+    ):
+        self.job_manager = job_manager
+        self.job_queue = job_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; the current job is finished first."""
+        self._stop.set()
+
+    def _heartbeat(self, job_id: str, done: threading.Event, lost: threading.Event) -> None:
+        interval = max(self.lease_seconds / 3, 0.1)
+        while not done.wait(interval):
+            if not self.job_queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost lease on job {job_id}; stopping it before its next stage")
+                # The broker has re-queued the job, so another worker may run it
+                lost.set()
+                return
+
+    def run_once(self) -> bool:
+        """
+        Claim and run at most one job.
+
+        Returns:
+            True if a job was claimed, False if the queue was empty
+        """
+        claim = self.job_queue.claim(self.worker_id, self.lease_seconds)
+        if claim is None:
+            return False
+
+        job_id = claim["job_id"]
+        QUEUE_WAIT.observe(max(0.0, time.time() - claim["enqueued_at"]))
+        logger.info(f"Worker {self.worker_id} claimed job {job_id} (attempt {claim['attempts']})")
+
+        audio_path = self.job_manager.get_source_audio_path(job_id)
+        # Without shared storage the job directory starts empty on this node
+        self.job_manager.fetch_artifact(job_id, audio_path)
+        image_path = None
+        if claim["payload"].get("has_image"):
+            image_path = self.job_manager.get_background_image_path(job_id)
+            self.job_manager.fetch_artifact(job_id, image_path)
+
+        render_only = is_render_only(self.job_manager.get_job_meta(job_id) or {})
+        done = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done, lost), daemon=True)
+        heartbeat.start()
+        try:
+            if not render_only:
+                # On-demand renders keep the finished job's persisted state
+                progress_store.create_job(job_id, message="Claimed by worker")
+            process_job(job_id, self.job_manager, audio_path, image_path, cancel=lost)
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if lost.is_set():
+            # The job belongs to whichever worker claims it next
+            progress_store.evict(job_id)
+            return True
+        if render_only:
+            meta = self.job_manager.get_job_meta(job_id) or {}
+            succeeded = meta.get("render_state") == JobState.SUCCEEDED.value
+            error = meta.get("render_error")
+        else:
+            progress = progress_store.get(job_id)
+            succeeded = progress is not None and progress.state == JobState.SUCCEEDED
+            error = progress.error if progress is not None else "Unknown failure"
+        if succeeded:
+            self.job_queue.complete(job_id, self.worker_id)
+        else:
+            self.job_queue.fail(job_id, self.worker_id, error or "Processing failed")
+        return True
+
+    def run(self) -> None:
+        """Poll the broker until stop() is called."""
+        logger.info(f"Worker {self.worker_id} started (lease {self.lease_seconds}s)")
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                logger.error(f"Worker loop error: {e}", exc_info=True)
+                claimed = False
+            if not claimed:
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Worker {self.worker_id} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Audio2Video distributed worker")
+    parser.add_argument("--worker-id", help="Identifier used for leases (default: host-pid-random)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("A2V_WORKER_CONCURRENCY", "1")))
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    job_manager = JobManager(os.getenv("JOBS_BASE_DIR", "data/jobs"))
+    job_queue = get_job_queue(job_manager)
+    # Persist every progress change so API nodes can serve job status
+    progress_store.add_listener(job_manager.write_progress)
+    if not TRANSCRIBE_SLOTS:
+        # Each worker thread may transcribe; set before warm-up loads the model
+        get_cpu_budget().slots = max(1, args.concurrency)
+    start_warmup(WHISPER_MODEL, WHISPER_MODEL_PATH or None)
+
+    base_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    workers = [
+        Worker(job_manager, job_queue, f"{base_id}-{i}", args.lease_seconds, args.poll_interval)
+        for i in range(max(1, args.concurrency))
+    ]
+
+    def shutdown(signum, frame):
+        logger.info("Shutdown requested; finishing current jobs")
+        for worker in workers:
+            worker.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [threading.Thread(target=w.run, name=w.worker_id) for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""HTTP load test for the API.
+
+Drives the upload, status and artifact endpoints with open-loop (Poisson)
+arrivals at fixed rates and reports p50/p95/p99 latency, throughput and
+error rate per endpoint. Latency is measured from each request's scheduled
+arrival, so a server that stalls is not hidden by the client slowing down.
+
+By default a local uvicorn instance is started with fake engines (see
+app/services/fake_engines.py), so the numbers isolate API and orchestration
+overhead: event-loop blocking and lock contention show up as tail latency.
+
+Usage:
+    python -m benchmarks.load run --duration 30
+    python -m benchmarks.load run --rate convert=5 --rate status=100 \\
+        --profile benchmarks/fake_profile.json --output .bench/load.json
+    python -m benchmarks.load run --url http://127.0.0.1:8000 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.services.synthetic import DEFAULT_SEED, write_wav
+
+logger = logging.getLogger("benchmarks.load")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ENDPOINTS = ("convert", "batch", "status", "batch_status", "artifact")
+# Requests per second
+DEFAULT_RATES = {"convert": 1.0, "batch": 0.2, "status": 20.0, "batch_status": 2.0, "artifact": 5.0}
+TERMINAL_STATES = ("succeeded", "failed")
+
+
+def parse_rates(values: Sequence[str]) -> Dict[str, float]:
+    """Apply "endpoint=rate" overrides to DEFAULT_RATES (0 disables an endpoint)."""
+    rates = dict(DEFAULT_RATES)
+    for value in values:
+        name, _, rate = value.partition("=")
+        if name not in ENDPOINTS or not rate:
+            raise ValueError(f"Invalid rate {value!r}; expected <endpoint>=<req/s> with endpoint in {', '.join(ENDPOINTS)}")
+        rates[name] = float(rate)
+    return {name: rate for name, rate in rates.items() if rate > 0}
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile (q in 0-100) of pre-sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples: List[Tuple[float, Optional[str]]], elapsed: float) -> Dict:
+    """
+    Summarize one endpoint's samples.
+
+    Args:
+        samples: (latency seconds, error label or None) per request
+        elapsed: Length of the run in seconds
+
+    Returns:
+        Dict with counts, throughput, error rate and latency percentiles (ms)
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    errors = Counter(error for _, error in samples if error)
+    count = len(samples)
+    return {
+        "requests": count,
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / count, 4) if count else 0.0,
+        "error_kinds": dict(errors),
+        "throughput_rps": round(count / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "mean": round(sum(latencies) / count * 1000, 2) if count else 0.0,
+        },
+    }
+
+
+class _LoadState:
+    """Jobs and batches created so far, and the recorded samples."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.job_ids: List[str] = []
+        self.succeeded: List[str] = []
+        self.batch_ids: List[str] = []
+        self.samples: Dict[str, List[Tuple[float, Optional[str]]]] = defaultdict(list)
+
+    def track_jobs(self, job_ids: List[str]) -> None:
+        self.job_ids.extend(job_ids)
+
+    def mark_succeeded(self, job_id: str) -> None:
+        if job_id not in self.succeeded:
+            self.succeeded.append(job_id)
+
+
+async def _issue(
+    client: httpx.AsyncClient,
+    state: _LoadState,
+    endpoint: str,
+    audio: bytes,
+    batch_size: int,
+    scheduled: float,
+    slots: asyncio.Semaphore
+) -> None:
+    """Send one request for `endpoint`; skipped if it has no target yet."""
+    if endpoint == "status" and not state.job_ids:
+        return
+    if endpoint == "batch_status" and not state.batch_ids:
+        return
+    if endpoint == "artifact" and not state.succeeded:
+        return
+
+    job_id = None
+    error = None
+    async with slots:
+        try:
+            if endpoint == "convert":
+                response = await client.post(
+                    "/api/convert", files={"audio": ("load.wav", audio, "audio/wav")}
+                )
+            elif endpoint == "batch":
+                files = [("audios", (f"load_{i}.wav", audio, "audio/wav")) for i in range(batch_size)]
+                response = await client.post("/api/batch/convert", files=files)
+            elif endpoint == "status":
+                job_id = state.rng.choice(state.job_ids)
+                response = await client.get(f"/api/jobs/{job_id}/status")
+            elif endpoint == "batch_status":
+                response = await client.get(f"/api/batch/{state.rng.choice(state.batch_ids)}/status")
+            else:
+                response = await client.get(f"/api/jobs/{state.rng.choice(state.succeeded)}/transcript/json")
+            if response.status_code >= 400:
+                error = str(response.status_code)
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+    state.samples[endpoint].append((time.perf_counter() - scheduled, error))
+    if error:
+        return
+
+    data = response.json()
+    if endpoint == "convert":
+        state.track_jobs([data["job_id"]])
+    elif endpoint == "batch":
+        state.batch_ids.append(data["batch_id"])
+        state.track_jobs([job["job_id"] for job in data["jobs"]])
+    elif endpoint == "status" and data["state"] == "succeeded":
+        state.mark_succeeded(job_id)
+    elif endpoint == "batch_status":
+        for job in data["jobs"]:
+            if job["status"]["state"] == "succeeded":
+                state.mark_succeeded(job["job_id"])
+
+
+async def _arrivals(
+    endpoint: str,
+    rate: float,
+    deadline: float,
+    tasks: set,
+    issue
+) -> None:
+    """Schedule requests with exponential inter-arrival times until the deadline."""
+    rng = random.Random(f"{endpoint}-{rate}")
+    while True:
+        await asyncio.sleep(rng.expovariate(rate))
+        scheduled = time.perf_counter()
+        if scheduled >= deadline:
+            return
+        task = asyncio.create_task(issue(endpoint, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+async def _job_states(client: httpx.AsyncClient, job_ids: List[str], drain: float) -> Dict[str, int]:
+    """Final state of every submitted job, waiting up to `drain` seconds for them to finish."""
+    deadline = time.perf_counter() + drain
+    states: Dict[str, str] = {}
+    pending = list(job_ids)
+    while True:
+        responses = await asyncio.gather(
+            *(client.get(f"/api/jobs/{job_id}/status") for job_id in pending), return_exceptions=True
+        )
+        for job_id, response in zip(pending, responses):
+            ok = isinstance(response, httpx.Response) and response.status_code == 200
+            states[job_id] = response.json()["state"] if ok else "unknown"
+        pending = [job_id for job_id in pending if states[job_id] not in TERMINAL_STATES]
+        if not pending or time.perf_counter() >= deadline:
+            break
+        await asyncio.sleep(0.5)
+    return dict(Counter(states.values()))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    rates: Dict[str, float],
+    duration: float,
+    audio: bytes,
+    batch_size: int = 4,
+    max_in_flight: int = 256,
+    drain: float = 0.0,
+    seed: int = DEFAULT_SEED
+) -> Dict:
+    """
+    Run the load test against a client bound to the API.
+
+    Args:
+        client: HTTP client with the API as base URL
+        rates: Requests per second per endpoint
+        duration: Seconds of load
+        audio: Upload payload
+        batch_size: Files per batch upload
+        max_in_flight: Client-side concurrency cap
+        drain: Seconds to wait afterwards for submitted jobs to finish
+        seed: Seed for target selection
+
+    Returns:
+        Dict with "elapsed", per-endpoint "endpoints" summaries and final
+        "jobs" state counts
+    """
+    state = _LoadState(seed)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks: set = set()
+
+    def issue(endpoint: str, scheduled: float):
+        return _issue(client, state, endpoint, audio, batch_size, scheduled, slots)
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _arrivals(endpoint, rate, deadline, tasks, issue) for endpoint, rate in rates.items()
+    ))
+    if tasks:
+        await asyncio.gather(*list(tasks))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed": round(elapsed, 3),
+        "endpoints": {endpoint: summarize(state.samples[endpoint], elapsed) for endpoint in rates},
+        "jobs": {"submitted": len(state.job_ids), **await _job_states(client, state.job_ids, drain)},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(profile: Optional[str], workers: int, startup_timeout: float = 30.0) -> Iterator[str]:
+    """
+    Run the API under uvicorn with fake engines and a throwaway job directory.
+
+    Yields:
+        Base URL of the server
+    """
+    port = _free_port()
+    fake_profile = profile or ""
+    if fake_profile and not fake_profile.lstrip().startswith("{"):
+        # The server runs from the backend directory
+        fake_profile = str(Path(fake_profile).resolve())
+    with tempfile.TemporaryDirectory(prefix="a2v-load-") as jobs_dir:
+        env = dict(os.environ)
+        env.pop("A2V_TEST_MODE", None)
+        env.update({
+            "A2V_ENGINES": "fake",
+            "A2V_FAKE_ENGINES": fake_profile,
+            "A2V_MAX_CONCURRENT_JOBS": str(workers),
+            "JOBS_BASE_DIR": jobs_dir,
+        })
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.perf_counter() + startup_timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                try:
+                    if httpx.get(f"{url}/api/health", timeout=1.0).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.perf_counter() >= deadline:
+                    raise RuntimeError("uvicorn did not become healthy in time")
+                time.sleep(0.2)
+            logger.info(f"Started API at {url} ({workers} job workers)")
+            yield url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def print_report(report: Dict) -> None:
+    print(f"{'endpoint':<14} {'requests':>8} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, summary in report["endpoints"].items():
+        latency = summary["latency_ms"]
+        print(
+            f"{endpoint:<14} {summary['requests']:>8} {summary['throughput_rps']:>8.2f} "
+            f"{summary['error_rate']:>7.1%} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}"
+        )
+    print(f"jobs: {report['jobs']}")
+
+
+async def _run(args: argparse.Namespace, url: str, audio: bytes) -> Dict:
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(
+            client, parse_rates(args.rate), args.duration, audio,
+            batch_size=args.batch_size, max_in_flight=args.max_in_flight, drain=args.drain, seed=args.seed
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Audio2Video API load test")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run a load test and write a report")
+    run.add_argument("--url", help="Target an existing server instead of starting one")
+    run.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    run.add_argument("--rate", action="append", default=[], metavar="ENDPOINT=RPS",
+                     help=f"Override a request rate; endpoints: {', '.join(ENDPOINTS)}")
+    run.add_argument("--batch-size", type=int, default=4, help="Files per batch upload")
+    run.add_argument("--audio-seconds", type=float, default=5.0, help="Length of the uploaded WAV")
+    run.add_argument("--profile", help="Fake engine profile (JSON file or inline JSON) for the local server")
+    run.add_argument("--workers", type=int, default=2, help="Job workers of the local server")
+    run.add_argument("--max-in-flight", type=int, default=256, help="Client-side concurrency cap")
+    run.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    run.add_argument("--drain", type=float, default=0.0, help="Seconds to wait for submitted jobs to finish")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--output", help="Write the report as JSON")
+    run.add_argument("--max-error-rate", type=float, help="Exit with 1 if any endpoint exceeds this error rate")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = build_parser().parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="a2v-load-audio-") as tmp:
+        audio = write_wav("speech", args.audio_seconds, Path(tmp) / "load.wav", args.seed).read_bytes()
+
+    if args.url:
+        report = asyncio.run(_run(args, args.url, audio))
+    else:
+        with local_server(args.profile, args.workers) as url:
+            report = asyncio.run(_run(args, url, audio))
+
+    report["meta"] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key != "command"},
+    }
+    print_report(report)
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        logger.info(f"Wrote report to {output}")
+
+    if args.max_error_rate is not None:
+        worst = max((s["error_rate"] for s in report["endpoints"].values()), default=0.0)
+        if worst > args.max_error_rate:
+            print(f"Error rate {worst:.1%} exceeds {args.max_error_rate:.1%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""End-to-end pipeline benchmarks.
+
+Times each stage of the conversion pipeline against deterministic synthetic
+fixtures and writes the results as JSON. A saved results file can be used as
+a baseline to catch regressions.
+
+Usage:
+    python -m benchmarks.pipeline run --durations 1 10 60 --output results.json
+    python -m benchmarks.pipeline run --durations 1 --baseline baseline.json
+    python -m benchmarks.pipeline compare results.json baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.services.synthetic import AUDIO_KINDS, DEFAULT_SEED, build_fixture_set
+
+logger = logging.getLogger("benchmarks.pipeline")
+
+STAGES = ("save", "transcribe", "package", "render", "batch")
+DEFAULT_THRESHOLD = 0.10
+
+
+class BenchmarkResults:
+    """Collects metric samples and serializes them to JSON."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.metrics: Dict[str, dict] = {}
+
+    def record(self, name: str, value: float, unit: str, lower_is_better: bool, **extra) -> None:
+        """Record one metric value. Repeated names keep every sample."""
+        entry = self.metrics.setdefault(name, {
+            "unit": unit,
+            "lower_is_better": lower_is_better,
+            "samples": [],
+        })
+        entry["samples"].append(value)
+        entry.update(extra)
+        logger.info(f"{name}: {value:.4f} {unit}")
+
+    def to_dict(self) -> dict:
+        metrics = {}
+        for name, entry in sorted(self.metrics.items()):
+            data = dict(entry)
+            data["value"] = statistics.median(entry["samples"])
+            metrics[name] = data
+        return {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "host": platform.node(),
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpu_count": os.cpu_count(),
+                "test_mode": os.getenv("A2V_TEST_MODE") == "1",
+                "config": self.config,
+            },
+            "metrics": metrics,
+        }
+
+
+def _timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _synthetic_segments(seconds: float) -> List[Dict]:
+    """Segments shaped like Whisper output, used when transcription is skipped."""
+    segments = []
+    start = 0.0
+    index = 1
+    while start < seconds:
+        end = min(seconds, start + 3.2)
+        segments.append({"id": index, "start": start, "end": end, "text": f" Segment number {index}."})
+        start = end
+        index += 1
+    return segments
+
+
+def bench_save(results: BenchmarkResults, name: str, fixture: dict, work_dir: Path) -> None:
+    """Time FileHandler.save_audio_file streaming an upload to disk."""
+    from fastapi import HTTPException, UploadFile
+    from app.services.file_handler import FileHandler
+
+    path = fixture["path"]
+    size = path.stat().st_size
+    target = work_dir / f"saved_{path.name}"
+    with open(path, "rb") as f:
+        upload = UploadFile(file=f, filename=path.name, size=size)
+        try:
+            _, elapsed = _timed(asyncio.run, FileHandler.save_audio_file(upload, target))
+        except HTTPException as e:
+            logger.warning(f"Skipping save benchmark for {name}: {e.detail}")
+            return
+    target.unlink(missing_ok=True)
+    results.record(f"save.{name}.seconds", elapsed, "s", True, bytes=size)
+    results.record(f"save.{name}.throughput", size / elapsed / (1024 * 1024), "MiB/s", False)
+
+
+def bench_transcribe(results: BenchmarkResults, name: str, fixture: dict) -> List[Dict]:
+    """Time transcription and report the real-time factor (wall / audio)."""
+    from app.services import transcription
+    from app.services.background_processor import WHISPER_MODEL, WHISPER_MODEL_PATH
+
+    model_path = WHISPER_MODEL_PATH or None
+    if os.getenv("A2V_TEST_MODE") != "1" and "transcribe.model_load.seconds" not in results.metrics:
+        _, load_elapsed = _timed(transcription.get_model, WHISPER_MODEL, model_path)
+        results.record("transcribe.model_load.seconds", load_elapsed, "s", True, model=WHISPER_MODEL)
+
+    segments, elapsed = _timed(
+        transcription.transcribe_audio, fixture["path"], model_name=WHISPER_MODEL, model_path=model_path
+    )
+    results.record(f"transcribe.{name}.seconds", elapsed, "s", True)
+    results.record(f"transcribe.{name}.rtf", elapsed / fixture["seconds"], "x", True, segments=len(segments))
+    return segments
+
+
+def bench_package(results: BenchmarkResults, name: str, segments: List[Dict], work_dir: Path) -> None:
+    """Time writing the transcript JSON and VTT outputs."""
+    from app.models import TranscriptData, TranscriptSegment
+    from app.utils.vtt_generator import generate_vtt
+
+    def package():
+        transcript_data = TranscriptData(
+            version="1.0",
+            segments=[TranscriptSegment(**seg) for seg in segments]
+        )
+        with open(work_dir / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(transcript_data.model_dump(), f, indent=2, ensure_ascii=False)
+        generate_vtt(segments, work_dir / f"{name}.vtt")
+
+    _, elapsed = _timed(package)
+    results.record(f"package.{name}.seconds", elapsed, "s", True, segments=len(segments))
+
+
+def bench_render(results: BenchmarkResults, name: str, fixture: dict, image_path: Path, work_dir: Path) -> None:
+    """Time FFmpeg rendering and report speed as a multiple of real time."""
+    from app.services.video_processor import generate_video
+    from app.services.background_processor import FFMPEG_TIMEOUT
+
+    output_path = work_dir / f"{name}.mp4"
+    _, elapsed = _timed(
+        generate_video, fixture["path"], image_path, output_path, timeout=max(FFMPEG_TIMEOUT, 4 * 3600)
+    )
+    size = output_path.stat().st_size if output_path.exists() else 0
+    output_path.unlink(missing_ok=True)
+    results.record(f"render.{name}.seconds", elapsed, "s", True, bytes=size)
+    results.record(f"render.{name}.speed", fixture["seconds"] / elapsed, "x realtime", False)
+
+
+def bench_batch(
+    results: BenchmarkResults,
+    name: str,
+    fixture: dict,
+    image_path: Path,
+    work_dir: Path,
+    workers: int,
+    jobs: int
+) -> None:
+    """Run process_job for several copies of a fixture on N worker threads."""
+    import shutil
+    from app.services.background_processor import process_job
+    from app.utils.job_manager import JobManager
+    from app.utils.progress_store import progress_store, JobState
+
+    job_manager = JobManager(str(work_dir / f"batch_{workers}"))
+    job_ids = []
+    for _ in range(jobs):
+        job_id = job_manager.create_job(fixture["path"].name)
+        progress_store.create_job(job_id)
+        shutil.copyfile(fixture["path"], job_manager.get_source_audio_path(job_id))
+        job_image = job_manager.get_background_image_path(job_id)
+        shutil.copyfile(image_path, job_image)
+        job_ids.append((job_id, job_manager.get_source_audio_path(job_id), job_image))
+
+    def run_all():
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda job: process_job(job[0], job_manager, job[1], job[2]), job_ids))
+
+    _, elapsed = _timed(run_all)
+    failed = [job_id for job_id, _, _ in job_ids if progress_store.get(job_id).state != JobState.SUCCEEDED]
+    if failed:
+        logger.warning(f"{len(failed)} batch jobs failed at {workers} workers")
+    shutil.rmtree(job_manager.base_dir, ignore_errors=True)
+
+    prefix = f"batch.{name}.workers_{workers}"
+    results.record(f"{prefix}.seconds", elapsed, "s", True, jobs=jobs, failed=len(failed))
+    results.record(f"{prefix}.jobs_per_minute", jobs * 60 / elapsed, "jobs/min", False)
+    results.record(f"{prefix}.audio_throughput", jobs * fixture["seconds"] / elapsed, "x realtime", False)
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    """Build fixtures, run the selected stages and return the results dict."""
+    stages = [s for s in args.stages if s in STAGES]
+    config = {
+        "durations_minutes": args.durations,
+        "kinds": args.kinds,
+        "stages": stages,
+        "workers": args.workers,
+        "batch_jobs": args.batch_jobs,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "whisper_model": os.getenv("WHISPER_MODEL", "base"),
+    }
+    results = BenchmarkResults(config)
+
+    if os.getenv("A2V_TEST_MODE") == "1":
+        logger.warning("A2V_TEST_MODE=1: engines are stubbed, timings measure orchestration only")
+
+    fixtures = build_fixture_set(Path(args.fixtures_dir), args.durations, args.kinds, args.seed)
+    image_path = fixtures["image"]
+
+    with tempfile.TemporaryDirectory(prefix="a2v-bench-") as tmp:
+        work_dir = Path(tmp)
+        for _ in range(args.repeat):
+            for name, fixture in fixtures["audio"].items():
+                segments = None
+                if "save" in stages:
+                    bench_save(results, name, fixture, work_dir)
+                if "transcribe" in stages:
+                    segments = bench_transcribe(results, name, fixture)
+                if "package" in stages:
+                    bench_package(results, name, segments or _synthetic_segments(fixture["seconds"]), work_dir)
+                if "render" in stages:
+                    bench_render(results, name, fixture, image_path, work_dir)
+
+            if "batch" in stages:
+                # Batch throughput uses the shortest speech-like fixture
+                batch_name = f"{'speech' if 'speech' in args.kinds else args.kinds[0]}_{min(args.durations)}m"
+                for workers in args.workers:
+                    bench_batch(
+                        results, batch_name, fixtures["audio"][batch_name], image_path,
+                        work_dir, workers, args.batch_jobs
+                    )
+
+    return results.to_dict()
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Compare two results dicts metric by metric.
+
+    Args:
+        current: Results from the run under test
+        baseline: Previously saved results
+        threshold: Relative change treated as significant (0.10 = 10%)
+
+    Returns:
+        List of comparison rows with name, baseline, current, change and status
+        ("regression", "improvement" or "ok")
+    """
+    rows = []
+    for name, entry in sorted(current.get("metrics", {}).items()):
+        base_entry = baseline.get("metrics", {}).get(name)
+        if not base_entry or not base_entry.get("value"):
+            continue
+        base_value = base_entry["value"]
+        value = entry["value"]
+        change = (value - base_value) / base_value
+        worse = change > threshold if entry["lower_is_better"] else change < -threshold
+        better = change < -threshold if entry["lower_is_better"] else change > threshold
+        rows.append({
+            "name": name,
+            "unit": entry["unit"],
+            "baseline": base_value,
+            "current": value,
+            "change": change,
+            "status": "regression" if worse else "improvement" if better else "ok",
+        })
+    return rows
+
+
+def print_comparison(rows: List[dict]) -> None:
+    width = max((len(row["name"]) for row in rows), default=10)
+    for row in rows:
+        print(
+            f"{row['name']:<{width}}  {row['baseline']:>12.4f} -> {row['current']:>12.4f} "
+            f"{row['unit']:<12} {row['change']:+7.1%}  {row['status']}"
+        )
+
+
+def _load_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Audio2Video pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run benchmarks and write results JSON")
+    run.add_argument("--durations", type=int, nargs="+", default=[1, 10, 60], help="Fixture lengths in minutes")
+    run.add_argument("--kinds", nargs="+", default=list(AUDIO_KINDS), choices=AUDIO_KINDS)
+    run.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    run.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts for batch stage")
+    run.add_argument("--batch-jobs", type=int, default=4, help="Jobs per batch throughput run")
+    run.add_argument("--repeat", type=int, default=1, help="Repetitions; the median is reported")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--fixtures-dir", default=".bench/fixtures", help="Fixture cache directory")
+    run.add_argument("--output", default=".bench/results.json")
+    run.add_argument("--baseline", help="Compare against this results file after running")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare = subparsers.add_parser("compare", help="Compare a results file against a baseline")
+    compare.add_argument("current")
+    compare.add_argument("baseline")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+
+    baseline_path = args.baseline
+    if args.command == "run":
+        current = run_benchmarks(args)
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        logger.info(f"Wrote results to {output}")
+    else:
+        current = _load_json(args.current)
+
+    if not baseline_path:
+        return 0
+
+    rows = compare_results(current, _load_json(baseline_path), args.threshold)
+    print_comparison(rows)
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
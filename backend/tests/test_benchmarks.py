@@ -0,0 +1,72 @@
+import hashlib
+from pathlib import Path
+
+from app.services.synthetic import write_png, write_wav
+from benchmarks.pipeline import compare_results
+
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_synthetic_fixtures_are_deterministic(tmp_path: Path):
+    first = write_wav("speech", 12, tmp_path / "a.wav")
+    second = write_wav("speech", 12, tmp_path / "b.wav")
+    assert _digest(first) == _digest(second)
+    # 12s of 16 kHz mono int16 plus the 44 byte header
+    assert first.stat().st_size == 12 * 16000 * 2 + 44
+
+    other_seed = write_wav("speech", 12, tmp_path / "c.wav", seed=7)
+    assert _digest(other_seed) != _digest(first)
+
+    image = write_png(tmp_path / "bg.png", width=64, height=36)
+    assert image.read_bytes().startswith(b"\x89PNG")
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"metrics": {
+        "transcribe.speech_1m.rtf": {"value": 0.20, "unit": "x", "lower_is_better": True},
+        "render.speech_1m.speed": {"value": 40.0, "unit": "x realtime", "lower_is_better": False},
+    }}
+    current = {"metrics": {
+        "transcribe.speech_1m.rtf": {"value": 0.25, "unit": "x", "lower_is_better": True},
+        "render.speech_1m.speed": {"value": 50.0, "unit": "x realtime", "lower_is_better": False},
+    }}
+    rows = {row["name"]: row["status"] for row in compare_results(current, baseline, threshold=0.1)}
+    assert rows["transcribe.speech_1m.rtf"] == "regression"
+    assert rows["render.speech_1m.speed"] == "improvement"
+
+
+def test_load_summary_percentiles_and_errors():
+    from benchmarks.load import parse_rates, percentile, summarize
+
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    samples = [(i / 1000, None) for i in range(1, 101)] + [(0.5, "500")]
+    summary = summarize(samples, elapsed=10.0)
+    assert summary["requests"] == 101
+    assert summary["error_kinds"] == {"500": 1}
+    assert summary["throughput_rps"] == 10.1
+    assert summary["latency_ms"]["p50"] == 51.0
+    assert summary["latency_ms"]["max"] == 500.0
+
+    rates = parse_rates(["convert=3", "batch=0"])
+    assert rates["convert"] == 3.0 and "batch" not in rates
+
+
+def test_load_run_against_the_app(client):
+    import asyncio
+
+    import httpx
+
+    from benchmarks.load import run_load
+
+    async def run():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as http:
+            rates = {"convert": 20.0, "batch": 5.0, "status": 40.0, "batch_status": 10.0, "artifact": 20.0}
+            return await run_load(http, rates, duration=0.5, audio=b"audio", batch_size=2)
+
+    report = asyncio.run(run())
+    assert report["endpoints"]["convert"]["requests"] > 0
+    assert all(summary["errors"] == 0 for summary in report["endpoints"].values())
+    assert report["jobs"]["succeeded"] == report["jobs"]["submitted"]
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from app.utils.blob_store import BlobStore, sha256_file
+
+
+def test_adopt_deduplicates_identical_files(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    first = tmp_path / "a.bin"
+    second = tmp_path / "b.bin"
+    first.write_bytes(b"same-content")
+    second.write_bytes(b"same-content")
+
+    digest = store.adopt(first)
+    assert store.adopt(second) == digest
+    assert digest == sha256_file(store.blob_path(digest))
+    assert os.path.samefile(first, second)
+    assert store.refcount(digest) == 2
+
+
+def test_link_and_garbage_collection(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    staged = store.tmp_path()
+    staged.write_bytes(b"shared-image")
+    digest = store.put(staged)
+    assert not staged.exists()
+    assert store.refcount(digest) == 0
+
+    dest = tmp_path / "job" / "background_image.jpg"
+    dest.parent.mkdir()
+    store.link(digest, dest)
+    assert dest.read_bytes() == b"shared-image"
+    assert store.refcount(digest) == 1
+    assert store.collect_garbage() == 0
+
+    dest.unlink()
+    assert store.collect_garbage() == 1
+    assert not store.exists(digest)
+    with pytest.raises(FileNotFoundError):
+        store.link(digest, dest)
+
+
+def test_batch_shares_one_image_blob(client):
+    from app.api import routes
+
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("one.m4a", b"same-audio", "audio/mp4")),
+            ("audios", ("two.m4a", b"same-audio", "audio/mp4")),
+            ("image", ("bg.png", b"shared-image", "image/png")),
+        ],
+    )
+    job_ids = [job["job_id"] for job in response.json()["jobs"]]
+    manager = routes.job_manager
+    images = [manager.get_background_image_path(job_id) for job_id in job_ids]
+    audios = [manager.get_source_audio_path(job_id) for job_id in job_ids]
+
+    assert os.path.samefile(*images)
+    assert os.path.samefile(*audios)
+    # Identical renders are stored once as well
+    videos = [manager.get_rendered_video_path(job_id) for job_id in job_ids]
+    assert os.path.samefile(*videos)
+    digest = manager.get_job_meta(job_ids[0])["blobs"][images[0].name]
+    assert manager.blob_store.refcount(digest) == 2
+
+
+def test_replacing_a_linked_image_leaves_other_jobs_intact(client):
+    from app.api import routes
+
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("one.m4a", b"one", "audio/mp4")),
+            ("audios", ("two.m4a", b"two", "audio/mp4")),
+            ("image", ("bg.png", b"shared-image", "image/png")),
+        ],
+    )
+    first, second = [job["job_id"] for job in response.json()["jobs"]]
+    client.post(f"/api/jobs/{first}/retry", files={"image": ("bg.png", b"new-image", "image/png")})
+
+    manager = routes.job_manager
+    assert manager.get_background_image_path(first).read_bytes() == b"new-image"
+    assert manager.get_background_image_path(second).read_bytes() == b"shared-image"
@@ -0,0 +1,77 @@
+import json
+
+from app import calibrate
+from app.calibrate import calibrate_encoding, calibrate_threads, calibrate_tier, word_error_rate
+from app.services.cpu_budget import CpuBudget
+from app.services.host_profile import host_info, load_host_profile, save_host_profile
+from app.services.tiers import TierConfig
+
+REFERENCE = "the quick brown fox jumps over the lazy dog"
+
+
+def test_word_error_rate():
+    assert word_error_rate(REFERENCE, REFERENCE.upper() + ".") == 0.0
+    assert word_error_rate(REFERENCE, "the quick brown fox jumps over a lazy dog") == 1 / 9
+    assert word_error_rate("", "") == 0.0 and word_error_rate("", "hallucination") == 1.0
+
+
+def test_tier_picks_fastest_setting_above_the_accuracy_floor():
+    speed = {"int8": 1.0, "int8_float32": 1.5, "float32": 3.0}
+
+    def run(model, compute_type, threads, beam_size):
+        # beam 1 drops a word: 1/9 WER fails a 0.95 floor
+        text = REFERENCE if beam_size > 1 else REFERENCE.replace("lazy ", "")
+        return text, speed[compute_type] * (1 + beam_size / 10)
+
+    tier = TierConfig("balanced", "base", "int8", 5, True, 1000)
+    chosen, trials = calibrate_tier(tier, run, audio_seconds=10.0, threads=4)
+    assert (chosen["compute_type"], chosen["beam_size"]) == ("int8", 2)
+    assert chosen["model"] == "base" and chosen["quality"] == 1.0
+    assert len(trials) == 9
+
+    chosen, _ = calibrate_tier(tier, run, audio_seconds=10.0, threads=4, min_accuracy=0.8)
+    assert chosen["beam_size"] == 1
+
+
+def test_threads_prefer_fewer_unless_clearly_faster():
+    times = {1: 8.0, 2: 4.2, 4: 4.0, 6: 4.1}
+    settings = {"model": "base", "compute_type": "int8", "beam_size": 5}
+    chosen, trials = calibrate_threads(lambda *args: ("", times[args[2]]), settings, 10.0, max_threads=6)
+    assert [trial["cpu_threads"] for trial in trials] == [1, 2, 4, 6]
+    assert chosen == {"cpu_threads": 2, "rtf": 0.42}
+
+
+def test_encoding_picks_fastest_preset_above_the_ssim_floor():
+    results = {"ultrafast": (1.0, 0.95), "veryfast": (2.0, 0.985), "medium": (5.0, 0.99)}
+    chosen, _ = calibrate_encoding(results.get, 10.0, presets=list(results))
+    assert chosen == {"preset": "veryfast", "rtf": 0.2, "ssim": 0.985}
+    chosen, _ = calibrate_encoding(results.get, 10.0, presets=list(results), min_ssim=0.999)
+    assert chosen["preset"] == "medium"
+
+
+def test_host_profile_round_trip_keeps_other_hosts(tmp_path):
+    path = tmp_path / "host_profile.json"
+    other = {"host": {"key": "arm64/other/4cpu"}, "encoding": {"preset": "fast"}}
+    save_host_profile(other, str(path))
+    assert load_host_profile(str(path)) == {}
+
+    mine = {"host": host_info(), "whisper": {"cpu_threads": 2}}
+    save_host_profile(mine, str(path))
+    assert load_host_profile(str(path)) == mine
+    assert load_host_profile(str(path), key="arm64/other/4cpu") == other
+    assert load_host_profile("") == {}
+
+    path.write_text(json.dumps({"version": 99, "hosts": {host_info()["key"]: mine}}))
+    assert load_host_profile(str(path)) == {}
+
+
+def test_first_boot_skips_calibrated_hosts(tmp_path, monkeypatch):
+    path = tmp_path / "host_profile.json"
+    save_host_profile({"host": host_info()}, str(path))
+    monkeypatch.setattr(calibrate, "run_calibration", lambda args: (_ for _ in ()).throw(AssertionError))
+    assert calibrate.main(["--first-boot", "--output", str(path)]) == 0
+
+
+def test_calibrated_thread_count_bounds_whisper():
+    assert CpuBudget(cpus=list(range(8)), slots=2, whisper_threads=2).whisper_settings() == (2, 2)
+    assert CpuBudget(cpus=list(range(8)), slots=2, whisper_threads=16).whisper_settings() == (4, 2)
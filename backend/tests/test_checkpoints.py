@@ -0,0 +1,93 @@
+import json
+
+from app.services import background_processor, dispatcher
+from app.utils.checkpoints import CHECKPOINTS_FILENAME, JobStatus, StageCheckpoints
+from app.utils.progress_store import progress_store
+
+
+def _stages(job_manager, job_id):
+    return json.loads((job_manager.get_job_dir(job_id) / CHECKPOINTS_FILENAME).read_text())
+
+
+def _convert(client, **files):
+    files = {"audio": ("talk.m4a", b"audio-bytes", "audio/mp4"), **files}
+    return client.post("/api/convert", files=files).json()["job_id"]
+
+
+def test_completed_job_records_stage_markers(client):
+    from app.api import routes
+
+    job_id = _convert(client)
+    data = _stages(routes.job_manager, job_id)
+    assert data["status"] == JobStatus.SUCCEEDED
+    assert list(data["stages"]) == ["ingest", "probe", "transcribe", "package", "waveform", "render"]
+    assert all(marker["status"] == "done" for marker in data["stages"].values())
+    assert len(data["stages"]["render"]["artifacts"]["video"]["sha256"]) == 64
+
+
+def test_retry_after_render_failure_skips_transcription(client, monkeypatch):
+    from app.api import routes
+
+    calls = []
+    real_transcribe = background_processor.transcribe_audio
+
+    def counting_transcribe(*args, **kwargs):
+        calls.append(args)
+        return real_transcribe(*args, **kwargs)
+
+    def failing_render(*args, **kwargs):
+        raise RuntimeError("FFmpeg execution timed out")
+
+    monkeypatch.setattr(background_processor, "transcribe_audio", counting_transcribe)
+    monkeypatch.setattr(background_processor, "generate_video", failing_render)
+    job_id = _convert(client)
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "failed"
+    assert _stages(routes.job_manager, job_id)["stages"]["render"]["status"] == "failed"
+
+    monkeypatch.undo()
+    monkeypatch.setenv("A2V_TEST_MODE", "1")
+    monkeypatch.setattr(background_processor, "transcribe_audio", counting_transcribe)
+    response = client.post(f"/api/jobs/{job_id}/retry")
+    assert response.status_code == 200
+    assert response.json()["state"] == "succeeded"
+    assert len(calls) == 1
+    assert routes.job_manager.get_rendered_video_path(job_id).exists()
+
+
+def test_retry_with_new_image_rerenders_only(client):
+    from app.api import routes
+
+    job_id = _convert(client, image=("bg.png", b"first-image", "image/png"))
+    before = _stages(routes.job_manager, job_id)["stages"]
+
+    response = client.post(
+        f"/api/jobs/{job_id}/retry", files={"image": ("bg.png", b"second-image", "image/png")}
+    )
+    assert response.status_code == 200
+    after = _stages(routes.job_manager, job_id)["stages"]
+    assert after["transcribe"]["completed_at"] == before["transcribe"]["completed_at"]
+    assert after["render"]["completed_at"] > before["render"]["completed_at"]
+    assert after["ingest"]["artifacts"]["image"]["sha256"] != before["ingest"]["artifacts"]["image"]["sha256"]
+
+
+def test_retry_rejects_unknown_and_active_jobs(client):
+    from app.api import routes
+
+    assert client.post("/api/jobs/job_missing/retry").status_code == 404
+    job_id = routes.job_manager.create_job("pending.m4a")
+    progress_store.create_job(job_id)
+    assert client.post(f"/api/jobs/{job_id}/retry").status_code == 409
+
+
+def test_interrupted_jobs_resume_from_checkpoints(client):
+    from app.api import routes
+
+    job_id = _convert(client)
+    StageCheckpoints(routes.job_manager.get_job_dir(job_id)).set_status(JobStatus.RUNNING)
+    routes.job_manager.get_rendered_video_path(job_id).unlink()
+    # Simulate a restart: this process no longer knows the job
+    progress_store.evict(job_id)
+
+    assert dispatcher.resume_interrupted_jobs(routes.job_manager) == [job_id]
+    assert routes.job_manager.get_rendered_video_path(job_id).exists()
+    assert _stages(routes.job_manager, job_id)["status"] == JobStatus.SUCCEEDED
@@ -0,0 +1,113 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services import video_processor
+from app.services.video_processor import (
+    GOP_FRAMES,
+    RENDER_FPS,
+    _run_ffmpeg_parallel,
+    build_chunk_commands,
+    build_ladder_command,
+    parse_renditions,
+    plan_chunks,
+)
+
+
+def test_chunks_are_gop_aligned_and_cover_the_timeline():
+    gop_seconds = GOP_FRAMES / RENDER_FPS
+    ranges = plan_chunks(3 * 3600 + 7.3, 8)
+
+    assert len(ranges) == 8
+    assert ranges[0][0] == 0.0
+    for (start, length), (next_start, _) in zip(ranges, ranges[1:]):
+        assert start + length == pytest.approx(next_start)
+        assert (length / gop_seconds) == pytest.approx(round(length / gop_seconds))
+    last_start, last_length = ranges[-1]
+    assert last_start + last_length == pytest.approx(3 * 3600 + 7.3)
+
+
+def test_short_input_gets_fewer_chunks():
+    assert plan_chunks(25.0, 16) == [(0.0, 10.0), (10.0, 10.0), (20.0, 5.0)]
+    assert plan_chunks(4.0, 4) == [(0.0, 4.0)]
+
+
+def test_chunk_commands_encode_audio_once(tmp_path):
+    ranges = plan_chunks(60.0, 3)
+    commands, parts, audio_track = build_chunk_commands(
+        Path("talk.m4a"), Path("bg.png"), tmp_path, ranges, threads=2
+    )
+
+    assert len(commands) == 1 + len(parts) == 4
+    assert "-vn" in commands[0] and str(audio_track) in commands[0]
+    for command, part, (_, length) in zip(commands[1:], parts, ranges):
+        assert "-an" in command
+        assert command[command.index("-frames:v") + 1] == str(round(length * RENDER_FPS))
+        assert command[command.index("-g") + 1] == str(GOP_FRAMES)
+        assert command[-1] == str(part)
+
+
+def test_failed_part_cancels_the_others():
+    slow = [sys.executable, "-c", "import time; time.sleep(30)"]
+    failing = [sys.executable, "-c", "import sys; sys.exit('boom')"]
+
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="boom"):
+        _run_ffmpeg_parallel([slow, failing, slow], workers=3, timeout=60)
+    assert time.perf_counter() - started < 10
+
+    ok = [sys.executable, "-c", "import sys; sys.stderr.write('done')"]
+    assert _run_ffmpeg_parallel([ok, ok], workers=2, timeout=10) == ["done", "done"]
+
+
+def test_long_recordings_take_the_chunked_path(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.delenv("A2V_TEST_MODE", raising=False)
+    monkeypatch.setattr(video_processor, "check_ffmpeg", lambda: True)
+    monkeypatch.setattr(video_processor, "RENDER_CHUNKS", 4)
+    monkeypatch.setattr(video_processor, "_render_chunked", lambda *args: calls.append(args))
+    audio = tmp_path / "talk.m4a"
+    audio.write_bytes(b"audio")
+
+    video_processor.generate_video(audio, None, tmp_path / "out.mp4", duration=7200.0)
+    assert len(calls) == 1
+
+
+def test_renditions_are_validated_and_ordered():
+    assert parse_renditions("1080p, 360p,360p") == ["360p", "1080p"]
+    assert parse_renditions("") == [] and parse_renditions(None) == []
+    with pytest.raises(ValueError, match="480p"):
+        parse_renditions("480p,720p")
+
+
+def test_ladder_renders_every_rendition_in_one_pass(tmp_path):
+    outputs = {"360p": tmp_path / "talk.360p.mp4", "720p": tmp_path / "talk.mp4"}
+    cmd = build_ladder_command(tmp_path / "talk.m4a", tmp_path / "bg.jpg", outputs, threads=2)
+
+    assert cmd.count("-i") == 2
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v]split=2[v0][v1];")
+    assert "scale=640:360" in graph and "scale=1280:720" in graph
+    # Audio is normalized and encoded once, shared by every output
+    assert graph.count("loudnorm") == 1 and cmd.count("-c:a") == 1
+    assert cmd[cmd.index("-f", cmd.index("-filter_complex")) + 1] == "tee"
+    assert cmd[-1].split("|") == [
+        f"[f=mp4:movflags=+faststart:select=\\'v:0,a\\']{outputs['360p']}",
+        f"[f=mp4:movflags=+faststart:select=\\'v:1,a\\']{outputs['720p']}",
+    ]
+
+
+def test_renditions_take_the_ladder_path(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.delenv("A2V_TEST_MODE", raising=False)
+    monkeypatch.setattr(video_processor, "check_ffmpeg", lambda: True)
+    monkeypatch.setattr(video_processor, "_render_ladder", lambda *args: calls.append(args))
+    audio = tmp_path / "talk.m4a"
+    audio.write_bytes(b"audio")
+
+    video_processor.generate_video(
+        audio, None, tmp_path / "out.mp4", duration=7200.0, renditions={"1080p": tmp_path / "out.1080p.mp4"}
+    )
+    assert list(calls[0][2]) == ["1080p", "720p"]
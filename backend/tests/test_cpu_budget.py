@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.services.cpu_budget import CpuBudget
+from app.services.host_profile import available_cpus, cgroup_cpu_limit
+from app.utils.metrics import CPU_THREADS
+
+
+def test_cgroup_quota_v2_and_v1(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("200000")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000")
+    assert cgroup_cpu_limit(v1) == 2.0
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("-1")
+    assert cgroup_cpu_limit(v1) is None
+    assert cgroup_cpu_limit(tmp_path / "missing") is None
+
+
+def test_available_cpus_respects_an_explicit_limit():
+    assert len(available_cpus(limit=1.5)) == min(2, len(available_cpus()))
+    assert len(available_cpus(limit=0.5)) == 1
+
+
+def test_renders_share_cpus_and_rebalance_as_leases_end():
+    budget = CpuBudget(cpus=list(range(8)), slots=2)
+    assert budget.whisper_settings() == (4, 2)
+
+    with budget.lease("render") as first:
+        assert first.threads == 8
+        with budget.lease("render") as second:
+            assert (first.threads, second.threads) == (4, 4)
+            assert set(first.cpus).isdisjoint(second.cpus)
+            assert CPU_THREADS.value(stage="render") == 8
+        assert first.threads == 8
+    assert budget.snapshot() == []
+    assert CPU_THREADS.value(stage="render") == 0
+
+
+def test_transcription_share_is_reserved_from_renders():
+    budget = CpuBudget(cpus=list(range(8)), slots=2)
+    with budget.lease("transcribe", threads=4) as whisper, budget.lease("render") as render:
+        assert whisper.threads == 4 and render.threads == 4
+        assert set(whisper.cpus).isdisjoint(render.cpus)
+        with budget.lease("transcribe", threads=4):
+            # Fully reserved: renders still get one thread
+            assert render.threads == 1
+    assert budget.snapshot() == []
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs sched_setaffinity")
+def test_pinning_follows_lease_changes():
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < 2:
+        pytest.skip("needs two CPUs")
+    budget = CpuBudget(cpus=cpus[:2], pinning=True)
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        with budget.lease("render") as lease:
+            lease.attach(process.pid)
+            assert os.sched_getaffinity(process.pid) == set(cpus[:2])
+            with budget.lease("render"):
+                assert os.sched_getaffinity(process.pid) == {cpus[0]}
+            assert os.sched_getaffinity(process.pid) == set(cpus[:2])
+    finally:
+        process.kill()
+        process.wait()
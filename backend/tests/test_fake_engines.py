@@ -0,0 +1,44 @@
+import random
+import time
+
+import pytest
+
+from app.services.fake_engines import Distribution, FakeEngine, load_profile
+
+
+def test_distributions_are_seeded_and_non_negative():
+    spec = {"dist": "normal", "mean": 0.0, "stddev": 1.0}
+    first = [Distribution.parse(spec).sample(random.Random(1)) for _ in range(3)]
+    assert first == [Distribution.parse(spec).sample(random.Random(1)) for _ in range(3)]
+    rng = random.Random(2)
+    assert all(Distribution.parse(spec).sample(rng) >= 0 for _ in range(100))
+    assert Distribution.parse(0.25).sample(rng) == 0.25
+    lognormal = Distribution.parse({"dist": "lognormal", "median": 2.0, "sigma": 0.0})
+    assert lognormal.sample(rng) == 2.0
+    with pytest.raises(ValueError):
+        Distribution.parse({"dist": "uniform", "low": 1.0})
+    with pytest.raises(ValueError):
+        Distribution.parse({"dist": "pareto"})
+
+
+def test_engine_applies_latency_cpu_and_failures():
+    engine = FakeEngine({"render": {"latency": 0.05, "cpu": 0.02}, "mux": {"error_rate": 1.0}})
+
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    engine.run("render")
+    assert time.perf_counter() - start_wall >= 0.07
+    assert time.thread_time() - start_cpu >= 0.02
+
+    with pytest.raises(RuntimeError, match="Simulated mux failure"):
+        engine.run("mux")
+    engine.run("transcribe")  # Not configured: instant
+    with pytest.raises(ValueError):
+        FakeEngine({"upload": {"latency": 1}})
+
+
+def test_profile_from_inline_json_or_file(tmp_path):
+    assert load_profile('{"seed": 3}') == {"seed": 3}
+    path = tmp_path / "profile.json"
+    path.write_text('{"probe": {"latency": 0.01}}')
+    assert load_profile(str(path)) == {"probe": {"latency": 0.01}}
+    assert load_profile("") == {}
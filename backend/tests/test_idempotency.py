@@ -0,0 +1,38 @@
+import pytest
+
+from app.utils.idempotency import IdempotencyStore
+
+
+def test_completed_keys_replay_until_they_expire(tmp_path, monkeypatch):
+    store = IdempotencyStore(str(tmp_path / "keys.sqlite3"), ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.idempotency.time.time", lambda: now[0])
+
+    reservation = store.reserve("client", "key", "hash")
+    assert reservation.response is None
+    reservation.complete({"job_id": "job_1"})
+    reservation.release()
+
+    assert store.reserve("client", "key", "hash").response == {"job_id": "job_1"}
+    assert store.reserve("other", "key", "hash").response is None
+    with pytest.raises(ValueError, match="different request"):
+        store.reserve("client", "key", "other-hash")
+
+    now[0] += 61
+    assert store.reserve("client", "key", "other-hash").response is None
+
+
+def test_unfinished_reservations_block_until_released_or_abandoned(tmp_path, monkeypatch):
+    store = IdempotencyStore(str(tmp_path / "keys.sqlite3"), ttl=60, lock_seconds=600)
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.idempotency.time.time", lambda: now[0])
+
+    reservation = store.reserve("client", "key", "hash")
+    with pytest.raises(ValueError, match="in progress"):
+        store.reserve("client", "key", "hash")
+    reservation.release()
+    store.reserve("client", "key", "hash")
+
+    # A reservation whose request died is taken over after lock_seconds
+    now[0] += 601
+    assert store.reserve("client", "key", "hash").response is None
@@ -0,0 +1,202 @@
+import time
+from pathlib import Path
+
+from app.utils.job_manager import JobManager
+from app.utils.job_queue import JobQueue, QueueState
+from app.utils.progress_store import progress_store
+
+
+def test_claim_heartbeat_and_complete(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    queue.enqueue("job_a", {"has_image": False})
+    queue.enqueue("job_b", {"has_image": True})
+
+    claim = queue.claim("worker-1", lease_seconds=30)
+    assert claim["job_id"] == "job_a"
+    assert claim["attempts"] == 1
+    assert queue.depth() == 1
+
+    assert queue.heartbeat("job_a", "worker-1", 30)
+    assert not queue.heartbeat("job_a", "worker-2", 30)
+    assert queue.complete("job_a", "worker-1")
+    assert queue.get("job_a")["state"] == QueueState.DONE
+
+
+def test_expired_lease_is_requeued_then_failed(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    queue.enqueue("job_a")
+
+    assert queue.claim("crashed-worker", lease_seconds=0.01)["job_id"] == "job_a"
+    time.sleep(0.02)
+    # The crashed worker never heartbeats; the next claim picks the job up again
+    reclaimed = queue.claim("worker-2", lease_seconds=0.01)
+    assert reclaimed["job_id"] == "job_a"
+    assert reclaimed["attempts"] == 2
+    assert not queue.complete("job_a", "crashed-worker")
+
+    time.sleep(0.02)
+    assert queue.claim("worker-3", lease_seconds=30) is None
+    assert queue.get("job_a")["state"] == QueueState.FAILED
+
+
+def test_worker_runs_job_and_persists_progress(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("A2V_TEST_MODE", "1")
+    from app.worker import Worker
+
+    job_manager = JobManager(str(tmp_path / "jobs"))
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = job_manager.create_job("talk.m4a")
+    job_manager.get_source_audio_path(job_id).write_bytes(b"data")
+    queue.enqueue(job_id, {"has_image": False})
+
+    progress_store.add_listener(job_manager.write_progress)
+    try:
+        assert Worker(job_manager, queue, "worker-1").run_once()
+    finally:
+        progress_store.remove_listener(job_manager.write_progress)
+
+    assert queue.get(job_id)["state"] == QueueState.DONE
+    assert job_manager.read_progress(job_id)["state"] == "succeeded"
+    assert job_manager.get_rendered_video_path(job_id).exists()
+
+
+def test_distributed_mode_enqueues_and_reports_worker_progress(client, monkeypatch):
+    from app.api import routes
+    from app.services import dispatcher
+    from app.worker import Worker
+
+    monkeypatch.setattr(dispatcher, "EXECUTION_MODE", "distributed")
+    monkeypatch.setattr(dispatcher, "_job_queue", None)
+
+    response = client.post("/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")})
+    job_id = response.json()["job_id"]
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "queued"
+
+    queue = dispatcher.get_job_queue(routes.job_manager)
+    assert queue.depth() == 1
+
+    progress_store.add_listener(routes.job_manager.write_progress)
+    try:
+        assert Worker(routes.job_manager, queue, "worker-1").run_once()
+    finally:
+        progress_store.remove_listener(routes.job_manager.write_progress)
+
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "succeeded"
+
+
+
+def test_distributed_batch_status_reads_the_queue_once(client, monkeypatch):
+    from app.api import routes
+    from app.services import dispatcher
+
+    monkeypatch.setattr(dispatcher, "EXECUTION_MODE", "distributed")
+    monkeypatch.setattr(dispatcher, "_job_queue", None)
+
+    files = [("audios", (f"talk{i}.m4a", b"data", "audio/mp4")) for i in range(4)]
+    batch_id = client.post("/api/batch/convert", files=files).json()["batch_id"]
+    queue = dispatcher.get_job_queue(routes.job_manager)
+    snapshots = []
+    snapshot = queue.snapshot
+    monkeypatch.setattr(queue, "snapshot", lambda: snapshots.append(1) or snapshot())
+
+    jobs = client.get(f"/api/batch/{batch_id}/status").json()["jobs"]
+
+    assert sorted(job["status"]["queue_position"] for job in jobs) == [1, 2, 3, 4]
+    assert len(snapshots) == 1
+    single = client.get(f"/api/jobs/{jobs[0]['job_id']}/status").json()
+    assert single["queue_position"] == jobs[0]["status"]["queue_position"]
+
+def test_worker_that_loses_its_lease_stops_and_reports_nothing(tmp_path: Path, monkeypatch):
+    import threading
+    from app import worker as worker_module
+    from app.worker import Worker
+
+    job_manager = JobManager(str(tmp_path / "jobs"))
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = job_manager.create_job("talk.m4a")
+    job_manager.get_source_audio_path(job_id).write_bytes(b"data")
+    queue.enqueue(job_id, {"has_image": False})
+
+    cancelled = []
+
+    def slow_job(job_id, job_manager, audio_path, image_path, cancel: threading.Event):
+        cancelled.append(cancel.wait(5))
+
+    monkeypatch.setattr(worker_module, "process_job", slow_job)
+    monkeypatch.setattr(queue, "heartbeat", lambda *args: False)
+    assert Worker(job_manager, queue, "worker-1", lease_seconds=0.3).run_once()
+
+    assert cancelled == [True]
+    # Neither completed nor failed: the lease now belongs to the broker
+    assert queue.get(job_id)["state"] == QueueState.LEASED
+    assert not progress_store.job_exists(job_id)
+
+
+def test_cancelled_runs_stop_before_the_next_stage(tmp_path: Path, monkeypatch):
+    import threading
+    from app.services.background_processor import process_job
+    from app.utils.checkpoints import JobStatus, StageCheckpoints
+
+    monkeypatch.setenv("A2V_TEST_MODE", "1")
+    job_manager = JobManager(str(tmp_path / "jobs"))
+    job_id = job_manager.create_job("talk.m4a")
+    audio_path = job_manager.get_source_audio_path(job_id)
+    audio_path.write_bytes(b"data")
+    progress_store.create_job(job_id)
+    cancel = threading.Event()
+    cancel.set()
+
+    process_job(job_id, job_manager, audio_path, cancel=cancel)
+
+    assert progress_store.get(job_id).state.value == "running"
+    assert StageCheckpoints(job_manager.get_job_dir(job_id)).status == JobStatus.RUNNING
+    assert not job_manager.get_rendered_video_path(job_id).exists()
+    assert "stage_timings" not in job_manager.get_job_meta(job_id)
+
+
+def test_job_out_of_attempts_on_lease_expiry_is_reported_failed(client, monkeypatch):
+    from app.api import routes
+    from app.services import dispatcher, webhooks
+    from app.utils.checkpoints import JobStatus
+
+    monkeypatch.setattr(dispatcher, "EXECUTION_MODE", "distributed")
+    monkeypatch.setattr(dispatcher, "MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(dispatcher, "_job_queue", None)
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+
+    job_id = client.post(
+        "/api/convert",
+        files={"audio": ("talk.m4a", b"data", "audio/mp4")},
+        data={"callback_url": "http://example.test/hooks"},
+    ).json()["job_id"]
+    queue = dispatcher.get_job_queue(routes.job_manager)
+    assert queue.claim("crashed-worker", lease_seconds=0.01)["job_id"] == job_id
+    time.sleep(0.02)
+
+    assert queue.requeue_expired() == 0
+    assert queue.get(job_id)["state"] == QueueState.FAILED
+    status = client.get(f"/api/jobs/{job_id}/status").json()
+    assert status["state"] == "failed" and "lease expired" in status["error"]
+    assert routes.job_manager.checkpoints(job_id).status == JobStatus.FAILED
+    outbox = webhooks.get_webhook_outbox(routes.job_manager.base_dir)
+    assert outbox.counts() == {"pending": 1}
+
+
+def test_distributed_workers_route_tiers_on_broker_depth(client, monkeypatch):
+    from app.api import routes
+    from app.services import dispatcher
+    from app.worker import Worker
+
+    monkeypatch.setattr(dispatcher, "EXECUTION_MODE", "distributed")
+    monkeypatch.setattr(dispatcher, "_job_queue", None)
+    monkeypatch.setattr("app.services.tiers.QUEUE_PRESSURE_DEPTH", 2)
+
+    job_ids = [
+        client.post("/api/convert", files={"audio": (f"talk{i}.m4a", b"data", "audio/mp4")}).json()["job_id"]
+        for i in range(3)
+    ]
+    queue = dispatcher.get_job_queue(routes.job_manager)
+    assert Worker(routes.job_manager, queue, "worker-1").run_once()
+
+    tier = routes.job_manager.get_job_meta(job_ids[0])["tier"]
+    assert "queue pressure (2 waiting)" in tier["reason"]
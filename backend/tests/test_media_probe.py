@@ -0,0 +1,52 @@
+import json
+import subprocess
+
+import pytest
+
+from app.services import media_probe
+from app.services.media_probe import probe_audio
+
+
+@pytest.fixture
+def ffprobe(monkeypatch):
+    """Answer ffprobe calls with a configurable container format."""
+    monkeypatch.delenv("A2V_TEST_MODE", raising=False)
+    monkeypatch.delenv("A2V_ENGINES", raising=False)
+    monkeypatch.setattr(media_probe, "_ffprobe_path", None)
+    probed = {"format_name": "mp3", "calls": 0, "lookups": []}
+
+    def which(name):
+        probed["lookups"].append(name)
+        return f"/usr/bin/{name}"
+
+    def run(cmd, **kwargs):
+        probed["calls"] += 1
+        stdout = json.dumps({
+            "format": {"format_name": probed["format_name"], "duration": "1.5"},
+            "streams": [{"codec_name": "aac", "sample_rate": "44100", "channels": 2}],
+        })
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(media_probe.shutil, "which", which)
+    monkeypatch.setattr(media_probe.subprocess, "run", run)
+    return probed
+
+
+def test_container_must_match_the_file_extension(ffprobe, tmp_path):
+    ffprobe["format_name"] = "mov,mp4,m4a,3gp,3g2,mj2"
+    assert probe_audio(tmp_path / "talk.m4a")["format"] == "mov,mp4,m4a,3gp,3g2,mj2"
+    with pytest.raises(ValueError, match=r"\.mp3 file holds a mov,mp4"):
+        probe_audio(tmp_path / "clip.mp3")
+
+    ffprobe["format_name"] = "ogg"
+    assert probe_audio(tmp_path / "voice.opus")["duration"] == 1.5
+    with pytest.raises(ValueError, match="Unsupported container: matroska,webm"):
+        ffprobe["format_name"] = "matroska,webm"
+        probe_audio(tmp_path / "talk.ogg")
+
+
+def test_ffprobe_lookup_is_cached(ffprobe, tmp_path):
+    for _ in range(3):
+        probe_audio(tmp_path / "talk.mp3")
+    assert ffprobe["calls"] == 3
+    assert ffprobe["lookups"] == ["ffprobe"]
@@ -0,0 +1,67 @@
+import json
+
+from app.utils.metrics import Counter, Histogram, Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.register(Counter("demo_requests_total", "Requests", ["route"]))
+    latency = registry.register(Histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1)))
+
+    requests.labels(route='/a"b').inc()
+    requests.labels(route='/a"b').inc(2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{route="/a\\"b"} 3' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{le="1"} 2' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'demo_latency_seconds_count 2' in text
+
+
+def test_metrics_endpoint_and_stage_timings(client):
+    from app.api import routes
+
+    response = client.post(
+        "/api/convert",
+        files={"audio": ("meeting.m4a", b"data", "audio/mp4")},
+    )
+    job_id = response.json()["job_id"]
+
+    meta = json.loads((routes.job_manager.get_job_dir(job_id) / "job_meta.json").read_text())
+    timings = meta["stage_timings"]
+    for stage in ("saving", "transcribing", "packaging", "rendering", "total"):
+        assert stage in timings
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    body = metrics.text
+    assert 'a2v_stage_duration_seconds_count{stage="transcribing"}' in body
+    assert 'a2v_upload_bytes_total{kind="audio"}' in body
+    assert 'a2v_http_requests_total{method="POST",route="/api/convert",status="200"}' in body
+
+
+def test_cache_lookups_are_counted_per_cache(tmp_path):
+    from app.utils.job_manager import JobManager
+    from app.utils.metrics import CACHE_REQUESTS
+
+    def count(cache, result):
+        return CACHE_REQUESTS.value(cache=cache, result=result)
+
+    before = {key: count(*key) for key in [("blob_store", "hit"), ("blob_store", "miss"), ("job_files", "hit")]}
+    manager = JobManager(str(tmp_path))
+    for _ in range(2):
+        job_id = manager.create_job("talk.m4a")
+        audio_path = manager.get_source_audio_path(job_id)
+        audio_path.write_bytes(b"same audio")
+        manager.store_artifact(job_id, audio_path)
+        assert manager.fetch_artifact(job_id, audio_path)
+
+    # The second upload of the same content is deduplicated
+    assert count("blob_store", "miss") == before[("blob_store", "miss")] + 1
+    assert count("blob_store", "hit") == before[("blob_store", "hit")] + 1
+    assert count("job_files", "hit") == before[("job_files", "hit")] + 2
@@ -0,0 +1,40 @@
+from app.utils.profiler import parse_ffmpeg_benchmark
+
+
+def test_parse_ffmpeg_benchmark():
+    stderr = (
+        "frame=  100 fps=50 q=-1.0 Lsize=1kB time=00:00:04.00 speed=12.5x\n"
+        "bench: utime=1.234s stime=0.056s rtime=0.789s\n"
+        "bench: maxrss=123456KiB\n"
+    )
+    assert parse_ffmpeg_benchmark(stderr) == {
+        "utime": 1.234, "stime": 0.056, "rtime": 0.789, "maxrss_kb": 123456.0
+    }
+
+
+def test_profiled_job_serves_report(client):
+    response = client.post(
+        "/api/convert",
+        files={"audio": ("meeting.m4a", b"data", "audio/mp4")},
+        data={"profile": "true"},
+    )
+    job_id = response.json()["job_id"]
+
+    report = client.get(f"/api/jobs/{job_id}/profile")
+    assert report.status_code == 200
+    data = report.json()
+    assert [entry["stage"] for entry in data["timeline"]] == ["ingest", "probe", "transcribing", "packaging", "waveform", "rendering"]
+    assert "ffmpeg_benchmark" in data
+
+    speedscope = client.get(f"/api/jobs/{job_id}/profile", params={"format": "speedscope"})
+    assert speedscope.status_code == 200
+    assert speedscope.json()["profiles"][0]["type"] == "evented"
+
+
+def test_unprofiled_job_has_no_profile(client):
+    response = client.post(
+        "/api/convert",
+        files={"audio": ("meeting.m4a", b"data", "audio/mp4")},
+    )
+    job_id = response.json()["job_id"]
+    assert client.get(f"/api/jobs/{job_id}/profile").status_code == 404
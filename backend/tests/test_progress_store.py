@@ -0,0 +1,132 @@
+from app.utils.progress_store import JobState, ProgressStore
+
+
+def test_batch_changes_follow_version_cursor():
+    store = ProgressStore()
+    for job_id in ("a", "b", "c"):
+        store.create_job(job_id)
+        store.add_to_batch("batch", job_id)
+
+    cursor, changed, counts = store.get_batch_changes("batch")
+    assert [job_id for job_id, _ in changed] == ["a", "b", "c"]
+    assert counts == {"queued": 3}
+
+    store.update("b", state=JobState.RUNNING, percent=40)
+    store.update("a", state=JobState.SUCCEEDED)
+    next_cursor, changed, counts = store.get_batch_changes("batch", cursor)
+    assert [job_id for job_id, _ in changed] == ["b", "a"]
+    assert counts == {"queued": 1, "running": 1, "succeeded": 1}
+    assert next_cursor > cursor
+
+    assert store.get_batch_changes("batch", next_cursor)[1] == []
+    store.update("b", percent=60)
+    assert [job_id for job_id, _ in store.get_batch_changes("batch", next_cursor)[1]] == ["b"]
+    assert store.get_batch_changes("missing") is None
+
+
+def test_recreated_job_moves_between_state_counts():
+    store = ProgressStore()
+    store.create_job("a")
+    store.add_to_batch("batch", "a")
+    store.update("a", state=JobState.FAILED)
+    store.create_job("a", message="Retry queued")
+    assert store.get_batch_changes("batch")[2] == {"queued": 1}
+
+
+def test_batch_status_since_returns_only_changed_jobs(client):
+    from app.utils.progress_store import progress_store
+
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("one.m4a", b"one", "audio/mp4")),
+            ("audios", ("two.m4a", b"two", "audio/mp4")),
+        ],
+    )
+    batch_id = response.json()["batch_id"]
+    first, second = [job["job_id"] for job in response.json()["jobs"]]
+
+    full = client.get(f"/api/batch/{batch_id}/status").json()
+    assert len(full["jobs"]) == 2
+    assert full["counts"] == {"succeeded": 2}
+
+    assert client.get(f"/api/batch/{batch_id}/status", params={"since": full["cursor"]}).json()["jobs"] == []
+    progress_store.update(second, message="Touched")
+    delta = client.get(f"/api/batch/{batch_id}/status", params={"since": full["cursor"]}).json()
+    assert [job["job_id"] for job in delta["jobs"]] == [second]
+    assert delta["counts"] == {"succeeded": 2}
+    assert delta["cursor"] > full["cursor"]
+    assert client.get("/api/batch/missing/status").status_code == 404
+
+
+def test_finished_jobs_are_evicted_after_ttl():
+    store = ProgressStore(ttl_seconds=0, stripes=4)
+    for job_id in ("done", "broken", "busy"):
+        store.create_job(job_id)
+        store.add_to_batch("batch", job_id)
+    store.update("done", state=JobState.SUCCEEDED)
+    store.update("broken", state=JobState.FAILED)
+    store.update("busy", state=JobState.RUNNING)
+
+    assert store.evict_expired() == 2
+    assert len(store) == 1
+    assert store.get("done") is None
+    # Evicted members stay in the batch, and its counts are unchanged
+    assert store.get_batch_jobs("batch") == ["done", "broken", "busy"]
+    cursor, changed, counts = store.get_batch_changes("batch")
+    assert dict(changed)["done"] is None
+    assert counts == {"succeeded": 1, "failed": 1, "running": 1}
+
+    store.update("busy", state=JobState.SUCCEEDED)
+    store.evict_expired()
+    assert len(store) == 0
+    # The emptied batch is dropped one sweep later
+    assert store.get_batch_changes("batch") is not None
+    store.evict_expired()
+    assert store.get_batch_changes("batch") is None
+    assert store._job_batches == {}
+
+
+def test_reads_sweep_expired_jobs_at_most_every_sweep_interval(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.progress_store.time.monotonic", lambda: now[0])
+    store = ProgressStore(ttl_seconds=10, stripes=4, sweep_seconds=30)
+    store.create_job("done")
+    store.create_job("busy")
+    store.update("done", state=JobState.SUCCEEDED)
+    assert store.get("busy") is not None
+
+    now[0] += 11
+    assert store.get("done") is not None  # Expired, but swept 11s ago
+    now[0] += 19
+    assert store.get("done") is None
+
+    store.update("busy", state=JobState.FAILED)
+    now[0] += 30
+    assert store.get_batch_changes("batch") is None
+    assert len(store) == 0
+
+
+def test_status_falls_back_to_disk_after_eviction(client, monkeypatch):
+    from app.utils.progress_store import progress_store
+
+    monkeypatch.setattr(progress_store, "ttl_seconds", 0)
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("one.m4a", b"one", "audio/mp4")),
+            ("audios", ("two.m4a", b"two", "audio/mp4")),
+        ],
+    )
+    batch_id = response.json()["batch_id"]
+    job_id = response.json()["jobs"][0]["job_id"]
+    progress_store.evict_expired()
+    progress_store.evict_expired()
+    assert not progress_store.job_exists(job_id)
+    assert progress_store.get_batch_jobs(batch_id) == []
+
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "succeeded"
+    batch = client.get(f"/api/batch/{batch_id}/status").json()
+    assert len(batch["jobs"]) == 2
+    assert batch["counts"] == {"succeeded": 2}
+    assert client.get(f"/api/batch/{batch_id}/archive").status_code == 200
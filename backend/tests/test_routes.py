@@ -39,3 +39,438 @@ def test_batch_convert_returns_jobs(client):
 def test_missing_video_returns_404(client):
     response = client.get("/api/jobs/does-not-exist/video")
     assert response.status_code == 404
+
+
+def test_ready_endpoint_reports_components(client):
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ready"] is True
+    assert data["model"]["state"] == "ready"
+    assert data["ffmpeg"]["encoders"]["libx264"] is True
+
+
+def test_embedded_subtitles_variant(client, tmp_path):
+    from app.api import routes
+
+    job_id = client.post(
+        "/api/convert",
+        files={"audio": ("talk.m4a", b"data", "audio/mp4")},
+        data={"embed_subtitles": "true"},
+    ).json()["job_id"]
+    assert routes.job_manager.get_captioned_video_path(job_id).exists()
+
+    plain = client.get(f"/api/jobs/{job_id}/video")
+    captioned = client.get(f"/api/jobs/{job_id}/video?subtitles=embedded")
+    assert captioned.status_code == 200
+    assert captioned.content == plain.content + b"+mov_text"
+
+
+def test_embedded_subtitles_remuxed_on_demand(client):
+    from app.api import routes
+
+    job_id = client.post(
+        "/api/convert",
+        files={"audio": ("talk.m4a", b"data", "audio/mp4")},
+    ).json()["job_id"]
+    captioned_path = routes.job_manager.get_captioned_video_path(job_id)
+    assert not captioned_path.exists()
+
+    response = client.get(f"/api/jobs/{job_id}/video?subtitles=embedded")
+    assert response.status_code == 200
+    assert captioned_path.exists()
+    assert client.get(f"/api/jobs/{job_id}/video?subtitles=burned").status_code == 422
+
+
+def test_batch_archive_streams_selected_artifacts(client):
+    import io
+    import zipfile
+
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("one.m4a", b"one", "audio/mp4")),
+            ("audios", ("two.m4a", b"two", "audio/mp4")),
+        ],
+    )
+    batch_id = response.json()["batch_id"]
+
+    archive = client.get(f"/api/batch/{batch_id}/archive")
+    assert archive.status_code == 200
+    assert archive.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        infos = {info.filename: info for info in zf.infolist()}
+        assert len(infos) == 6
+        videos = [info for name, info in infos.items() if name.endswith(".mp4")]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in videos)
+        vtts = [info for name, info in infos.items() if name.endswith(".vtt")]
+        assert all(info.compress_type == zipfile.ZIP_DEFLATED for info in vtts)
+        assert zf.read(videos[0].filename) == b"test-video"
+        assert zf.testzip() is None
+
+    subtitles_only = client.get(f"/api/batch/{batch_id}/archive", params={"include": "subtitles"})
+    with zipfile.ZipFile(io.BytesIO(subtitles_only.content)) as zf:
+        assert all(name.endswith(".vtt") for name in zf.namelist())
+        assert len(zf.namelist()) == 2
+
+    assert client.get(f"/api/batch/{batch_id}/archive", params={"include": "bogus"}).status_code == 400
+    assert client.get("/api/batch/missing/archive").status_code == 404
+
+
+def test_convert_records_probed_stream_details(client, monkeypatch):
+    from app.api import routes
+
+    info = {"format": "mp3", "codec": "mp3", "sample_rate": 48000, "channels": 1, "duration": 12.5}
+    monkeypatch.setattr(routes, "probe_audio", lambda path: info)
+    response = client.post("/api/convert", files={"audio": ("talk.mp3", b"mp3-bytes", "audio/mpeg")})
+    assert response.status_code == 200
+
+    meta = routes.job_manager.get_job_meta(response.json()["job_id"])
+    assert meta["audio_codec"] == "mp3"
+    assert meta["audio_sample_rate"] == 48000
+    assert meta["audio_channels"] == 1
+    assert meta["audio_duration"] == 12.5
+
+
+def test_undecodable_audio_is_rejected_before_queueing(client, monkeypatch):
+    from app.api import routes
+
+    dispatched = []
+    monkeypatch.setattr(routes, "dispatch_job", lambda *args: dispatched.append(args))
+
+    response = client.post("/api/convert", files={"audio": ("empty.m4a", b"", "audio/mp4")})
+    assert response.status_code == 400
+    assert "no audio stream" in response.json()["detail"]
+
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("good.wav", b"riff", "audio/wav")),
+            ("audios", ("bad.flac", b"", "audio/flac")),
+        ],
+    )
+    assert response.status_code == 400
+    assert dispatched == []
+    assert not any(path.name.startswith("job_") for path in routes.job_manager.base_dir.iterdir())
+
+    monkeypatch.setattr("app.services.file_handler.MAX_FILE_SIZE", 4)
+    tracked = len(routes.progress_store)
+    response = client.post(
+        "/api/batch/convert",
+        files=[
+            ("audios", ("good.wav", b"riff", "audio/wav")),
+            ("audios", ("large.wav", b"riff" * 2, "audio/wav")),
+        ],
+    )
+    assert response.status_code == 413
+    assert dispatched == []
+    assert not any(path.name.startswith("job_") for path in routes.job_manager.base_dir.iterdir())
+    assert len(routes.progress_store) == tracked
+
+    assert client.post("/api/convert", files={"audio": ("notes.txt", b"text", "text/plain")}).status_code == 400
+
+
+def test_jobs_record_their_scheduling_class(client):
+    from app.api import routes
+    from app.services.dispatcher import job_lane
+
+    single = client.post(
+        "/api/convert",
+        files={"audio": ("one.m4a", b"one", "audio/mp4")},
+        headers={"X-Client-Id": "team-a"},
+    ).json()["job_id"]
+    assert job_lane(routes.job_manager.get_job_meta(single)) == ("interactive", "team-a", "")
+
+    batch = client.post(
+        "/api/batch/convert", files=[("audios", ("two.m4a", b"two", "audio/mp4"))]
+    ).json()
+    meta = routes.job_manager.get_job_meta(batch["jobs"][0]["job_id"])
+    assert job_lane(meta) == ("batch", "testclient", batch["batch_id"])
+
+
+def test_idempotency_key_replays_the_original_submission(client, monkeypatch):
+    from app.api import routes
+
+    dispatched = []
+    monkeypatch.setattr(routes, "dispatch_job", lambda *args: dispatched.append(args))
+    audio = {"audio": ("talk.m4a", b"talk", "audio/mp4")}
+    headers = {"Idempotency-Key": "upload-1"}
+
+    first = client.post("/api/convert", files=audio, headers=headers)
+    repeat = client.post("/api/convert", files=audio, headers=headers)
+    assert repeat.status_code == 200
+    assert repeat.json() == first.json()
+    assert repeat.headers["Idempotent-Replayed"] == "true"
+    assert len(dispatched) == 1
+    assert len([p for p in routes.job_manager.base_dir.iterdir() if p.name.startswith("job_")]) == 1
+
+    changed = client.post("/api/convert", files={"audio": ("talk.m4a", b"other", "audio/mp4")}, headers=headers)
+    assert changed.status_code == 409
+    changed = client.post("/api/convert", files=audio, data={"tier": "fast"}, headers=headers)
+    assert changed.status_code == 409
+
+    # Keys are per client, and a failed request leaves its key unused
+    other = client.post("/api/convert", files=audio, headers={**headers, "X-Client-Id": "team-b"})
+    assert other.json()["job_id"] != first.json()["job_id"]
+    bad = {"audio": ("talk.txt", b"talk", "text/plain")}
+    assert client.post("/api/convert", files=bad, headers={"Idempotency-Key": "upload-2"}).status_code == 400
+    retry = client.post("/api/convert", files=audio, headers={"Idempotency-Key": "upload-2"})
+    assert retry.status_code == 200 and "Idempotent-Replayed" not in retry.headers
+    assert len(dispatched) == 3
+
+
+def test_idempotency_key_replays_batches(client, monkeypatch):
+    from app.api import routes
+
+    dispatched = []
+    monkeypatch.setattr(routes, "dispatch_job", lambda *args: dispatched.append(args))
+    files = [("audios", ("one.m4a", b"one", "audio/mp4")), ("audios", ("two.m4a", b"two", "audio/mp4"))]
+    headers = {"Idempotency-Key": "batch-1"}
+
+    first = client.post("/api/batch/convert", files=files, headers=headers).json()
+    assert client.post("/api/batch/convert", files=files, headers=headers).json() == first
+    assert len(dispatched) == 2
+
+    reordered = client.post("/api/batch/convert", files=files[::-1], headers=headers)
+    assert reordered.status_code == 409
+    assert client.post("/api/convert", files={"audio": files[0][1]}, headers=headers).status_code == 409
+    assert client.post("/api/batch/convert", files=files, headers={"Idempotency-Key": ""}).status_code == 400
+
+
+def test_artifacts_are_served_from_s3_by_any_api_node(client, tmp_path):
+    from app.api import routes
+    from app.utils.job_manager import JobManager
+    from app.utils.storage import MemoryS3Client, S3Storage
+
+    s3 = S3Storage("media", client=MemoryS3Client())
+    routes.job_manager = JobManager(str(tmp_path / "node-a"), storage=s3)
+    job_id = client.post("/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}).json()["job_id"]
+
+    routes.job_manager = JobManager(str(tmp_path / "node-b"), storage=s3)
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "succeeded"
+    for path in ("video", "transcript/json", "transcript/vtt"):
+        response = client.get(f"/api/jobs/{job_id}/{path}", follow_redirects=False)
+        assert response.status_code == 307
+        assert response.headers["location"].startswith("https://media.s3.memory/blobs/sha256/")
+    assert client.get(f"/api/jobs/{job_id}/waveform").status_code == 200
+    assert client.get("/api/jobs/job_missing/video", follow_redirects=False).status_code == 404
+
+    routes.job_manager = JobManager(str(tmp_path / "node-a"), storage=s3)
+    profiled = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"profile": "true"}
+    ).json()["job_id"]
+    routes.job_manager = JobManager(str(tmp_path / "node-c"), storage=s3)
+    response = client.get(f"/api/jobs/{profiled}/profile", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"].startswith("https://media.s3.memory/blobs/sha256/")
+    assert client.get(f"/api/jobs/{job_id}/profile", follow_redirects=False).status_code == 404
+
+
+def test_renditions_are_recorded_and_served(client):
+    from app.api import routes
+
+    assert client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"renditions": "480p"}
+    ).status_code == 400
+
+    job_id = client.post(
+        "/api/convert",
+        files={"audio": ("talk.m4a", b"data", "audio/mp4")},
+        data={"renditions": "1080p,360p"},
+    ).json()["job_id"]
+    meta = routes.job_manager.get_job_meta(job_id)
+    assert meta["requested_renditions"] == ["360p", "1080p"]
+    assert set(meta["renditions"]) == {"360p", "720p", "1080p"}
+    assert meta["renditions"]["720p"] == routes.job_manager.get_rendered_video_path(job_id).name
+
+    response = client.get(f"/api/jobs/{job_id}/video?rendition=360p")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.360p.mp4"')
+    assert client.get(f"/api/jobs/{job_id}/video?rendition=720p").status_code == 200
+    assert client.get(f"/api/jobs/{job_id}/video?rendition=480p").status_code == 400
+    assert client.get(f"/api/jobs/{job_id}/video?rendition=360p&subtitles=embedded").status_code == 400
+
+    single = client.post("/api/convert", files={"audio": ("one.m4a", b"one", "audio/mp4")}).json()["job_id"]
+    assert client.get(f"/api/jobs/{single}/video?rendition=1080p").status_code == 404
+
+
+def test_transcript_only_jobs_never_render(client):
+    from app.api import routes
+
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"outputs": "transcript"}
+    ).json()["job_id"]
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "succeeded"
+    assert client.get(f"/api/jobs/{job_id}/transcript/vtt").status_code == 200
+    response = client.get(f"/api/jobs/{job_id}/video")
+    assert response.status_code == 404 and "outputs=transcript" in response.json()["detail"]
+    assert not routes.job_manager.get_rendered_video_path(job_id).exists()
+    assert client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"outputs": "audio"}
+    ).status_code == 422
+
+
+def test_lazy_jobs_render_on_the_first_video_request(client, monkeypatch):
+    from app.api import routes
+
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"render": "lazy"}
+    ).json()["job_id"]
+    video_path = routes.job_manager.get_rendered_video_path(job_id)
+    assert client.get(f"/api/jobs/{job_id}/status").json()["state"] == "succeeded"
+    assert not video_path.exists()
+    transcribed_at = routes.job_manager.get_job_meta(job_id)["stage_timings"]
+
+    response = client.get(f"/api/jobs/{job_id}/video")
+    assert response.status_code == 202
+    assert response.headers["location"] == f"/api/jobs/{job_id}/status"
+    assert video_path.exists()
+    meta = routes.job_manager.get_job_meta(job_id)
+    assert meta["render_requested"] and "rendering" in meta["stage_timings"]
+    assert meta["stage_timings"]["transcribing"] == transcribed_at["transcribing"]
+    assert client.get(f"/api/jobs/{job_id}/video").status_code == 200
+
+    # Requests while a render is pending do not dispatch another one
+    lazy = client.post(
+        "/api/convert", files={"audio": ("two.m4a", b"two", "audio/mp4")}, data={"render": "lazy"}
+    ).json()["job_id"]
+    dispatched = []
+    monkeypatch.setattr(routes, "dispatch_job", lambda *args: dispatched.append(args))
+    assert client.get(f"/api/jobs/{lazy}/video").status_code == 202
+    assert client.get(f"/api/jobs/{lazy}/video?rendition=360p").status_code == 202
+    assert len(dispatched) == 1
+
+
+def test_failed_on_demand_render_leaves_the_job_succeeded(client, monkeypatch):
+    from app.api import routes
+    from app.services import background_processor
+
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}, data={"render": "lazy"}
+    ).json()["job_id"]
+
+    generate_video = background_processor.generate_video
+    failures = ["encoder crashed"]
+
+    def flaky_render(*args, **kwargs):
+        if failures:
+            raise RuntimeError(failures.pop())
+        return generate_video(*args, **kwargs)
+
+    monkeypatch.setattr(background_processor, "generate_video", flaky_render)
+    response = client.get(f"/api/jobs/{job_id}/video")
+    assert response.status_code == 202
+    status = client.get(f"/api/jobs/{job_id}/status").json()
+    assert status["state"] == "succeeded"
+    assert status["render_state"] == "failed" and "encoder crashed" in status["render_error"]
+    assert client.get(f"/api/jobs/{job_id}/transcript/json").status_code == 200
+
+    # The next request tries again
+    assert client.get(f"/api/jobs/{job_id}/video").status_code == 202
+    assert client.get(f"/api/jobs/{job_id}/status").json()["render_state"] == "succeeded"
+    assert client.get(f"/api/jobs/{job_id}/video").status_code == 200
+
+
+def test_jobs_and_batches_post_signed_completion_webhooks(client, monkeypatch, webhook_receiver):
+    import json
+    from app.api import routes
+    from app.services import webhooks
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    data = {"callback_url": webhook_receiver.url}
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"talk", "audio/mp4")}, data=data
+    ).json()["job_id"]
+    batch = client.post(
+        "/api/batch/convert",
+        files=[("audios", ("one.m4a", b"one", "audio/mp4")), ("audios", ("two.m4a", b"two", "audio/mp4"))],
+        data=data,
+    ).json()
+    # Nothing is sent before the delivery loop runs; the outbox holds the events
+    assert webhook_receiver.requests == []
+
+    outbox = webhooks.get_webhook_outbox(routes.job_manager.base_dir)
+    assert webhooks.WebhookDelivery(outbox, timeout=5).deliver_due() == 4
+    events = {}
+    for received in webhook_receiver.requests:
+        headers = received["headers"]
+        assert headers["X-A2V-Signature"] == webhooks.sign_payload(
+            "s3cret", headers["X-A2V-Timestamp"], received["body"]
+        )
+        payload = json.loads(received["body"])
+        events.setdefault(payload["event"], []).append(payload)
+
+    assert sorted(event["job_id"] for event in events["job.succeeded"]) == sorted(
+        [job_id] + [job["job_id"] for job in batch["jobs"]]
+    )
+    (completed,) = events["batch.completed"]
+    assert completed["batch_id"] == batch["batch_id"] and completed["counts"] == {"succeeded": 2}
+
+
+def test_callback_urls_are_validated(client, monkeypatch):
+    from app.services import webhooks
+
+    audio = {"audio": ("talk.m4a", b"talk", "audio/mp4")}
+    response = client.post("/api/convert", files=audio, data={"callback_url": "https://example.test/hooks"})
+    assert response.status_code == 400 and "A2V_WEBHOOK_SECRET" in response.json()["detail"]
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    assert client.post("/api/convert", files=audio, data={"callback_url": "file:///etc/passwd"}).status_code == 400
+    batch = [("audios", ("one.m4a", b"one", "audio/mp4"))]
+    assert client.post("/api/batch/convert", files=batch, data={"callback_url": "hooks"}).status_code == 400
+
+
+def test_undeliverable_webhooks_are_listed_as_dead_letters(client, monkeypatch, webhook_receiver):
+    from app.api import routes
+    from app.services import webhooks
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    outbox = webhooks.get_webhook_outbox(routes.job_manager.base_dir)
+    monkeypatch.setattr(outbox, "max_attempts", 2)
+    monkeypatch.setattr(outbox, "backoff_base", 0)
+    webhook_receiver.statuses = [500, 500]
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"talk", "audio/mp4")},
+        data={"callback_url": webhook_receiver.url}
+    ).json()["job_id"]
+    assert client.get("/api/webhooks/dead-letters").json()["dead_letters"] == []
+
+    assert webhooks.WebhookDelivery(outbox, timeout=5).deliver_due() == 0
+    body = client.get("/api/webhooks/dead-letters").json()
+    (dead,) = body["dead_letters"]
+    assert dead["event"] == "job.succeeded" and dead["payload"]["job_id"] == job_id
+    assert dead["url"] == webhook_receiver.url and dead["attempts"] == 2 and "500" in dead["last_error"]
+    assert body["counts"] == {"dead": 1}
+
+
+def test_webhook_events_are_named_after_state_transitions(client, monkeypatch):
+    from app.api import routes
+    from app.services import background_processor, webhooks
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    generate_video = background_processor.generate_video
+    failures = ["encoder crashed"]
+
+    def flaky_render(*args, **kwargs):
+        if failures:
+            raise RuntimeError(failures.pop())
+        return generate_video(*args, **kwargs)
+
+    monkeypatch.setattr(background_processor, "generate_video", flaky_render)
+    data = {"callback_url": "http://127.0.0.1:9/hooks"}
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"talk", "audio/mp4")}, data=data
+    ).json()["job_id"]
+    lazy_id = client.post(
+        "/api/convert", files={"audio": ("two.m4a", b"two", "audio/mp4")}, data={**data, "render": "lazy"}
+    ).json()["job_id"]
+    assert client.post(f"/api/jobs/{job_id}/retry").json()["state"] == "succeeded"
+    # Repeating a success, or rendering a lazy job on demand, announces nothing new
+    assert client.post(f"/api/jobs/{job_id}/retry").json()["state"] == "succeeded"
+    assert client.get(f"/api/jobs/{lazy_id}/video").status_code == 202
+
+    outbox = webhooks.get_webhook_outbox(routes.job_manager.base_dir)
+    claimed = outbox.claim(lease_seconds=30, limit=100)
+    assert sorted(delivery["event_id"] for delivery in claimed) == sorted([
+        f"job.failed:{job_id}:1", f"job.succeeded:{job_id}:2", f"job.succeeded:{lazy_id}:1"
+    ])
@@ -0,0 +1,205 @@
+import threading
+import time
+
+import pytest
+
+from app.services.scheduler import JobScheduler, estimate_queue, estimate_start, parse_weights, priority_key
+from app.utils.job_queue import JobQueue
+from app.utils.metrics import QUEUE_LANE_DEPTH
+from app.utils.rtf_model import RtfModel
+
+
+def _blocked_scheduler(policy="sjf", aging=1.0, **kwargs):
+    """Scheduler whose single worker is held by a job until release is set."""
+    scheduler = JobScheduler(max_workers=1, policy=policy, aging=aging, **kwargs)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("blocker", 10.0, blocker)
+    assert started.wait(5)
+    return scheduler, release
+
+
+def test_scheduler_runs_shortest_expected_job_first():
+    scheduler, release = _blocked_scheduler()
+    order = []
+    for job_id, expected in [("long", 600.0), ("short", 30.0), ("medium", 120.0)]:
+        scheduler.submit(job_id, expected, order.append, job_id)
+
+    assert scheduler.estimate("short")["queue_position"] == 1
+    assert scheduler.estimate("long")["queue_position"] == 3
+    assert scheduler.estimate("blocker")["queue_position"] is None
+
+    release.set()
+    scheduler.shutdown()
+    assert order == ["short", "medium", "long"]
+
+
+def test_scheduler_fifo_policy_keeps_submission_order():
+    scheduler, release = _blocked_scheduler(policy="fifo")
+    order = []
+    for job_id, expected in [("long", 600.0), ("short", 30.0)]:
+        scheduler.submit(job_id, expected, order.append, job_id)
+    release.set()
+    scheduler.shutdown()
+    assert order == ["long", "short"]
+
+
+def test_single_upload_overtakes_a_large_batch():
+    scheduler, release = _blocked_scheduler()
+    order = []
+    for index in range(20):
+        scheduler.submit(f"a{index}", 60.0, order.append, f"a{index}", lane="batch", client="alice", flow="b1")
+    scheduler.submit("single", 60.0, order.append, "single", lane="interactive", client="bob")
+
+    assert scheduler.depth("batch") == 20 and scheduler.depth("interactive") == 1
+    assert QUEUE_LANE_DEPTH.value(lane="interactive") == 1
+    assert scheduler.estimate("single")["queue_position"] == 1
+
+    release.set()
+    scheduler.shutdown()
+    assert order[0] == "single"
+    assert QUEUE_LANE_DEPTH.value(lane="batch") == 0
+
+
+def test_batches_of_different_clients_alternate():
+    scheduler, release = _blocked_scheduler(client_weights={"carol": 2.0})
+    order = []
+    for index in range(4):
+        scheduler.submit(f"a{index}", 60.0, order.append, f"a{index}", client="alice", flow="b1")
+    for index in range(4):
+        scheduler.submit(f"c{index}", 60.0, order.append, f"c{index}", client="carol", flow="b2")
+    # Submitted last, but alice's second batch shares alice's slice, not a new one
+    scheduler.submit("a-other", 60.0, order.append, "a-other", client="alice", flow="b3")
+
+    release.set()
+    scheduler.shutdown()
+    # carol has twice alice's weight
+    assert [job[0] for job in order[:6]].count("c") == 4
+    assert order.index("a-other") < order.index("a2")
+
+
+def test_client_concurrency_cap():
+    scheduler = JobScheduler(max_workers=2, client_max_concurrent=1)
+    release = threading.Event()
+    running = []
+
+    def hold(job_id):
+        running.append(job_id)
+        release.wait(5)
+
+    scheduler.submit("a1", 10.0, hold, "a1", client="alice")
+    scheduler.submit("a2", 10.0, hold, "a2", client="alice")
+    scheduler.submit("b1", 60.0, hold, "b1", client="bob")
+    deadline = time.time() + 5
+    while len(running) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    # alice is capped at one running job, so bob's longer job takes the second worker
+    assert sorted(running) == ["a1", "b1"]
+    assert scheduler.estimate("a2")["queue_position"] == 1
+    release.set()
+    scheduler.shutdown()
+    assert sorted(running) == ["a1", "a2", "b1"]
+
+
+def test_parse_weights():
+    assert parse_weights("interactive=8, batch=1") == {"interactive": 8.0, "batch": 1.0}
+    assert parse_weights("") == {}
+    with pytest.raises(ValueError):
+        parse_weights("batch=0")
+
+
+def test_aging_lets_long_jobs_overtake_later_short_jobs():
+    # A long job that waited longer than its expected runtime beats a new short job
+    assert priority_key(600.0, 0.0) < priority_key(30.0, 700.0)
+    assert priority_key(600.0, 0.0) > priority_key(30.0, 100.0)
+    # With faster aging the long job wins sooner
+    assert priority_key(600.0, 0.0, aging=4.0) < priority_key(30.0, 200.0, aging=4.0)
+
+
+def test_estimate_start_replays_workers():
+    assert estimate_start([], [], 2) == 0.0
+    assert estimate_start([10.0, 20.0, 30.0], [], 2) == 20.0
+    assert estimate_start([10.0], [5.0, 50.0], 2) == 15.0
+
+
+def test_estimate_queue_matches_per_job_estimates():
+    queued = [("a", 10.0), ("b", 20.0), ("c", 30.0), ("d", 5.0)]
+    running = {"r1": 5.0, "r2": 50.0}
+    estimates = estimate_queue(queued, running, 2)
+
+    assert estimates["r2"] == {"queue_position": None, "eta_seconds": 50.0}
+    for position, (job_id, expected) in enumerate(queued):
+        ahead = [runtime for _, runtime in queued[:position]]
+        eta = estimate_start(ahead, list(running.values()), 2) + expected
+        assert estimates[job_id] == {"queue_position": position + 1, "eta_seconds": round(eta, 1)}
+
+    scheduler, release = _blocked_scheduler()
+    scheduler.submit("long", 600.0, lambda: None)
+    scheduler.submit("short", 30.0, lambda: None)
+    estimates = scheduler.estimates()
+    assert estimates["blocker"]["queue_position"] is None
+    assert estimates["short"]["queue_position"] == scheduler.estimate("short")["queue_position"] == 1
+    assert estimates["long"]["queue_position"] == 2
+    assert estimates["long"]["eta_seconds"] == pytest.approx(scheduler.estimate("long")["eta_seconds"], abs=0.5)
+    release.set()
+    scheduler.shutdown()
+
+
+def test_rtf_model_learns_and_persists(tmp_path):
+    path = tmp_path / "rtf_model.json"
+    model = RtfModel(path)
+    prior = model.predict(600.0)
+
+    model.observe(600.0, {"transcribing": 62.0, "packaging": 0.05, "rendering": 31.0})
+    learned = model.predict(600.0)
+    assert learned != prior
+    assert abs(model.predict(600.0, ["transcribing"]) - 62.0) < 1e-6
+
+    reloaded = RtfModel(path)
+    assert abs(reloaded.predict(600.0) - learned) < 1e-6
+    # Longer audio is predicted to take longer
+    assert reloaded.predict(1200.0) > reloaded.predict(600.0)
+
+
+def test_broker_claims_by_priority(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    queue.enqueue("long", {"expected_seconds": 600.0}, priority=priority_key(600.0, time.time()))
+    queue.enqueue("short", {"expected_seconds": 30.0}, priority=priority_key(30.0, time.time()))
+
+    assert [record["job_id"] for record in queue.queued()] == ["short", "long"]
+    claim = queue.claim("worker-1", lease_seconds=30)
+    assert claim["job_id"] == "short"
+    leased = queue.leased()
+    assert leased[0]["lease_owner"] == "worker-1"
+    assert leased[0]["started_at"] is not None
+
+
+def test_broker_claims_fairly(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"), client_max_concurrent=2)
+    for index in range(3):
+        queue.enqueue(f"a{index}", priority=float(index), lane="batch", client="alice", flow="b1")
+    queue.enqueue("c0", priority=10.0, lane="batch", client="carol", flow="b2")
+    queue.enqueue("single", priority=20.0, lane="interactive", client="bob")
+    assert queue.lane_depths() == {"batch": 4, "interactive": 1}
+
+    claims = [queue.claim("worker", lease_seconds=30)["job_id"] for _ in range(4)]
+    # Interactive first, then the least-served client; alice stops at her cap
+    assert claims == ["single", "a0", "c0", "a1"]
+    assert queue.claim("worker", lease_seconds=30) is None
+    queue.complete("a0", "worker")
+    assert queue.claim("worker", lease_seconds=30)["job_id"] == "a2"
+
+
+def test_status_includes_eta_fields(client):
+    files = {"audio": ("sample.m4a", b"fake-audio", "audio/m4a")}
+    job_id = client.post("/api/convert", files=files).json()["job_id"]
+
+    status = client.get(f"/api/jobs/{job_id}/status").json()
+    assert status["state"] == "succeeded"
+    assert status["eta_seconds"] == 0.0
+    assert status["queue_position"] is None
@@ -0,0 +1,108 @@
+import pytest
+
+from app.services.tiers import select_tier, validate_tier
+
+
+def test_explicit_tier_is_honoured():
+    decision = select_tier("fast", duration=30, queue_depth=50)
+    assert decision["name"] == "fast"
+    assert decision["model"] == "tiny"
+    assert decision["beam_size"] == 1
+    assert decision["requested"] == "fast"
+
+
+def test_auto_routes_on_duration_and_queue_pressure():
+    assert select_tier("auto", duration=20, queue_depth=0)["name"] == "accurate"
+    assert select_tier("auto", duration=600, queue_depth=0)["name"] == "balanced"
+    assert select_tier("auto", duration=3 * 3600, queue_depth=0)["name"] == "fast"
+    # A deep queue trades accuracy for throughput
+    assert select_tier("auto", duration=600, queue_depth=10)["name"] == "fast"
+    assert select_tier(None, duration=None, queue_depth=0)["name"] == "balanced"
+
+
+def test_english_probe_selects_english_only_model(monkeypatch):
+    from app.services import tiers
+
+    monkeypatch.setattr(tiers, "detect_language", lambda *args: ("en", 0.97))
+    decision = select_tier("balanced", duration=600, queue_depth=0, audio_path="talk.m4a")
+    assert decision["model"] == "base.en"
+    assert decision["language"] == "en"
+
+    monkeypatch.setattr(tiers, "detect_language", lambda *args: ("de", 0.4))
+    decision = select_tier("balanced", duration=600, queue_depth=0, audio_path="talk.m4a")
+    assert decision["model"] == "base"
+    assert decision["language"] is None
+
+
+def test_unknown_tier_is_rejected(client):
+    with pytest.raises(ValueError):
+        validate_tier("ultra")
+    response = client.post(
+        "/api/convert",
+        files={"audio": ("meeting.m4a", b"data", "audio/mp4")},
+        data={"tier": "ultra"},
+    )
+    assert response.status_code == 400
+
+
+def test_tier_recorded_in_job_meta(client):
+    from app.api import routes
+
+    response = client.post(
+        "/api/convert",
+        files={"audio": ("meeting.m4a", b"data", "audio/mp4")},
+        data={"tier": "accurate"},
+    )
+    meta = routes.job_manager.get_job_meta(response.json()["job_id"])
+    assert meta["requested_tier"] == "accurate"
+    assert meta["tier"]["name"] == "accurate"
+
+
+def test_probe_is_skipped_without_an_english_only_variant(monkeypatch):
+    from dataclasses import replace
+    from app.services import tiers
+
+    def probe(*args):
+        raise AssertionError("language probe should not run")
+
+    monkeypatch.setattr(tiers, "detect_language", probe)
+    monkeypatch.setitem(tiers.TIERS, "balanced", replace(tiers.TIERS["balanced"], model="large-v3"))
+    decision = select_tier("balanced", duration=600, queue_depth=0, audio_path="talk.m4a")
+    assert decision["model"] == "large-v3"
+    assert decision["language"] is None
+
+
+def test_warm_up_covers_the_models_routing_picks():
+    from app.services.tiers import TIERS, routed_models
+
+    compute_type = TIERS["balanced"].compute_type
+    assert routed_models(TIERS["balanced"].model) == [
+        (TIERS["balanced"].model, compute_type),
+        (f"{TIERS['balanced'].model}.en", compute_type),
+        ("tiny", "int8"),
+    ]
+    assert routed_models("large-v3") == [("large-v3", "int8")]
+
+
+def test_warmed_models_are_never_evicted(monkeypatch):
+    import sys
+    import types
+    from app.services import transcription
+
+    class WhisperModel:
+        def __init__(self, name, **kwargs):
+            self.name = name
+
+        def transcribe(self, audio, **kwargs):
+            return iter(()), None
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=WhisperModel))
+    monkeypatch.setattr(transcription, "_models", type(transcription._models)())
+    monkeypatch.setattr(transcription, "_pinned", set())
+    monkeypatch.setattr(transcription, "MAX_LOADED_MODELS", 1)
+
+    transcription.warm_up_model("base")
+    transcription.warm_up_model("tiny")
+    transcription.get_model("small")
+    transcription.get_model("medium")
+    assert list(transcription._models) == [("base", "int8"), ("tiny", "int8"), ("medium", "int8")]
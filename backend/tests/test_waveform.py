@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services import waveform
+
+
+def test_compute_peaks_matches_reference_across_chunk_boundaries():
+    rng = np.random.default_rng(7)
+    samples = rng.integers(-32768, 32767, size=10_001, dtype=np.int16)
+    raw = samples.astype("<i2").tobytes()
+    # Odd-sized chunks split samples across reads
+    chunks = [raw[i:i + 999] for i in range(0, len(raw), 999)]
+
+    mins, maxs = waveform.compute_peaks(iter(chunks), samples_per_peak=100)
+    assert len(mins) == 101
+    for i in (0, 50, 100):
+        bucket = samples[i * 100:(i + 1) * 100]
+        assert mins[i] == bucket.min()
+        assert maxs[i] == bucket.max()
+
+
+def test_build_waveform_writes_pyramid(tmp_path, monkeypatch):
+    monkeypatch.setattr(waveform, "WAVEFORM_MIN_PEAKS", 8)
+    monkeypatch.setattr(waveform, "WAVEFORM_BASE_SAMPLES", 64)
+    tone = (np.sin(np.linspace(0, 200, 64 * 200)) * 20000).astype("<i2").tobytes()
+    monkeypatch.setattr(waveform, "_decode_pcm", lambda path: iter([tone]))
+
+    output = tmp_path / "audio.peaks"
+    summary = waveform.build_waveform(tmp_path / "audio.wav", output)
+    assert summary["levels"] == [64 * 4 ** 3, 64 * 4 ** 2, 64 * 4, 64]
+
+    finest = waveform.read_level(output, 3)
+    assert finest["peaks"] == 200
+    pairs = np.frombuffer(finest["data"], dtype=np.int8).reshape(-1, 2)
+    assert (pairs[:, 0] <= pairs[:, 1]).all()
+    assert pairs[:, 1].max() > 70
+    overview = waveform.read_level(output, 0)
+    assert overview["peaks"] == 4
+    assert len(overview["data"]) == 8
+
+
+def test_waveform_endpoint_supports_levels_and_caching(client):
+    job_id = client.post(
+        "/api/convert", files={"audio": ("talk.m4a", b"data", "audio/mp4")}
+    ).json()["job_id"]
+
+    response = client.get(f"/api/jobs/{job_id}/waveform")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    levels = int(response.headers["x-waveform-levels"])
+    assert len(response.content) == 2 * int(response.headers["x-waveform-peaks"])
+    assert response.headers["cache-control"].startswith("public")
+
+    etag = response.headers["etag"]
+    cached = client.get(f"/api/jobs/{job_id}/waveform", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    for header in (f'"other", W/{etag}', "*"):
+        assert client.get(f"/api/jobs/{job_id}/waveform", headers={"If-None-Match": header}).status_code == 304
+    # Only whole entity tags match
+    for header in (etag[1:-1], f'"{etag}"', etag[:-3] + '"'):
+        assert client.get(f"/api/jobs/{job_id}/waveform", headers={"If-None-Match": header}).status_code == 200
+
+    assert client.get(f"/api/jobs/{job_id}/waveform", params={"level": levels}).status_code == 400
+    assert client.get("/api/jobs/job_missing/waveform").status_code == 404
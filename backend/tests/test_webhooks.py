@@ -0,0 +1,87 @@
+import hmac
+import json
+
+import pytest
+
+from app.services import webhooks
+from app.services.webhooks import WebhookDelivery, sign_payload, validate_callback_url
+from app.utils.webhook_outbox import DeliveryState, WebhookOutbox
+
+
+def test_failed_attempts_back_off_exponentially_then_dead_letter(tmp_path, monkeypatch):
+    outbox = WebhookOutbox(str(tmp_path / "webhooks.sqlite3"), max_attempts=3, backoff_base=5, backoff_max=8)
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.webhook_outbox.time.time", lambda: now[0])
+
+    assert outbox.add("evt-1", "job.succeeded", "http://example.test/hooks", {"job_id": "job_1"})
+    assert not outbox.add("evt-1", "job.succeeded", "http://example.test/hooks", {"job_id": "job_1"})
+
+    (delivery,) = outbox.claim(lease_seconds=30)
+    assert delivery["attempts"] == 1 and delivery["payload"] == {"job_id": "job_1"}
+    assert outbox.mark_failed(delivery["id"], "HTTP 500") == DeliveryState.PENDING
+    now[0] += 4.9
+    assert outbox.claim(lease_seconds=30) == []
+    now[0] += 0.1
+
+    (delivery,) = outbox.claim(lease_seconds=30)
+    assert outbox.mark_failed(delivery["id"], "HTTP 500") == DeliveryState.PENDING
+    assert outbox.get(delivery["id"])["next_attempt_at"] == now[0] + 8  # 10s, capped at backoff_max
+    now[0] += 8
+
+    (delivery,) = outbox.claim(lease_seconds=30)
+    assert outbox.mark_failed(delivery["id"], "HTTP 503") == DeliveryState.DEAD
+    now[0] += 3600
+    assert outbox.claim(lease_seconds=30) == []
+    (dead,) = outbox.dead_letters()
+    assert dead["event_id"] == "evt-1" and dead["attempts"] == 3 and dead["last_error"] == "HTTP 503"
+    assert outbox.counts() == {DeliveryState.DEAD: 1}
+
+
+def test_abandoned_deliveries_are_claimed_again_after_their_lease(tmp_path, monkeypatch):
+    outbox = WebhookOutbox(str(tmp_path / "webhooks.sqlite3"))
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.webhook_outbox.time.time", lambda: now[0])
+    outbox.add("evt-1", "job.failed", "http://example.test/hooks", {})
+
+    assert len(outbox.claim(lease_seconds=30)) == 1
+    assert outbox.claim(lease_seconds=30) == []
+    now[0] += 31
+    (delivery,) = outbox.claim(lease_seconds=30)
+    assert delivery["attempts"] == 2
+    outbox.mark_delivered(delivery["id"])
+    now[0] += 3600
+    assert outbox.claim(lease_seconds=30) == []
+
+
+def test_deliveries_are_signed_and_retried_until_dead(tmp_path, webhook_receiver):
+    outbox = WebhookOutbox(str(tmp_path / "webhooks.sqlite3"), max_attempts=3, backoff_base=0)
+    delivery = WebhookDelivery(outbox, secret="s3cret", timeout=5)
+    outbox.add("evt-1", "job.succeeded", webhook_receiver.url, {"id": "evt-1", "job_id": "job_1"})
+
+    assert delivery.deliver_due() == 1
+    (received,) = webhook_receiver.requests
+    headers = received["headers"]
+    assert json.loads(received["body"]) == {"id": "evt-1", "job_id": "job_1"}
+    assert headers["X-A2V-Event"] == "job.succeeded" and headers["X-A2V-Delivery"] == "evt-1"
+    expected = sign_payload("s3cret", headers["X-A2V-Timestamp"], received["body"])
+    assert hmac.compare_digest(headers["X-A2V-Signature"], expected)
+
+    webhook_receiver.statuses = [500, 502, 503]
+    outbox.add("evt-2", "job.failed", webhook_receiver.url, {"id": "evt-2"})
+    assert delivery.deliver_due() == 0
+    assert len(webhook_receiver.requests) == 4
+    (dead,) = outbox.dead_letters()
+    assert dead["event_id"] == "evt-2" and "503" in dead["last_error"]
+
+
+def test_callback_urls_must_be_http_and_need_a_secret(monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    assert validate_callback_url(None) is None
+    assert validate_callback_url(" https://example.test/hooks ") == "https://example.test/hooks"
+    for url in ("ftp://example.test/hooks", "/hooks", "http://", "https://example.test/" + "x" * 2048):
+        with pytest.raises(ValueError):
+            validate_callback_url(url)
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "")
+    with pytest.raises(ValueError, match="A2V_WEBHOOK_SECRET"):
+        validate_callback_url("https://example.test/hooks")
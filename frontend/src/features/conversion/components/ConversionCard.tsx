@@ -15,7 +15,7 @@ export function ConversionCard({ onSuccess, onBatchSuccess, onError }: Conversio
         <p>Ready when you are. We will handle the rest.</p>
       </div>
       <UploadForm onSuccess={onSuccess} onBatchSuccess={onBatchSuccess} onError={onError} />
-      <div className="hero-card-note">Supports .m4a files up to 100MB each.</div>
+      <div className="hero-card-note">Supports .m4a, .mp3, .wav, .flac, .ogg and .opus files up to 100MB each.</div>
     </div>
   );
 }
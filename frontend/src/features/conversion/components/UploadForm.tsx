@@ -3,6 +3,8 @@ import { uploadAudio, batchConvert } from '../../../shared/lib/api';
 import type { ConvertResponse, BatchConvertResponse } from '../../../entities/api';
 import './UploadForm.css';
 
+const AUDIO_EXTENSIONS = ['.m4a', '.mp3', '.wav', '.flac', '.ogg', '.opus'];
+
 interface UploadFormProps {
   onSuccess: (response: ConvertResponse) => void;
   onBatchSuccess?: (response: BatchConvertResponse) => void;
@@ -27,8 +29,8 @@ export function UploadForm({ onSuccess, onBatchSuccess, onError }: UploadFormPro
         onError(`${file.name}: File must be less than 100MB`);
         continue;
       }
-      if (!file.name.toLowerCase().endsWith('.m4a')) {
-        onError(`${file.name}: File must be in .m4a format`);
+      if (!AUDIO_EXTENSIONS.some(ext => file.name.toLowerCase().endsWith(ext))) {
+        onError(`${file.name}: File must be one of ${AUDIO_EXTENSIONS.join(', ')}`);
         continue;
       }
       validFiles.push(file);
@@ -97,14 +99,14 @@ export function UploadForm({ onSuccess, onBatchSuccess, onError }: UploadFormPro
     <form onSubmit={handleSubmit} className="upload-form" data-testid="upload-form">
       <div className="form-group">
         <label htmlFor="audio">
-          Audio File{isBatchMode ? 's' : ''} (.m4a, max 100MB each) *
+          Audio File{isBatchMode ? 's' : ''} (.m4a, .mp3, .wav, .flac, .ogg, .opus; max 100MB each) *
           {isBatchMode && <span className="batch-hint"> - Multiple files selected</span>}
         </label>
         <input
           ref={audioInputRef}
           id="audio"
           type="file"
-          accept=".m4a"
+          accept={AUDIO_EXTENSIONS.join(',')}
           onChange={handleAudioChange}
           disabled={isUploading}
           multiple
@@ -112,7 +114,7 @@ export function UploadForm({ onSuccess, onBatchSuccess, onError }: UploadFormPro
           aria-describedby="audio-help"
         />
         <div id="audio-help" className="sr-only">
-          Upload one or more .m4a files up to 100 megabytes each.
+          Upload one or more audio files up to 100 megabytes each.
         </div>
         {audioFiles.length > 0 && (
           <div className="file-list">